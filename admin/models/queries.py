@@ -1,60 +1,214 @@
 from datetime import datetime, timedelta
-from pymongo import MongoClient, ASCENDING, DESCENDING
-from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING
+from bson import ObjectId, json_util
+import base64
 import math
+import os
 
-# MongoDB connection
-client = MongoClient(
-    MON
-)
-db = client.newsai_db  # Use newsai_db for news data
-news_master = db.news_master
-users_collection = db.users
+from utils.cache import LRUCache, track
+from utils.db import news_collection, app_collection
+from utils import text_index
 
-def get_news_paginated(page=1, limit=50, category=None, search=None):
+# MongoDB collections (shared per-process client)
+news_master = news_collection("news_master")
+users_collection = app_collection("users")
+
+# Filtered totals are cached briefly; exact counts are only run on request
+COUNT_CACHE_TTL = int(os.getenv('COUNT_CACHE_TTL', 60))
+_count_cache = track("counts", LRUCache(maxsize=256, ttl=COUNT_CACHE_TTL))
+
+# Exports read the cursor in large batches and only the columns listed here
+EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', 1000))
+NEWS_EXPORT_FIELDS = [
+    "_id", "title", "summary", "content", "full_text", "source", "category",
+    "status", "credibility", "fake_prob", "sentiment", "sentiment_score",
+    "likes", "publishedAt", "created_at", "reporter_id", "reporter_name",
+    "location", "cluster_id"
+]
+USER_EXPORT_FIELDS = [
+    "_id", "first_name", "last_name", "email", "age", "location", "role",
+    "created_at"
+]
+
+
+def encode_cursor(sort_value, doc_id):
+    """
+    Build an opaque page token from a (sort value, _id) pair
+    """
+    raw = json_util.dumps([sort_value, doc_id])
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(token):
     """
-    Get news articles with pagination and filtering
+    Inverse of encode_cursor; raises ValueError on a malformed token
     """
     try:
-        # Build query
-        query = {}
-        
-        if category and category != "all":
-            query["category"] = category
-        
-        if search:
-            query["$or"] = [
-                {"title": {"$regex": search, "$options": "i"}},
-                {"content": {"$regex": search, "$options": "i"}},
-                {"source": {"$regex": search, "$options": "i"}}
-            ]
-        
-        # Calculate skip
-        skip = (page - 1) * limit
-        
-        # Get total count for pagination
-        total_count = news_master.count_documents(query)
-        total_pages = math.ceil(total_count / limit)
+        sort_value, doc_id = json_util.loads(base64.urlsafe_b64decode(token.encode("ascii")))
+        return sort_value, ObjectId(doc_id)
+    except Exception:
+        raise ValueError("Invalid pagination cursor")
+
+
+def count_matching(collection, query, exact=False):
+    """
+    Total for a pagination envelope. Unfiltered totals come from collection
+    metadata, filtered ones from a short-lived cache, unless exact is asked for
+    """
+    if exact:
+        return collection.count_documents(query)
+
+    if not query:
+        return collection.estimated_document_count()
+
+    key = (collection.name, json_util.dumps(query, sort_keys=True))
+    total = _count_cache.get(key)
+    if total is None:
+        total = collection.count_documents(query)
+        _count_cache.set(key, total)
+    return total
+
+
+def _keyset_clause(sort_field, sort_value, doc_id, newer):
+    """
+    Filter for documents strictly after (newer=False) or before (newer=True)
+    the cursor position in (sort_field desc, _id desc) order
+    """
+    op = "$gt" if newer else "$lt"
+
+    if sort_value is None:
+        # Missing/null values sort last in descending order
+        tie = {sort_field: None, "_id": {op: doc_id}}
+        return {"$or": [{sort_field: {"$ne": None}}, tie]} if newer else tie
+
+    clauses = [
+        {sort_field: {op: sort_value}},
+        {sort_field: sort_value, "_id": {op: doc_id}}
+    ]
+    if not newer:
+        # $lt is type-bracketed and never matches null, but the null group
+        # still follows every non-null value in descending order
+        clauses.append({sort_field: None})
+    return {"$or": clauses}
+
+
+def keyset_page(collection, query, sort_field, page=1, limit=50,
+                after=None, before=None, exact_count=False):
+    """
+    Fetch one page ordered by (sort_field, _id) descending.
+
+    With an after/before cursor the page is located with an index range
+    instead of skip(), so late pages cost the same as the first one. Without
+    a cursor, page numbers still work through skip() for deep links.
+    """
+    sort = [(sort_field, DESCENDING), ("_id", DESCENDING)]
+    find_query = query
+
+    if after:
+        sort_value, doc_id = decode_cursor(after)
+        find_query = {"$and": [query, _keyset_clause(sort_field, sort_value, doc_id, newer=False)]}
+    elif before:
+        sort_value, doc_id = decode_cursor(before)
+        find_query = {"$and": [query, _keyset_clause(sort_field, sort_value, doc_id, newer=True)]}
+        sort = [(sort_field, ASCENDING), ("_id", ASCENDING)]
+
+    cursor = collection.find(find_query).sort(sort)
+    if not (after or before) and page > 1:
+        cursor = cursor.skip((page - 1) * limit)
+
+    # One extra row tells us whether another page exists in this direction
+    items = list(cursor.limit(limit + 1))
+    has_more = len(items) > limit
+    items = items[:limit]
+
+    if before:
+        items.reverse()
+        has_next, has_prev = True, has_more
+    else:
+        has_next, has_prev = has_more, bool(after) or page > 1
+
+    next_cursor = prev_cursor = None
+    if items:
+        first, last = items[0], items[-1]
+        if has_next:
+            next_cursor = encode_cursor(last.get(sort_field), last["_id"])
+        if has_prev:
+            prev_cursor = encode_cursor(first.get(sort_field), first["_id"])
+
+    total_count = count_matching(collection, query, exact=exact_count)
+
+    return {
+        "items": items,
+        "total_count": total_count,
+        "total_pages": math.ceil(total_count / limit),
+        "count_is_exact": bool(exact_count),
+        "has_next": has_next,
+        "has_prev": has_prev,
+        "next_cursor": next_cursor,
+        "prev_cursor": prev_cursor
+    }
+
+def build_news_query(category=None, search=None):
+    """
+    Mongo filter for the admin news category/search filters, plus how many
+    articles the search words matched in all (None without a search). Only
+    the newest MAX_MATCHES matches are kept in the filter; exports batch
+    every match instead (see export_news_cursor).
+    """
+    query = {}
+    search_total = None
+    
+    if category and category != "all":
+        query["category"] = category
+    
+    if search:
+        # Matched through the in-process keyword index; the last word is
+        # a prefix so results follow the admin's typing
+        matched_ids, search_total = text_index.match(search, prefix=True)
+        query["_id"] = {"$in": [ObjectId(news_id) for news_id in matched_ids]}
+    
+    return query, search_total
+
+def build_users_query(role=None):
+    """
+    Mongo filter for the admin users role filter
+    """
+    query = {}
+    if role and role != "all":
+        query["role"] = role
+    return query
+
+def get_news_paginated(page=1, limit=50, category=None, search=None,
+                       after=None, before=None, exact_count=False):
+    """
+    Get news articles with pagination and filtering.
+    Pass the after/before cursors from a previous response to page by key.
+    """
+    try:
+        query, search_total = build_news_query(category, search)
         
-        # Get articles
-        articles = list(
-            news_master.find(query)
-            .sort("publishedAt", -1)
-            .skip(skip)
-            .limit(limit)
+        result = keyset_page(
+            news_master, query, "publishedAt",
+            page=page, limit=limit, after=after, before=before,
+            exact_count=exact_count
         )
+        articles = result.pop("items")
         
         # Convert ObjectId to string for JSON serialization
         for article in articles:
             article["_id"] = str(article["_id"])
         
+        # Totals only cover the newest MAX_MATCHES search hits; say so
+        search_truncated = search_total is not None and search_total > text_index.MAX_MATCHES
+        if search_truncated:
+            result["count_is_exact"] = False
+        
         return {
             "articles": articles,
-            "total_count": total_count,
-            "total_pages": total_pages,
             "current_page": page,
-            "has_next": page < total_pages,
-            "has_prev": page > 1
+            "search_truncated": search_truncated,
+            "search_match_count": search_total,
+            **result
         }
         
     except Exception as e:
@@ -68,6 +222,45 @@ def get_news_paginated(page=1, limit=50, category=None, search=None):
             "has_prev": False
         }
 
+def export_news_cursor(category=None, search=None, fields=None):
+    """
+    Iterate every article matching the admin news filters, newest first,
+    for streaming exports. Search matches are fetched EXPORT_BATCH_SIZE ids
+    at a time, so a broad search never builds one huge $in.
+    """
+    fields = fields or NEWS_EXPORT_FIELDS
+    query, _ = build_news_query(category)
+    if not search:
+        return _export_news_find(query, fields)
+    return _export_news_matches(query, search, fields)
+
+def _export_news_find(query, fields):
+    return (
+        news_master
+        .find(query, {field: 1 for field in fields})
+        .sort([("publishedAt", DESCENDING), ("_id", DESCENDING)])
+        .batch_size(EXPORT_BATCH_SIZE)
+    )
+
+def _export_news_matches(query, search, fields):
+    # Chunks come newest-inserted first; each chunk is sorted by publishedAt
+    for news_ids in text_index.match_batches(search, prefix=True, batch_size=EXPORT_BATCH_SIZE):
+        chunk_query = dict(query, _id={"$in": [ObjectId(news_id) for news_id in news_ids]})
+        yield from _export_news_find(chunk_query, fields)
+
+def export_users_cursor(role=None, fields=None):
+    """
+    Cursor over every user matching the admin role filter, newest first,
+    for streaming exports. Password hashes are never exported.
+    """
+    fields = fields or USER_EXPORT_FIELDS
+    return (
+        users_collection
+        .find(build_users_query(role), {field: 1 for field in fields})
+        .sort([("created_at", DESCENDING), ("_id", DESCENDING)])
+        .batch_size(EXPORT_BATCH_SIZE)
+    )
+
 def get_news_sample_for_visualization():
     """
     Get a representative sample of news for visualization (max 1000 articles)
@@ -76,7 +269,8 @@ def get_news_sample_for_visualization():
         # Get recent articles with good distribution across categories
         pipeline = [
             {"$sort": {"publishedAt": -1}},
-            {"$limit": 1000}  # Limit for performance
+            {"$limit": 1000},  # Limit for performance
+            {"$project": {field: 1 for field in NEWS_EXPORT_FIELDS}}
         ]
         
         articles = list(news_master.aggregate(pipeline))
@@ -91,30 +285,21 @@ def get_news_sample_for_visualization():
         print(f"Error getting news sample for visualization: {e}")
         return []
 
-def get_users_with_pagination(page=1, limit=50, role=None):
+def get_users_with_pagination(page=1, limit=50, role=None,
+                              after=None, before=None, exact_count=False):
     """
-    Get users with pagination and role filtering
+    Get users with pagination and role filtering.
+    Pass the after/before cursors from a previous response to page by key.
     """
     try:
-        # Build query
-        query = {}
-        if role and role != "all":
-            query["role"] = role
-        
-        # Calculate skip
-        skip = (page - 1) * limit
-        
-        # Get total count
-        total_count = users_collection.count_documents(query)
-        total_pages = math.ceil(total_count / limit)
+        query = build_users_query(role)
         
-        # Get users
-        users = list(
-            users_collection.find(query)
-            .sort("created_at", -1)
-            .skip(skip)
-            .limit(limit)
+        result = keyset_page(
+            users_collection, query, "created_at",
+            page=page, limit=limit, after=after, before=before,
+            exact_count=exact_count
         )
+        users = result.pop("items")
         
         # Convert ObjectId to string
         for user in users:
@@ -122,11 +307,8 @@ def get_users_with_pagination(page=1, limit=50, role=None):
         
         return {
             "users": users,
-            "total_count": total_count,
-            "total_pages": total_pages,
             "current_page": page,
-            "has_next": page < total_pages,
-            "has_prev": page > 1
+            **result
         }
         
     except Exception as e:
@@ -233,13 +415,8 @@ def get_categories_list():
     Get list of all news categories
     """
     try:
-        pipeline = [
-            {"$group": {"_id": "$category"}},
-            {"$sort": {"_id": 1}}
-        ]
-        
-        categories = list(news_master.aggregate(pipeline))
-        return [cat["_id"] for cat in categories if cat["_id"]]
+        # Answered from the category_* indexes without reading articles
+        return sorted(category for category in news_master.distinct("category") if category)
         
     except Exception as e:
         print(f"Error getting categories: {e}")
@@ -3,5 +3,6 @@ from . import dashboard
 from . import news
 from . import users
 from . import sources
+from . import performance
 
 # The imports above ensure that all route functions are registered with the blueprint
@@ -1,18 +1,17 @@
-from flask import render_template, jsonify, request, redirect, url_for
+from flask import render_template, jsonify, request, redirect, url_for, Response, stream_with_context
+from datetime import datetime
 from .. import admin_bp
 from ..utils.auth import admin_required
 from ..models.queries import (
     get_news_paginated,
     get_news_sample_for_visualization,
-    get_categories_list
-)
-from ..utils.metrics import (
-    get_category_distribution,
-    get_sentiment_distribution,
-    get_fake_real_ratio,
-    get_credibility_distribution,
-    get_news_per_source
+    get_categories_list,
+    export_news_cursor,
+    NEWS_EXPORT_FIELDS
 )
+from ..utils.metrics import get_chart_data
+from ..utils.export import export_rows, EXPORT_FORMATS
+from utils.http_cache import conditional
 
 @admin_bp.route('/news')
 #@admin_required
@@ -60,14 +59,8 @@ def admin_news_visualization():
     News analytics and visualization page
     """
     try:
-        # Get chart data
-        chart_data = {
-            "category_distribution": get_category_distribution(),
-            "sentiment_distribution": get_sentiment_distribution(),
-            "fake_vs_real_ratio": get_fake_real_ratio(),
-            "credibility_distribution": get_credibility_distribution(),
-            "news_per_source": get_news_per_source()
-        }
+        # Get chart data (one cached $facet scan for all series)
+        chart_data = get_chart_data()
         
         # Get sample data for additional analysis
         sample_data = get_news_sample_for_visualization()
@@ -96,12 +89,20 @@ def admin_news_data():
         category = request.args.get('category', 'all')
         search = request.args.get('search', '')
         
+        # Keyset cursors from the previous response; exact totals on request
+        after = request.args.get('after') or None
+        before = request.args.get('before') or None
+        exact_count = request.args.get('exact_count', '').lower() in ('1', 'true')
+        
         # Get news data
         news_data = get_news_paginated(
             page=page,
             limit=limit,
             category=category,
-            search=search
+            search=search,
+            after=after,
+            before=before,
+            exact_count=exact_count
         )
         
         return jsonify(news_data)
@@ -120,18 +121,15 @@ def admin_news_data():
 
 @admin_bp.route('/news/charts/data')
 #@admin_required
+@conditional(private=True, bypass=lambda: request.args.get('refresh', '').lower() in ('1', 'true'))
 def admin_news_charts_data():
     """
     API endpoint for chart data
     """
     try:
-        chart_data = {
-            "category_distribution": get_category_distribution(),
-            "sentiment_distribution": get_sentiment_distribution(),
-            "fake_vs_real_ratio": get_fake_real_ratio(),
-            "credibility_distribution": get_credibility_distribution(),
-            "news_per_source": get_news_per_source()
-        }
+        chart_data = get_chart_data(
+            refresh=request.args.get('refresh', '').lower() in ('1', 'true')
+        )
         
         return jsonify(chart_data)
         
@@ -168,6 +166,33 @@ def admin_news_sample():
             "error": "Failed to fetch news sample"
         }), 500
 
+@admin_bp.route('/news/export')
+@admin_required
+def admin_news_export():
+    """
+    Stream every article matching the news filters as NDJSON or CSV
+    """
+    export_format = request.args.get('format', 'ndjson').lower()
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({"error": "format must be ndjson or csv"}), 400
+    
+    # Optional column subset, limited to the exportable fields
+    requested = [f for f in request.args.get('fields', '').split(',') if f]
+    fields = [f for f in requested if f in NEWS_EXPORT_FIELDS] or NEWS_EXPORT_FIELDS
+    
+    cursor = export_news_cursor(
+        category=request.args.get('category', 'all'),
+        search=request.args.get('search', ''),
+        fields=fields
+    )
+    filename = f"news-{datetime.now().strftime('%Y%m%d-%H%M%S')}.{export_format}"
+    
+    return Response(
+        stream_with_context(export_rows(cursor, fields, export_format)),
+        mimetype=EXPORT_FORMATS[export_format],
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
+
 @admin_bp.route('/news/<news_id>')
 # @admin_required
 def admin_news_details(news_id):
@@ -0,0 +1,93 @@
+from flask import render_template, jsonify, request
+from .. import admin_bp
+from ..utils.auth import admin_required
+from utils import query_profiler
+
+TOP_QUERIES_LIMIT = 20
+
+
+def _query_args():
+    limit = min(max(request.args.get('limit', TOP_QUERIES_LIMIT, type=int), 1), 200)
+    sort = request.args.get('sort', 'total_ms')
+    if sort not in query_profiler.SORTABLE_FIELDS:
+        sort = 'total_ms'
+    return limit, sort
+
+@admin_bp.route('/queries')
+@admin_required
+def admin_queries():
+    """
+    Slowest MongoDB query shapes and recent slow samples
+    """
+    limit, sort = _query_args()
+    try:
+        shapes = query_profiler.top_shapes(limit=limit, sort=sort)
+        slow = query_profiler.recent_slow(limit=limit)
+        
+        return render_template('admin/queries.html',
+                             shapes=shapes,
+                             slow=slow,
+                             sort=sort,
+                             limit=limit,
+                             sortable=query_profiler.SORTABLE_FIELDS,
+                             threshold_ms=query_profiler.SLOW_QUERY_MS,
+                             enabled=query_profiler.PROFILER_ENABLED)
+        
+    except Exception as e:
+        print(f"Error loading query profile: {e}")
+        return render_template('admin/queries.html',
+                             shapes=[],
+                             slow=[],
+                             sort=sort,
+                             limit=limit,
+                             sortable=query_profiler.SORTABLE_FIELDS,
+                             threshold_ms=query_profiler.SLOW_QUERY_MS,
+                             enabled=query_profiler.PROFILER_ENABLED,
+                             error="Failed to load query profile")
+
+@admin_bp.route('/queries/data')
+@admin_required
+def admin_queries_data():
+    """
+    API endpoint for the top-N query shapes (?limit=20&sort=total_ms)
+    """
+    limit, sort = _query_args()
+    try:
+        shapes = query_profiler.top_shapes(limit=limit, sort=sort)
+        slow = query_profiler.recent_slow(limit=limit)
+        
+        for shape in shapes:
+            for field in ("first_seen", "last_seen"):
+                if shape.get(field):
+                    shape[field] = shape[field].isoformat()
+        for sample in slow:
+            sample["at"] = sample["at"].isoformat()
+        
+        return jsonify({
+            "shapes": shapes,
+            "slow": slow,
+            "sort": sort,
+            "threshold_ms": query_profiler.SLOW_QUERY_MS,
+            "enabled": query_profiler.PROFILER_ENABLED
+        })
+        
+    except Exception as e:
+        print(f"Error fetching query profile: {e}")
+        return jsonify({
+            "shapes": [],
+            "slow": [],
+            "error": "Failed to fetch query profile"
+        }), 500
+
+@admin_bp.route('/queries/reset', methods=['POST'])
+@admin_required
+def admin_queries_reset():
+    """
+    Clear the recorded query shapes and slow samples
+    """
+    try:
+        query_profiler.reset()
+        return jsonify({"success": True})
+    except Exception as e:
+        print(f"Error resetting query profile: {e}")
+        return jsonify({"success": False, "error": "Failed to reset query profile"}), 500
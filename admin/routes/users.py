@@ -1,12 +1,16 @@
-from flask import render_template, jsonify, request, redirect, url_for
+from flask import render_template, jsonify, request, redirect, url_for, Response, stream_with_context
+from datetime import datetime
 from .. import admin_bp
 from ..utils.auth import admin_required
 from ..models.queries import (
     get_users_with_pagination,
     get_user_metrics,
     update_user_role,
-    delete_user
+    delete_user,
+    export_users_cursor,
+    USER_EXPORT_FIELDS
 )
+from ..utils.export import export_rows, EXPORT_FORMATS
 
 @admin_bp.route('/users')
 #@admin_required
@@ -53,10 +57,18 @@ def admin_users_data():
         limit = min(int(request.args.get('limit', 50)), 100)
         role = request.args.get('role', 'all')
         
+        # Keyset cursors from the previous response; exact totals on request
+        after = request.args.get('after') or None
+        before = request.args.get('before') or None
+        exact_count = request.args.get('exact_count', '').lower() in ('1', 'true')
+        
         users_data = get_users_with_pagination(
             page=page,
             limit=limit,
-            role=role
+            role=role,
+            after=after,
+            before=before,
+            exact_count=exact_count
         )
         
         return jsonify(users_data)
@@ -73,6 +85,29 @@ def admin_users_data():
             "error": "Failed to fetch users data"
         }), 500
 
+@admin_bp.route('/users/export')
+@admin_required
+def admin_users_export():
+    """
+    Stream every user matching the role filter as NDJSON or CSV
+    """
+    export_format = request.args.get('format', 'ndjson').lower()
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({"error": "format must be ndjson or csv"}), 400
+    
+    # Optional column subset, limited to the exportable fields
+    requested = [f for f in request.args.get('fields', '').split(',') if f]
+    fields = [f for f in requested if f in USER_EXPORT_FIELDS] or USER_EXPORT_FIELDS
+    
+    cursor = export_users_cursor(role=request.args.get('role', 'all'), fields=fields)
+    filename = f"users-{datetime.now().strftime('%Y%m%d-%H%M%S')}.{export_format}"
+    
+    return Response(
+        stream_with_context(export_rows(cursor, fields, export_format)),
+        mimetype=EXPORT_FORMATS[export_format],
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
+
 @admin_bp.route('/users/metrics')
 #@admin_required
 def admin_users_metrics():
@@ -1,14 +1,11 @@
 from functools import wraps
 from flask import jsonify, redirect, url_for, session
 from bson import ObjectId
-from pymongo import MongoClient
 
-# MongoDB connection
-client = MongoClient(
-    MONGO_URI
-)
-db = client.pslvnews
-users = db.users
+from utils.db import app_collection
+
+# MongoDB collections (shared per-process client)
+users = app_collection("users")
 
 def admin_required(f):
     """
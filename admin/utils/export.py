@@ -0,0 +1,91 @@
+"""
+Streaming serializers for admin exports.
+
+Rows are read from a Mongo cursor and written out in chunks of roughly
+EXPORT_CHUNK_BYTES, so an export of any size holds one cursor batch and one
+output chunk in memory at a time.
+"""
+
+import csv
+import io
+import json
+import os
+from datetime import datetime, date
+
+from bson import ObjectId
+
+EXPORT_CHUNK_BYTES = int(os.getenv('EXPORT_CHUNK_BYTES', 64 * 1024))
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv"
+}
+
+
+def _default(value):
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def _cell(value):
+    """
+    Flatten one field for a CSV cell; nested values are written as JSON
+    """
+    if value is None:
+        return ""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=_default, ensure_ascii=False)
+    if isinstance(value, (ObjectId, datetime, date)):
+        return _default(value)
+    return value
+
+
+def _chunked(lines):
+    buffer = []
+    size = 0
+    for line in lines:
+        buffer.append(line)
+        size += len(line)
+        if size >= EXPORT_CHUNK_BYTES:
+            yield "".join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield "".join(buffer)
+
+
+def ndjson_rows(cursor):
+    """
+    One JSON document per line
+    """
+    return _chunked(
+        json.dumps(doc, default=_default, ensure_ascii=False) + "\n"
+        for doc in cursor
+    )
+
+
+def csv_rows(cursor, fields):
+    """
+    Header row followed by one row per document, columns in `fields` order
+    """
+    def lines():
+        out = io.StringIO()
+        writer = csv.writer(out)
+        writer.writerow(fields)
+        for doc in cursor:
+            writer.writerow([_cell(doc.get(field)) for field in fields])
+            yield out.getvalue()
+            out.seek(0)
+            out.truncate()
+        yield out.getvalue()
+
+    return _chunked(lines())
+
+
+def export_rows(cursor, fields, export_format):
+    if export_format == "csv":
+        return csv_rows(cursor, fields)
+    return ndjson_rows(cursor)
@@ -1,22 +1,34 @@
 from datetime import datetime, date, timedelta
-from pymongo import MongoClient
 from collections import Counter
+import os
 import statistics
 
-# MongoDB connection
-client = MongoClient(
-    MONGO_URI
-)
-db = client.newsai_db  # Use newsai_db for news data
-news_master = db.news_master
-users_collection = db.users
+from utils.db import news_collection, app_collection
+from utils.shared_cache import SharedCache
+from utils import rollup, watermark
+
+# MongoDB collections (shared per-process client)
+news_master = news_collection("news_master")
+users_collection = app_collection("users")
 
 def get_today_metrics():
     """
-    Get today's news metrics
+    Get today's news metrics from the rollup counters
     """
     today = datetime.now().date().strftime("%Y-%m-%d")
     
+    try:
+        if rollup.is_initialized():
+            return rollup.summarize(rollup.get_rollup(rollup.day_id(today)))
+    except Exception as e:
+        print(f"Error reading today's rollup: {e}")
+    
+    return _scan_today_metrics(today)
+
+def _scan_today_metrics(today):
+    """
+    Aggregate today's metrics from news_master (used until the rollup exists)
+    """
     try:
         # Today's metrics aggregation
         pipeline = [
@@ -81,7 +93,20 @@ def get_today_metrics():
 
 def get_overall_metrics():
     """
-    Get overall news metrics from entire database
+    Get overall news metrics from the all-time rollup counters
+    """
+    try:
+        overall = rollup.get_rollup(rollup.ALL_TIME_ID)
+        if overall is not None:
+            return rollup.summarize(overall)
+    except Exception as e:
+        print(f"Error reading overall rollup: {e}")
+    
+    return _scan_overall_metrics()
+
+def _scan_overall_metrics():
+    """
+    Aggregate overall metrics from news_master (used until the rollup exists)
     """
     try:
         # Overall metrics aggregation
@@ -139,127 +164,142 @@ def get_overall_metrics():
             "most_common_sentiment": 0
         }
 
-def get_category_distribution():
+# All chart series are computed by one $facet scan and shared across workers
+CHART_CACHE_TTL = int(os.getenv('CHART_CACHE_TTL', 60))
+_chart_cache = SharedCache("charts", ttl=CHART_CACHE_TTL, local_maxsize=4, local_ttl=10)
+
+CHART_FACETS = {
+    "category_distribution": [
+        {"$group": {"_id": "$category", "count": {"$sum": 1}}},
+        {"$sort": {"count": -1}}
+    ],
+    "sentiment_distribution": [
+        {"$group": {
+            "_id": {
+                "$switch": {
+                    "branches": [
+                        {"case": {"$lt": ["$sentiment_score", -0.5]}, "then": "Very Negative"},
+                        {"case": {"$lt": ["$sentiment_score", -0.1]}, "then": "Negative"},
+                        {"case": {"$lt": ["$sentiment_score", 0.1]}, "then": "Neutral"},
+                        {"case": {"$lt": ["$sentiment_score", 0.5]}, "then": "Positive"}
+                    ],
+                    "default": "Very Positive"
+                }
+            },
+            "count": {"$sum": 1}
+        }},
+        {"$sort": {"count": -1}}
+    ],
+    "fake_vs_real_ratio": [
+        {"$group": {
+            "_id": {"$cond": [{"$gt": ["$fake_prob", 50]}, "Fake News", "Real News"]},
+            "count": {"$sum": 1}
+        }},
+        {"$sort": {"count": -1}}
+    ],
+    "credibility_distribution": [
+        {"$group": {
+            "_id": {
+                "$switch": {
+                    "branches": [
+                        {"case": {"$lt": ["$credibility", 0.2]}, "then": "0.0-0.2"},
+                        {"case": {"$lt": ["$credibility", 0.4]}, "then": "0.2-0.4"},
+                        {"case": {"$lt": ["$credibility", 0.6]}, "then": "0.4-0.6"},
+                        {"case": {"$lt": ["$credibility", 0.8]}, "then": "0.6-0.8"}
+                    ],
+                    "default": "0.8-1.0"
+                }
+            },
+            "count": {"$sum": 1}
+        }},
+        {"$sort": {"count": -1}}
+    ],
+    "news_per_source": [
+        {"$group": {"_id": "$source", "count": {"$sum": 1}}},
+        {"$sort": {"count": -1}},
+        {"$limit": 10}  # Top 10 sources
+    ]
+}
+
+# Output label used by each series for the facet's group key
+CHART_LABELS = {
+    "category_distribution": "category",
+    "sentiment_distribution": "sentiment",
+    "fake_vs_real_ratio": "type",
+    "credibility_distribution": "range",
+    "news_per_source": "source"
+}
+
+
+def _compute_chart_data():
+    pipeline = [
+        # Only the fields the facets read leave the storage engine
+        {"$project": {"_id": 0, "category": 1, "sentiment_score": 1,
+                      "fake_prob": 1, "credibility": 1, "source": 1}},
+        {"$facet": CHART_FACETS}
+    ]
+
+    result = list(news_master.aggregate(pipeline))
+    facets = result[0] if result else {}
+
+    return {
+        name: [{label: item["_id"], "count": item["count"]} for item in facets.get(name, [])]
+        for name, label in CHART_LABELS.items()
+    }
+
+
+def get_chart_data(refresh=False):
     """
-    Get category distribution for news articles
+    Get every admin chart series from a single collection scan
     """
+    # Keyed by the ingest watermark so a new article invalidates the entry
+    current = watermark.current()
+    key = f"all:{current[0]}" if current else "all"
+    
+    chart_data = None if refresh else _chart_cache.get(key)
+    if chart_data is None:
+        chart_data = _compute_chart_data()
+        _chart_cache.set(key, chart_data)
+    return chart_data
+
+
+def _chart_series(name):
     try:
-        pipeline = [
-            {"$group": {"_id": "$category", "count": {"$sum": 1}}},
-            {"$sort": {"count": -1}}
-        ]
-        
-        result = list(news_master.aggregate(pipeline))
-        return [{"category": item["_id"], "count": item["count"]} for item in result]
-        
+        return get_chart_data()[name]
     except Exception as e:
-        print(f"Error getting category distribution: {e}")
+        print(f"Error getting {name}: {e}")
         return []
 
+
+def get_category_distribution():
+    """
+    Get category distribution for news articles
+    """
+    return _chart_series("category_distribution")
+
 def get_sentiment_distribution():
     """
     Get sentiment score distribution
     """
-    try:
-        # Get all sentiment scores and categorize them
-        pipeline = [
-            {"$project": {
-                "sentiment_category": {
-                    "$switch": {
-                        "branches": [
-                            {"case": {"$lt": ["$sentiment_score", -0.5]}, "then": "Very Negative"},
-                            {"case": {"$lt": ["$sentiment_score", -0.1]}, "then": "Negative"},
-                            {"case": {"$lt": ["$sentiment_score", 0.1]}, "then": "Neutral"},
-                            {"case": {"$lt": ["$sentiment_score", 0.5]}, "then": "Positive"}
-                        ],
-                        "default": "Very Positive"
-                    }
-                }
-            }},
-            {"$group": {"_id": "$sentiment_category", "count": {"$sum": 1}}},
-            {"$sort": {"count": -1}}
-        ]
-        
-        result = list(news_master.aggregate(pipeline))
-        return [{"sentiment": item["_id"], "count": item["count"]} for item in result]
-        
-    except Exception as e:
-        print(f"Error getting sentiment distribution: {e}")
-        return []
+    return _chart_series("sentiment_distribution")
 
 def get_fake_real_ratio():
     """
     Get fake vs real news ratio
     """
-    try:
-        pipeline = [
-            {
-                "$addFields": {
-                    "news_type": {
-                        "$cond": [{"$gt": ["$fake_prob", 50]}, "Fake News", "Real News"]
-                    }
-                }
-            },
-            {"$group": {"_id": "$news_type", "count": {"$sum": 1}}},
-            {"$sort": {"count": -1}}
-        ]
-        
-        result = list(news_master.aggregate(pipeline))
-        return [{"type": item["_id"], "count": item["count"]} for item in result]
-        
-    except Exception as e:
-        print(f"Error getting fake real ratio: {e}")
-        return []
+    return _chart_series("fake_vs_real_ratio")
 
 def get_credibility_distribution():
     """
     Get credibility score distribution
     """
-    try:
-        pipeline = [
-            {
-                "$addFields": {
-                    "credibility_range": {
-                        "$switch": {
-                            "branches": [
-                                {"case": {"$lt": ["$credibility", 0.2]}, "then": "0.0-0.2"},
-                                {"case": {"$lt": ["$credibility", 0.4]}, "then": "0.2-0.4"},
-                                {"case": {"$lt": ["$credibility", 0.6]}, "then": "0.4-0.6"},
-                                {"case": {"$lt": ["$credibility", 0.8]}, "then": "0.6-0.8"}
-                            ],
-                            "default": "0.8-1.0"
-                        }
-                    }
-                }
-            },
-            {"$group": {"_id": "$credibility_range", "count": {"$sum": 1}}},
-            {"$sort": {"count": -1}}
-        ]
-        
-        result = list(news_master.aggregate(pipeline))
-        return [{"range": item["_id"], "count": item["count"]} for item in result]
-        
-    except Exception as e:
-        print(f"Error getting credibility distribution: {e}")
-        return []
+    return _chart_series("credibility_distribution")
 
 def get_news_per_source():
     """
     Get news count per source
     """
-    try:
-        pipeline = [
-            {"$group": {"_id": "$source", "count": {"$sum": 1}}},
-            {"$sort": {"count": -1}},
-            {"$limit": 10}  # Top 10 sources
-        ]
-        
-        result = list(news_master.aggregate(pipeline))
-        return [{"source": item["_id"], "count": item["count"]} for item in result]
-        
-    except Exception as e:
-        print(f"Error getting news per source: {e}")
-        return []
+    return _chart_series("news_per_source")
 
 def get_preview_data():
     """
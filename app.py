@@ -1,10 +1,11 @@
 import os
-from flask import Flask, render_template, request, redirect, url_for, jsonify, session, redirect
-from pymongo import MongoClient
+import uuid
+import json
+import time
+from flask import Flask, render_template, request, redirect, url_for, jsonify, session, redirect, Response, stream_with_context
 from flask_bcrypt import Bcrypt
 from bson import ObjectId
 from datetime import datetime
-from pinecone import Pinecone
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -16,56 +17,106 @@ from admin import admin_bp
 # Import reporter blueprint
 from reporter import reporter_bp
 
-app = Flask(__name__)
-bcrypt = Bcrypt(app)
+# Mongo clients, the Pinecone assistant, Groq and TextBlob are all created
+# per process on first use, so importing this module or building an app
+# costs no connections
+from utils import db as mongo
+from utils import services, instrumentation, query_profiler
 
-# Load configuration from environment variables
-app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'fallback-secret-key-change-me')
-PINECONE_API_KEY = os.getenv('PINECONE_API_KEY')
-ASSISTANT_NAME = os.getenv('ASSISTANT_NAME', 'news')
+news_db = mongo.news_db  # Separate database for news data
+users = mongo.app_collection("users")
 
-# Validate required environment variables
-if not PINECONE_API_KEY:
-    raise ValueError("PINECONE_API_KEY environment variable is required")
+from utils.feed import get_category_feed, feed_scope, CARD_PROJECTION
+from utils.http_cache import conditional
+from utils.fragments import render_cards
+from utils.ranking import get_for_you
+from utils import engagement
+from utils import vector_search, text_index
 
-pc = Pinecone(api_key=PINECONE_API_KEY)
+bcrypt = Bcrypt()
 
-assistant = pc.assistant.Assistant(
-    assistant_name=ASSISTANT_NAME
-)
-# Register admin blueprint
-app.register_blueprint(admin_bp)
+# Views below are collected here and added to each app by create_app(), so
+# they keep their endpoint names (url_for('login'), ...)
+_routes = []
 
-# Register reporter blueprint
-app.register_blueprint(reporter_bp)
 
-# MongoDB connection using environment variables
-MONGO_URI = os.getenv('MONGO_URI')
-DB_NAME = os.getenv('DB_NAME', 'pslvnews')
-NEWS_DB_NAME = os.getenv('NEWS_DB_NAME', 'newsai_db')
+def route(rule, **options):
+    def decorator(view):
+        _routes.append((rule, options, view))
+        return view
+    return decorator
 
-if not MONGO_URI:
-    raise ValueError("MONGO_URI environment variable is required")
 
-client = MongoClient(MONGO_URI)
-db = client[DB_NAME]
-news_db = client[NEWS_DB_NAME]  # Separate database for news data
-users = db.users
+def create_app(config=None):
+    """
+    Build the Flask application.
 
-@app.route("/")
+    `config` is a class from config.py or its name ('production',
+    'development', 'testing'); it defaults to FLASK_CONFIG. Without either,
+    settings come from the environment alone.
+    """
+    app = Flask(__name__)
+    app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'fallback-secret-key-change-me')
+    app.config['WARM_SERVICES'] = os.getenv('WARM_SERVICES', '')
+
+    config = config or os.getenv('FLASK_CONFIG')
+    if isinstance(config, str):
+        from config import config as configs
+        config = configs[config]
+    if config is not None:
+        app.config.from_object(config)
+        if hasattr(config, 'init_app'):
+            config.init_app(app)
+
+    bcrypt.init_app(app)
+
+    # Register admin blueprint
+    app.register_blueprint(admin_bp)
+
+    # Register reporter blueprint
+    app.register_blueprint(reporter_bp)
+
+    for rule, options, view in _routes:
+        app.add_url_rule(rule, view_func=view, **options)
+
+    # Request/Mongo/dependency latency histograms and /metrics; before the
+    # first Mongo client is created so its commands are timed
+    instrumentation.init_app(app)
+
+    # Per-shape Mongo query stats and slow samples for /admin/queries
+    query_profiler.init_app(app)
+
+    # One pooled client per worker process, shared with the blueprints
+    mongo.init_app(app)
+    services.init_app(app)
+
+    # News card HTML is assembled from cached fragments
+    app.add_template_global(render_cards)
+
+    # Build or warm-start the keyword search index in the background
+    if not app.config.get('TESTING'):
+        text_index.warm_up()
+
+    # e.g. WARM_SERVICES=textblob,groq to load them before the first request
+    services.warm_up_in_background(app.config.get('WARM_SERVICES'))
+
+    return app
+
+
+@route("/")
 def hello_world():
     return render_template("index.html")
 
-@app.route("/user/dashboard/")
+@route("/user/dashboard/")
 def user_dashboard():
     return redirect(url_for("user_dashboard_category", category="breakingnews"))
 
 
-@app.route("/user/chatbot")
+@route("/user/chatbot")
 def user_chatbot():
     return render_template("user_chatbot.html")
 
-@app.route("/chat", methods=["POST"])
+@route("/chat", methods=["POST"])
 def chat():
     data = request.json
     user_message = data.get("message")
@@ -73,43 +124,82 @@ def chat():
     if not user_message:
         return jsonify({"error": "Empty message"}), 400
 
-    response = assistant.chat(
-        messages=[
-            {"role": "user", "content": user_message}
-        ]
-    )
+    try:
+        assistant = services.get_assistant()
+    except Exception as e:
+        print(f"Chat assistant unavailable: {e}")
+        return jsonify({"error": "Chat is unavailable"}), 503
+
+    with instrumentation.timed("pinecone_assistant"):
+        response = assistant.chat(
+            messages=[
+                {"role": "user", "content": user_message}
+            ]
+        )
 
     reply = response["message"]["content"]
 
     return jsonify({"reply": reply})
 
-@app.route("/user/for_you")
+def _engagement_request():
+    """
+    (news_id, reader_id, user_id) for a like/save/share call, or an error response
+    """
+    data = request.get_json(silent=True) or {}
+    news_id = data.get("newsId")
+    if not news_id or not ObjectId.is_valid(news_id):
+        return None, (jsonify(success=False, message="Invalid newsId"), 400)
+
+    user_id = session.get('user_id')
+    if not user_id:
+        # Anonymous readers are told apart by a per-session id
+        session.setdefault('reader_id', uuid.uuid4().hex)
+    reader_id = user_id or f"anon-{session['reader_id']}"
+    return (news_id, reader_id, user_id), None
+
+@route("/api/like-news", methods=["POST"])
+def like_news():
+    parsed, error = _engagement_request()
+    if error:
+        return error
+    news_id, reader_id, user_id = parsed
+
+    engagement.record(engagement.LIKE, news_id, reader_id, user_id)
+    return jsonify(success=True, queued=True), 202
+
+@route("/api/save-news", methods=["POST"])
+def save_news():
+    parsed, error = _engagement_request()
+    if error:
+        return error
+    news_id, reader_id, user_id = parsed
+
+    if not user_id:
+        return jsonify(success=False, message="Login required to save articles"), 401
+
+    action = engagement.UNSAVE if (request.get_json(silent=True) or {}).get("action") == "unsave" else engagement.SAVE
+    engagement.record(action, news_id, reader_id, user_id)
+    return jsonify(success=True, queued=True), 202
+
+@route("/api/share-news", methods=["POST"])
+def share_news():
+    parsed, error = _engagement_request()
+    if error:
+        return error
+    news_id, reader_id, user_id = parsed
+
+    engagement.record(engagement.SHARE, news_id, reader_id, user_id)
+    return jsonify(success=True, queued=True), 202
+
+@route("/user/for_you")
+@conditional(private=True, vary=lambda: session.get('user_id', ''))
 def user_for_you():
     category = "breakingnews"
     try:
-        # Default category
-        if not category or category.strip() == "":
-            return redirect(url_for("user_dashboard"))
-
-        if category == "breakingnews":
-            news_list = list(
-                news_db.today_breaking_priority
-                .find()
-                .sort("publishedAt", -1)
-            )
-        else:
-            # Fetch news by category from MongoDB
-            news_list = list(
-                news_db.news_master
-                .find({"category": category})
-                .sort("created_at", -1)
-            )
+        # Top articles for this reader from the recent-candidates pool
+        news_list = get_for_you(session.get('user_id'))
 
-        # Convert ObjectId to string for template usage
-        for news in news_list:
-            news["_id"] = str(news["_id"])
-
-        print(f"Loaded {len(news_list)} news for category: {category}")
+        print(f"Ranked {len(news_list)} news for user: {session.get('user_id', 'anonymous')}")
         # print(news_list)
         # Render dashboard with news data
         return render_template(
@@ -130,30 +220,16 @@ def user_for_you():
         )
 
 
-@app.route("/user/dashboard/<category>", methods=["GET"])
+@route("/user/dashboard/<category>", methods=["GET"])
+@conditional(scope=feed_scope)
 def user_dashboard_category(category):
     try:
         # Default category
         if not category or category.strip() == "":
             return redirect(url_for("user_dashboard"))
 
-        if category == "breakingnews":
-            news_list = list(
-                news_db.today_breaking_priority
-                .find()
-                .sort("publishedAt", -1)
-            )
-        else:
-            # Fetch news by category from MongoDB
-            news_list = list(
-                news_db.news_master
-                .find({"category": category})
-                .sort("created_at", -1)
-            )
-
-        # Convert ObjectId to string for template usage
-        for news in news_list:
-            news["_id"] = str(news["_id"])
+        # Newest cards for the category, served from the feed cache
+        news_list = get_category_feed(category)
 
         print(f"Loaded {len(news_list)} news for category: {category}")
         # print(news_list)
@@ -175,7 +251,7 @@ def user_dashboard_category(category):
             error="Failed to load news"
         )
 
-@app.route("/user/dashboard/search", methods=["GET"])
+@route("/user/dashboard/search", methods=["GET"])
 def search_news():
     try:
         # Get search query from URL parameters
@@ -201,7 +277,9 @@ def search_news():
             search_truncated = False
         
         news_list = []
-        search_method = "regex"  # Default search method
+        search_method = "keyword"  # Default search method
+        text_scores = {}
+        text_search_failed = False
         
         # Try text search first (more efficient with indexes)
         try:
@@ -209,33 +287,50 @@ def search_news():
                 news_db.news_master
                 .find(
                     {"$text": {"$search": query}},
-                    {"score": {"$meta": "textScore"}}
+                    {**CARD_PROJECTION, "score": {"$meta": "textScore"}}
                 )
                 .sort([("score", {"$meta": "textScore"})])
                 .limit(50)  # Limit results for performance
             )
+            text_scores = {str(news["_id"]): news["score"] for news in news_list}
             search_method = "text"
             print(f"Text search for '{query}' returned {len(news_list)} results")
         except Exception as text_search_error:
-            print(f"Text search failed: {text_search_error}, falling back to regex search")
+            print(f"Text search failed: {text_search_error}")
+            text_search_failed = True
+        
+        # Blend in semantic matches from the local vector index, if built
+        try:
+            vector_hits = vector_search.search(query, k=50)
+        except Exception as vector_search_error:
+            print(f"Vector search failed: {vector_search_error}")
+            vector_hits = None
+        
+        if vector_hits:
+            ranked_ids = vector_search.hybrid_rank(text_scores, dict(vector_hits), limit=50)
+            by_id = {str(news["_id"]): news for news in news_list}
+            missing = [ObjectId(news_id) for news_id in ranked_ids if news_id not in by_id]
+            if missing:
+                for news in news_db.news_master.find({"_id": {"$in": missing}}, CARD_PROJECTION):
+                    by_id[str(news["_id"])] = news
+            news_list = [by_id[news_id] for news_id in ranked_ids if news_id in by_id]
+            search_method = "hybrid" if text_scores else "semantic"
+            print(f"Hybrid search for '{query}' returned {len(news_list)} results")
+        elif text_search_failed:
+            print("Falling back to the in-process keyword index")
             
-            # Fallback to regex search if text search fails
-            news_list = list(
-                news_db.news_master
-                .find({
-                    "$or": [
-                        {"title": {"$regex": query, "$options": "i"}},
-                        {"description": {"$regex": query, "$options": "i"}},
-                        {"full_text": {"$regex": query, "$options": "i"}},
-                        {"content": {"$regex": query, "$options": "i"}},
-                        {"category": {"$regex": query, "$options": "i"}}
-                    ]
-                })
-                .sort("created_at", -1)
-                .limit(50)  # Limit results for performance
-            )
-            search_method = "regex"
-            print(f"Regex search for '{query}' returned {len(news_list)} results")
+            # Keyword index lookup instead of an unindexable regex scan
+            matched_ids = text_index.search(query, limit=50)
+            by_id = {}
+            if matched_ids:
+                for news in news_db.news_master.find(
+                    {"_id": {"$in": [ObjectId(news_id) for news_id in matched_ids]}},
+                    CARD_PROJECTION
+                ):
+                    by_id[str(news["_id"])] = news
+            news_list = [by_id[news_id] for news_id in matched_ids if news_id in by_id]
+            search_method = "keyword"
+            print(f"Keyword search for '{query}' returned {len(news_list)} results")
         
         # Convert ObjectId to string for template usage
         for news in news_list:
@@ -265,7 +360,7 @@ def search_news():
             error="Search failed. Please try again."
         )
 
-@app.route("/register", methods = ["GET", "POST"])
+@route("/register", methods = ["GET", "POST"])
 def register():
     if request.method == 'POST':
         try:
@@ -306,7 +401,7 @@ def register():
     return render_template("register.html")
 
 
-@app.route('/login', methods=['GET', 'POST'])
+@route('/login', methods=['GET', 'POST'])
 def login():
     # 🔹 GET → show login page (or modal container)
     if request.method == 'GET':
@@ -346,12 +441,32 @@ def login():
             return redirect(url_for('user_dashboard_category', category = "breakingnews"))
 
 
-@app.route('/user/news-analysis', methods=['GET'])
+@route('/user/news-analysis', methods=['GET'])
 def news_analysis():
     """Render news analysis UI"""
     return render_template('news_analysis.html')
 
-@app.route('/user/news-analysis/analyze', methods=['POST'])
+def _analysis_result(clean_text, analysis):
+    """
+    Response shape shared by the single and batch analysis endpoints
+    """
+    sentiment_data = analysis['sentiment']
+    agent_data, evidence_sources = analysis['agent_data'], analysis['evidence_sources']
+    return {
+        'title': agent_data.get('headline', clean_text[:50] + '...' if len(clean_text) > 50 else clean_text),
+        'summary': agent_data.get('summary', clean_text),
+        'credibility': agent_data.get('credibility', 0.5),
+        'fake_prob': agent_data.get('fake_prob', 0.5),
+        'sentiment': sentiment_data['sentiment'],
+        'status': 'analyzed',
+        'category': agent_data.get('category', 'general'),
+        'evidence_sources': evidence_sources,
+        'evidence_status': agent_data.get('evidence_status', {}),
+        'cluster_id': analysis['cluster_id'],
+        'duplicate': analysis['duplicate']
+    }
+
+@route('/user/news-analysis/analyze', methods=['POST'])
 def analyze_news():
     """Analyze news text without saving to database"""
     try:
@@ -368,35 +483,17 @@ def analyze_news():
             news_text = news_text[:5000]
         
         # Import analysis functions
-        import sys
-        import os
-        sys.path.append(os.path.join(os.path.dirname(__file__), 'utils'))
-        from reporter_ingest import run_agent, get_sentiment, remove_emojis
+        from utils.reporter_ingest import analyze_text, remove_emojis
         
         # Clean the text
         clean_text = remove_emojis(news_text)
         
-        # Get sentiment analysis
-        sentiment_data = get_sentiment(clean_text)
-        
-        # Get AI analysis
-        agent_data, evidence_sources = run_agent(clean_text)
-        
-        # Prepare response data
-        analysis_result = {
-            'title': agent_data.get('headline', clean_text[:50] + '...' if len(clean_text) > 50 else clean_text),
-            'summary': agent_data.get('summary', clean_text),
-            'credibility': agent_data.get('credibility', 0.5),
-            'fake_prob': agent_data.get('fake_prob', 0.5),
-            'sentiment': sentiment_data['sentiment'],
-            'status': 'analyzed',
-            'category': agent_data.get('category', 'general'),
-            'evidence_sources': evidence_sources
-        }
+        # Sentiment + AI analysis (reused from a near-duplicate if known)
+        analysis = analyze_text(clean_text)
         
         return jsonify({
             'success': True,
-            'result': analysis_result
+            'result': _analysis_result(clean_text, analysis)
         })
         
     except Exception as e:
@@ -406,5 +503,58 @@ def analyze_news():
             'error': f'Analysis failed: {str(e)}'
         }), 500
 
+@route('/user/news-analysis/analyze/batch', methods=['POST'])
+def analyze_news_batch():
+    """
+    Analyze many texts in one request; streams one NDJSON line per text as
+    its analysis completes, then a summary line
+    """
+    from utils.batch_analysis import analyze_batch, unique_count, BATCH_MAX_ITEMS, BATCH_MAX_CHARS
+    from utils.reporter_ingest import remove_emojis
+
+    data = request.get_json(silent=True)
+    texts = data.get('texts') if isinstance(data, dict) else None
+    if not isinstance(texts, list) or not texts:
+        return jsonify({'success': False, 'error': 'No texts provided'}), 400
+    if len(texts) > BATCH_MAX_ITEMS:
+        return jsonify({'success': False, 'error': f'At most {BATCH_MAX_ITEMS} texts per batch'}), 400
+
+    # Empty or non-string items are answered straight away and not analyzed
+    valid = {i: text.strip() for i, text in enumerate(texts) if isinstance(text, str) and text.strip()}
+    positions = list(valid)
+
+    def generate():
+        started = time.time()
+        failed = 0
+        for i, text in enumerate(texts):
+            if i not in valid:
+                failed += 1
+                yield json.dumps({'index': i, 'success': False, 'error': 'Empty text provided'}) + "\n"
+
+        batch = [valid[i] for i in positions]
+        for indices, analysis in analyze_batch(batch):
+            for batch_index in indices:
+                index = positions[batch_index]
+                if 'error' in analysis:
+                    failed += 1
+                    line = {'index': index, 'success': False, 'error': f"Analysis failed: {analysis['error']}"}
+                else:
+                    clean_text = remove_emojis(valid[index])[:BATCH_MAX_CHARS]
+                    line = {'index': index, 'success': True, 'result': _analysis_result(clean_text, analysis)}
+                yield json.dumps(line, default=str) + "\n"
+
+        yield json.dumps({
+            'done': True,
+            'count': len(texts),
+            'unique': unique_count(batch),
+            'failed': failed,
+            'seconds': round(time.time() - started, 3)
+        }) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+# Module-level app for `gunicorn app:app` and `python app.py`
+app = create_app()
+
 if __name__ == "__main__":
     app.run(debug = True)
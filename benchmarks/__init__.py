@@ -0,0 +1 @@
+# Benchmark and load-test harness for the Flask routes (see benchmarks/run.py)
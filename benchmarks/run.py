@@ -0,0 +1,430 @@
+#!/usr/bin/env python3
+"""
+Benchmark and load-test harness for the Flask routes.
+
+Boots the app against mongomock (default) or a local mongod, with Pinecone,
+Groq, DuckDuckGo and NewsAPI stubbed out (benchmarks/stubs.py), seeds a
+synthetic corpus with the generator in nothing.py and drives each route
+scenario through the Flask test client from a pool of threads. For every
+scenario it records throughput and p50/p95/p99 latency and writes them to
+benchmarks/results/ as JSON, so runs can be diffed against each other.
+
+Examples:
+    python -m benchmarks.run --size 1k
+    python -m benchmarks.run --size 100k --mongo-uri mongodb://localhost:27017/ --concurrency 8
+    python -m benchmarks.run --size 1k --compare benchmarks/results/baseline.json --fail-over 15
+"""
+
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+
+SIZES = {
+    "1k": 1000,
+    "100k": 100000,
+    "1m": 1000000
+}
+
+SEED = 42
+SEED_BATCH = 5000
+BENCH_DB_NAME = "bench_pslvnews"
+BENCH_NEWS_DB_NAME = "bench_newsai_db"
+
+SCENARIO_NAMES = [
+    "category", "search", "for_you", "admin_dashboard", "charts", "charts_cached",
+    "pagination_offset", "pagination_cursor", "submit"
+]
+
+
+# ================== SETUP ==================
+def parse_size(value):
+    value = value.lower()
+    if value in SIZES:
+        return SIZES[value]
+    return int(value)
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return None
+
+
+def configure_backend(mongo_uri, stub_latency):
+    """
+    Point utils.db at mongomock or a local mongod and install the stubs;
+    must run before anything imports `app`
+    """
+    os.environ['DB_NAME'] = BENCH_DB_NAME
+    os.environ['NEWS_DB_NAME'] = BENCH_NEWS_DB_NAME
+    if mongo_uri:
+        os.environ['MONGO_URI'] = mongo_uri
+
+    from benchmarks import stubs
+    scratch_dir = stubs.install(latency=stub_latency)
+
+    from utils import db
+    if mongo_uri:
+        client = db.get_client()
+        client.drop_database(BENCH_DB_NAME)
+        client.drop_database(BENCH_NEWS_DB_NAME)
+        return "mongod", scratch_dir
+
+    import mongomock
+    db.set_client(mongomock.MongoClient())
+    return "mongomock", scratch_dir
+
+
+def seed(size, batch_size=SEED_BATCH):
+    """
+    Insert `size` synthetic articles plus a reader and a reporter account
+    """
+    from nothing import generate_news, categories
+    from utils.db import news_collection, app_collection
+    from utils import watermark
+
+    news_master = news_collection("news_master")
+    users = app_collection("users")
+
+    started = time.time()
+    batch = []
+    query_words = set()
+    for doc in generate_news(size, seed=SEED, end_date=datetime.utcnow()):
+        # The feed routes use lower-case category slugs
+        doc["category"] = doc["category"].lower()
+        if len(query_words) < 50:
+            query_words.update(word.strip(".").lower() for word in doc["title"].split()[:2])
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            news_master.insert_many(batch, ordered=False)
+            batch = []
+            print(f"   seeded {news_master.estimated_document_count()} / {size}", end="\r")
+    if batch:
+        news_master.insert_many(batch, ordered=False)
+
+    # The generator writes straight to Mongo, so move the watermarks by hand
+    watermark.bump(watermark.ALL_SCOPE, *[watermark.category_scope(c.lower()) for c in categories])
+
+    profile = {
+        "created_at": datetime.now(),
+        "category_preferences": {"technology": 3, "sports": 1},
+        "liked_articles": [],
+        "shared_articles": [],
+        "reading_history": []
+    }
+    reader_id = users.insert_one({
+        **profile, "first_name": "Bench", "last_name": "Reader",
+        "email": "reader@bench.local", "role": "user"
+    }).inserted_id
+    reporter_id = users.insert_one({
+        **profile, "first_name": "Bench", "last_name": "Reporter",
+        "email": "reporter@bench.local", "role": "news_reporter"
+    }).inserted_id
+
+    try:
+        from utils import breaking
+        breaking.build()
+    except Exception as e:
+        print(f"⚠️  Could not build today_breaking_priority: {e}")
+
+    seconds = round(time.time() - started, 2)
+    print(f"✅ Seeded {size} articles in {seconds}s")
+    return {
+        "articles": size,
+        "seconds": seconds,
+        "reader_id": str(reader_id),
+        "reporter_id": str(reporter_id),
+        "query_words": sorted(word for word in query_words if len(word) > 3)[:20] or ["news"]
+    }
+
+
+# ================== SCENARIOS ==================
+class Scenario:
+    """
+    A route under load: request(client, i) issues the i-th request and
+    returns the response. session is copied into every worker's client.
+    """
+
+    def __init__(self, name, request, session=None, expected=(200, 304)):
+        self.name = name
+        self.request = request
+        self.session = session or {}
+        self.expected = set(expected)
+
+
+def build_scenarios(seeded, size):
+    from nothing import categories
+
+    slugs = [c.lower() for c in categories]
+    words = seeded["query_words"]
+    reader = {"user_id": seeded["reader_id"], "user_role": "user", "user_name": "Bench Reader"}
+    reporter = {"user_id": seeded["reporter_id"], "user_role": "news_reporter", "user_name": "Bench Reporter"}
+    last_page = max(min(size // 50, 200), 1)
+
+    # Each worker walks its own keyset cursor from the first page onwards
+    cursors = threading.local()
+
+    def cursor_walk(client, i):
+        after = getattr(cursors, "after", None)
+        response = client.get("/admin/news/data?limit=50" + (f"&after={after}" if after else ""))
+        body = response.get_json(silent=True) or {}
+        cursors.after = body.get("next_cursor")
+        return response
+
+    def submit(client, i):
+        return client.post("/reporter/submit", json={
+            "full_text": f"Benchmark report {i}: heavy rain floods several streets in the city centre.",
+            "source": "Benchmark Desk",
+            "location": {"district": "Pune", "state": "Maharashtra", "country": "India"}
+        })
+
+    scenarios = [
+        Scenario("category", lambda client, i: client.get(f"/user/dashboard/{slugs[i % len(slugs)]}")),
+        Scenario("search", lambda client, i: client.get(f"/user/dashboard/search?q={words[i % len(words)]}")),
+        Scenario("for_you", lambda client, i: client.get("/user/for_you"), session=reader),
+        Scenario("admin_dashboard", lambda client, i: client.get("/admin/dashboard")),
+        Scenario("charts", lambda client, i: client.get("/admin/news/charts/data?refresh=1")),
+        Scenario("charts_cached", lambda client, i: client.get("/admin/news/charts/data")),
+        Scenario("pagination_offset",
+                 lambda client, i: client.get(f"/admin/news/data?limit=50&page={i % last_page + 1}")),
+        Scenario("pagination_cursor", cursor_walk),
+        Scenario("submit", submit, session=reporter, expected=(202,))
+    ]
+    return {scenario.name: scenario for scenario in scenarios}
+
+
+# ================== MEASUREMENT ==================
+def percentile(sorted_values, pct):
+    """
+    Nearest-rank percentile of an already sorted list
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(pct / 100 * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def summarize(latencies, statuses, errors, elapsed):
+    latencies = sorted(latencies)
+    count = len(latencies)
+    return {
+        "requests": count,
+        "errors": errors,
+        "status_codes": {str(code): n for code, n in sorted(statuses.items())},
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(count / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": round(sum(latencies) / count, 3) if count else 0.0,
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "max_ms": round(latencies[-1], 3) if count else 0.0
+    }
+
+
+def make_client(app, scenario):
+    client = app.test_client()
+    if scenario.session:
+        with client.session_transaction() as session:
+            session.update(scenario.session)
+    return client
+
+
+def run_scenario(app, scenario, requests, concurrency, warmup):
+    """
+    Issue `requests` requests from `concurrency` threads after `warmup`
+    unmeasured ones; returns the summary dict
+    """
+    client = make_client(app, scenario)
+    for i in range(warmup):
+        scenario.request(client, i)
+
+    counter = itertools.count()
+    lock = threading.Lock()
+    latencies = []
+    statuses = Counter()
+    errors = [0]
+
+    def worker():
+        client = make_client(app, scenario)
+        local_latencies = []
+        local_statuses = Counter()
+        local_errors = 0
+        while True:
+            i = next(counter)
+            if i >= requests:
+                break
+            started = time.perf_counter()
+            try:
+                response = scenario.request(client, i)
+                status = response.status_code
+            except Exception as e:
+                print(f"❌ {scenario.name} request {i} failed: {e}")
+                status = 599
+            local_latencies.append((time.perf_counter() - started) * 1000)
+            local_statuses[status] += 1
+            if status not in scenario.expected:
+                local_errors += 1
+        with lock:
+            latencies.extend(local_latencies)
+            statuses.update(local_statuses)
+            errors[0] += local_errors
+
+    threads = [threading.Thread(target=worker, name=f"bench-{scenario.name}-{n}") for n in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    return summarize(latencies, statuses, errors[0], elapsed)
+
+
+def drain_ingest_queue(limit):
+    """
+    Run the ingest worker over the jobs queued by the submit scenario
+    """
+    from utils import ingest_worker
+    from utils.job_queue import get_queue
+
+    queue = get_queue()
+    latencies = []
+    statuses = Counter()
+    started = time.perf_counter()
+    while len(latencies) < limit:
+        job_started = time.perf_counter()
+        if not ingest_worker.run_once(queue):
+            break
+        latencies.append((time.perf_counter() - job_started) * 1000)
+        statuses["done"] += 1
+    return summarize(latencies, statuses, 0, time.perf_counter() - started)
+
+
+# ================== REPORTING ==================
+def compare(results, baseline_path, fail_over=None):
+    """
+    Print per-scenario deltas against a previous results file; returns the
+    scenarios whose p95 grew by more than fail_over percent
+    """
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+
+    regressions = []
+    print(f"\n📊 Compared with {baseline_path} ({baseline['meta'].get('git_commit')})")
+    print(f"   {'scenario':<20}{'p50 ms':>18}{'p95 ms':>18}{'p99 ms':>18}{'req/s':>18}")
+    for name, current in results["scenarios"].items():
+        previous = baseline["scenarios"].get(name)
+        if not previous:
+            print(f"   {name:<20}{'(new)':>18}")
+            continue
+
+        cells = []
+        for key in ("p50_ms", "p95_ms", "p99_ms", "throughput_rps"):
+            before, after = previous.get(key, 0), current.get(key, 0)
+            delta = (after - before) / before * 100 if before else 0.0
+            cells.append(f"{after:>9.2f} ({delta:+6.1f}%)")
+            if key == "p95_ms" and fail_over is not None and delta > fail_over:
+                regressions.append(name)
+        print(f"   {name:<20}" + "".join(f"{cell:>18}" for cell in cells))
+    return regressions
+
+
+def write_results(results, output=None):
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        meta = results["meta"]
+        stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+        output = os.path.join(RESULTS_DIR, f"{meta['size']}-{meta['backend']}-{stamp}.json")
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    return output
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Benchmark the Flask routes against a local Mongo stand-in')
+    parser.add_argument('--size', default='1k', help='Corpus size: 1k, 100k, 1m or a number of articles')
+    parser.add_argument('--mongo-uri', help='Local mongod to use instead of mongomock (bench databases are dropped)')
+    parser.add_argument('--requests', type=int, default=200, help='Measured requests per scenario')
+    parser.add_argument('--warmup', type=int, default=20, help='Unmeasured requests per scenario')
+    parser.add_argument('--concurrency', type=int, default=4, help='Client threads per scenario')
+    parser.add_argument('--scenarios', default=','.join(SCENARIO_NAMES), help='Comma-separated scenarios to run')
+    parser.add_argument('--drain', action='store_true', help='Also time the ingest worker on the submitted jobs')
+    parser.add_argument('--stub-latency', type=float, default=0.0, help='Seconds each stubbed provider call takes')
+    parser.add_argument('--output', help='Results file (default: benchmarks/results/<size>-<backend>-<time>.json)')
+    parser.add_argument('--compare', help='Previous results file to diff against')
+    parser.add_argument('--fail-over', type=float, help='Exit non-zero if any p95 grew by more than this percent')
+
+    args = parser.parse_args()
+    size = parse_size(args.size)
+
+    backend, scratch_dir = configure_backend(args.mongo_uri, args.stub_latency)
+    print(f"🚀 Benchmarking against {backend} with {size} articles (scratch dir {scratch_dir})")
+    seeded = seed(size)
+
+    from app import app
+    from utils import text_index
+    app.config['TESTING'] = True
+    # Build the keyword index up front instead of timing its first build
+    text_index.get_index()
+
+    scenarios = build_scenarios(seeded, size)
+    results = {
+        "meta": {
+            "git_commit": git_commit(),
+            "created_at": datetime.utcnow().isoformat() + "Z",
+            "backend": backend,
+            "size": size,
+            "requests": args.requests,
+            "warmup": args.warmup,
+            "concurrency": args.concurrency,
+            "stub_latency": args.stub_latency,
+            "python": platform.python_version(),
+            "platform": platform.platform()
+        },
+        "seed": {key: seeded[key] for key in ("articles", "seconds")},
+        "scenarios": {}
+    }
+
+    for name in [n.strip() for n in args.scenarios.split(',') if n.strip()]:
+        if name not in scenarios:
+            print(f"⚠️  Unknown scenario: {name}")
+            continue
+        summary = run_scenario(app, scenarios[name], args.requests, args.concurrency, args.warmup)
+        results["scenarios"][name] = summary
+        print(f"   {name:<20} {summary['throughput_rps']:>9.1f} req/s  "
+              f"p50 {summary['p50_ms']:.1f}ms  p95 {summary['p95_ms']:.1f}ms  "
+              f"p99 {summary['p99_ms']:.1f}ms  errors {summary['errors']}")
+
+    if args.drain and "submit" in results["scenarios"]:
+        results["scenarios"]["ingest_worker"] = drain_ingest_queue(args.requests + args.warmup)
+        print(f"   {'ingest_worker':<20} {results['scenarios']['ingest_worker']['throughput_rps']:>9.1f} jobs/s")
+
+    output = write_results(results, args.output)
+    print(f"✅ Results written to {output}")
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.fail_over)
+        if regressions:
+            print(f"❌ p95 regressed by more than {args.fail_over}% in: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
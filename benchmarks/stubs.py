@@ -0,0 +1,123 @@
+"""
+Stand-ins for the external services the app calls.
+
+Benchmarks should time our own code and Mongo, not Pinecone, Groq,
+DuckDuckGo or NewsAPI. install() points the app at a scratch directory,
+replaces the Pinecone client before `app` is imported and swaps the
+evidence providers in utils.reporter_ingest for canned answers. Each stub
+sleeps for `latency` seconds so slow providers can be simulated.
+"""
+
+import os
+import sys
+import tempfile
+import time
+import types
+
+STUB_LATENCY = float(os.getenv('BENCH_STUB_LATENCY', 0.0))
+
+
+def _pause(latency):
+    if latency:
+        time.sleep(latency)
+
+
+class FakeAssistant:
+    def __init__(self, latency=STUB_LATENCY):
+        self.latency = latency
+
+    def chat(self, messages=None, **kwargs):
+        _pause(self.latency)
+        return {"message": {"content": "This is a benchmark reply."}}
+
+
+class FakePinecone:
+    """
+    Enough of pinecone.Pinecone for app.py: pc.assistant.Assistant(...)
+    """
+
+    latency = STUB_LATENCY
+
+    def __init__(self, api_key=None, **kwargs):
+        self.assistant = types.SimpleNamespace(
+            Assistant=lambda assistant_name=None, **kw: FakeAssistant(self.latency)
+        )
+
+
+def install_environment(scratch_dir=None):
+    """
+    Environment the app needs at import time; returns the scratch directory
+    """
+    scratch_dir = scratch_dir or tempfile.mkdtemp(prefix="newsbench-")
+    os.environ.setdefault('MONGO_URI', 'mongodb://localhost:27017/')
+    os.environ.setdefault('SECRET_KEY', 'benchmark-secret-key')
+    os.environ.setdefault('PINECONE_API_KEY', 'benchmark-pinecone-key')
+    os.environ.setdefault('GROQ_API_KEY', '')
+    os.environ.setdefault('NEWS_API_KEY', 'benchmark-newsapi-key')
+    # Indexes, snapshots and the job queue live in the scratch directory
+    os.environ['INGEST_QUEUE_BACKEND'] = 'local'
+    os.environ['INGEST_QUEUE_PATH'] = os.path.join(scratch_dir, 'ingest_queue.db')
+    os.environ['TEXT_INDEX_PATH'] = os.path.join(scratch_dir, 'text_index.npz')
+    os.environ['VECTOR_INDEX_DIR'] = os.path.join(scratch_dir, 'vector_index')
+    return scratch_dir
+
+
+def install_pinecone(latency=STUB_LATENCY):
+    """
+    Make `from pinecone import Pinecone` return FakePinecone
+    """
+    FakePinecone.latency = latency
+    try:
+        import pinecone
+    except ImportError:
+        pinecone = types.ModuleType("pinecone")
+        sys.modules["pinecone"] = pinecone
+    pinecone.Pinecone = FakePinecone
+
+
+def install_providers(latency=STUB_LATENCY):
+    """
+    Replace DuckDuckGo, NewsAPI and Groq in utils.reporter_ingest
+    """
+    from utils import reporter_ingest
+
+    def search_duckduckgo(full_text):
+        _pause(latency)
+        return 2, [
+            {"title": "Reuters: related coverage", "url": "https://www.reuters.com/benchmark"},
+            {"title": "BBC: related coverage", "url": "https://www.bbc.com/benchmark"}
+        ]
+
+    def search_newsapi(full_text):
+        _pause(latency)
+        return 1, [{"title": "Related article", "url": "https://newsapi.org/benchmark"}]
+
+    def call_groq(text):
+        _pause(latency)
+        return {
+            "headline": text[:60],
+            "summary": text[:200],
+            "district": "",
+            "state": "",
+            "country": "India",
+            "category": "general",
+            "credibility": 0.8,
+            "fake_prob": 0.1
+        }
+
+    reporter_ingest.search_duckduckgo = search_duckduckgo
+    reporter_ingest.search_newsapi = search_newsapi
+    reporter_ingest._call_groq = call_groq
+    reporter_ingest.DUCKDUCKGO_AVAILABLE = True
+    reporter_ingest.REQUESTS_AVAILABLE = True
+    reporter_ingest.GROQ_AVAILABLE = True
+
+
+def install(latency=STUB_LATENCY, scratch_dir=None):
+    """
+    Install every stub; call before importing `app`
+    """
+    scratch_dir = install_environment(scratch_dir)
+    install_pinecone(latency)
+    install_providers(latency)
+    return scratch_dir
@@ -4,6 +4,7 @@ This file contains production-specific settings and configurations.
 """
 
 import os
+import logging
 from datetime import timedelta
 
 
@@ -12,8 +13,6 @@ class ProductionConfig:
     
     # Application Settings
     SECRET_KEY = os.getenv('SECRET_KEY')
-    if not SECRET_KEY:
-        raise ValueError("SECRET_KEY environment variable is required in production")
     
     # Flask Settings
     FLASK_ENV = 'production'
@@ -27,8 +26,6 @@ class ProductionConfig:
     
     # Database Settings
     MONGO_URI = os.getenv('MONGO_URI')
-    if not MONGO_URI:
-        raise ValueError("MONGO_URI environment variable is required in production")
     
     DB_NAME = os.getenv('DB_NAME', 'pslvnews')
     NEWS_DB_NAME = os.getenv('NEWS_DB_NAME', 'newsai_db')
@@ -114,11 +111,17 @@ class ProductionConfig:
     @staticmethod
     def init_app(app):
         """Initialize the application with production settings."""
+        # Checked here rather than at import so the other configs can be
+        # imported without production secrets
+        if not app.config.get('SECRET_KEY'):
+            raise ValueError("SECRET_KEY environment variable is required in production")
+        if not app.config.get('MONGO_URI'):
+            raise ValueError("MONGO_URI environment variable is required in production")
+        
         # Ensure log directory exists
         ProductionConfig.ensure_log_directory()
         
         # Configure logging
-        import logging
         from logging.handlers import RotatingFileHandler
         
         if not app.debug:
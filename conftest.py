@@ -56,6 +56,18 @@ def database():
     client.close()
 
 
+@pytest.fixture
+def mongo():
+    """Point utils.db at an in-memory mongomock client for one test."""
+    import mongomock
+    from utils import db
+
+    client = mongomock.MongoClient()
+    db.set_client(client)
+    yield client
+    db.set_client(None)
+
+
 @pytest.fixture
 def sample_user_data():
     """Sample user data for testing."""
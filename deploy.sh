@@ -122,7 +122,7 @@ check_env_vars() {
 # Setup database indexes
 setup_database() {
     log "Setting up database indexes..."
-    python3 setup_search_indexes.py --setup
+    python3 -m utils.indexes --migrate
     log "Database setup completed"
 }
 
@@ -0,0 +1,29 @@
+"""
+Gunicorn settings shared by the Procfile, Dockerfile and deploy.sh; gunicorn
+reads ./gunicorn.conf.py on its own, command-line flags still win.
+
+Workers write Prometheus samples to PROMETHEUS_MULTIPROC_DIR so /metrics can
+report all of them together (see utils/instrumentation.py).
+"""
+
+import os
+import shutil
+
+PROMETHEUS_MULTIPROC_DIR = os.environ.setdefault(
+    'PROMETHEUS_MULTIPROC_DIR', os.path.join('/tmp', 'news_app_metrics')
+)
+
+
+def on_starting(server):
+    # Samples left by a previous run would be added to this one's
+    shutil.rmtree(PROMETHEUS_MULTIPROC_DIR, ignore_errors=True)
+    os.makedirs(PROMETHEUS_MULTIPROC_DIR, exist_ok=True)
+
+
+def child_exit(server, worker):
+    # Drop the live gauges of workers that exited (e.g. --max-requests recycling)
+    try:
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
+    except ImportError:
+        pass
@@ -14,9 +14,6 @@ MONGO_URI = os.getenv('MONGO_URI')
 DB_NAME = os.getenv('DB_NAME', 'pslvnews')
 COLLECTION_NAME = "news"
 TOTAL_NEWS = 1000
-
-if not MONGO_URI:
-    raise ValueError("MONGO_URI environment variable is required")
 # ==================================================
 
 fake = Faker()
@@ -49,21 +46,17 @@ sentiments = ["positive", "neutral", "negative"]
 statuses = ["monitoring", "verified", "flagged"]
 sources = ["whatsapp", "twitter", "facebook", "news", "telegram"]
 
-# Mongo connection
-client = MongoClient(MONGO_URI)
-db = client[DB_NAME]
-collection = db[COLLECTION_NAME]
-
 # Date range (1 year including 29 Dec 2025)
 today = datetime(2025, 12, 29)
-start_date = today - timedelta(days=364)
 
-documents = []
 
-for _ in range(TOTAL_NEWS):
+def make_news_document(end_date=today):
+    """
+    One synthetic news_master document published in the year up to end_date
+    """
     # Random date within the year
     random_offset = random.randint(0, 364)
-    date = start_date + timedelta(days=random_offset)
+    date = end_date - timedelta(days=364) + timedelta(days=random_offset)
 
     category = random.choice(categories)
 
@@ -111,10 +104,31 @@ for _ in range(TOTAL_NEWS):
         ]
     }
 
-    documents.append(doc)
+    return doc
+
+
+def generate_news(total, seed=None, end_date=today):
+    """
+    Yield `total` synthetic documents; a seed makes the corpus reproducible
+    """
+    if seed is not None:
+        random.seed(seed)
+        Faker.seed(seed)
+    for _ in range(total):
+        yield make_news_document(end_date)
+
+
+if __name__ == "__main__":
+    if not MONGO_URI:
+        raise ValueError("MONGO_URI environment variable is required")
+
+    # Mongo connection
+    client = MongoClient(MONGO_URI)
+    db = client[DB_NAME]
+    collection = db[COLLECTION_NAME]
 
-# Insert all documents
-collection.insert_many(documents)
+    # Insert all documents
+    collection.insert_many(list(generate_news(TOTAL_NEWS)))
 
-print(f"✅ Successfully inserted {TOTAL_NEWS} news documents into MongoDB!")
+    print(f"✅ Successfully inserted {TOTAL_NEWS} news documents into MongoDB!")
 
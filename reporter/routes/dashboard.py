@@ -1,6 +1,9 @@
 from flask import render_template, session, redirect, url_for, flash
 from .. import reporter_bp
 from ..utils.validator import InputValidator
+from utils.db import news_collection
+
+news_master = news_collection("news_master")
 
 @reporter_bp.route('/dashboard')
 def reporter_dashboard():
@@ -18,12 +21,6 @@ def reporter_dashboard():
     
     # Get recent submissions count for dashboard
     try:
-        client = MongoClient(
-            MONGO_URI
-        )
-        db = client.newsai_db
-        news_master = db.news_master
-        
         reporter_id = session.get('user_id')
         recent_submissions = list(
             news_master
@@ -36,8 +33,6 @@ def reporter_dashboard():
         for submission in recent_submissions:
             submission["_id"] = str(submission["_id"])
         
-        client.close()
-        
         return render_template('reporter/reporter_dashboard_new.html', recent_submissions=recent_submissions)
         
     except Exception as e:
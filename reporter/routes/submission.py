@@ -1,16 +1,15 @@
 import os
-import sys
 import json
 from datetime import datetime
 from flask import request, jsonify, session, flash, redirect, url_for, render_template
-from pymongo import MongoClient
 from .. import reporter_bp
 from ..utils.validator import InputValidator
 from ..utils.file_handler import FileHandler
+from utils.db import news_collection
+from utils.job_queue import get_queue, DONE, FAILED
+from utils.ingest_worker import enqueue_submission
 
-# Add the utils directory to the path to import reporter_ingest
-sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'utils'))
-from reporter_ingest import run_agent, get_sentiment, remove_emojis, now_utc, is_famous
+news_master = news_collection("news_master")
 
 @reporter_bp.route('/submit', methods=['POST'])
 def submit_news():
@@ -75,86 +74,34 @@ def submit_news():
             if vid_path and vid_path.startswith('static/videos/'):
                 associate_media["videos"].append(vid_path)
         
-        # Use existing reporter_ingest logic
+        # Enrichment (sentiment, search, LLM) runs in the ingest worker;
+        # the reporter polls the status endpoint for the outcome
         try:
-            # Get sentiment
-            sentiment_data = get_sentiment(full_text)
-            
-            # Get AI analysis
-            agent_data, evidence_sources = run_agent(full_text)
-            
-            # Determine status and credibility
-            published_at = now_utc().isoformat()
-            
-            if is_famous(source):
-                status = "verified"
-                credibility = 1.0
-                fake_prob = 0.0
-            else:
-                status = "monitoring"
-                credibility = agent_data.get("credibility", 0.5)
-                fake_prob = agent_data.get("fake_prob", 0.5)
-            
-            # Construct MongoDB document using existing schema
-            doc = {
-                "title": agent_data.get("headline", full_text[:50]),
-                "content": agent_data.get("summary", full_text),
+            job_id = enqueue_submission({
                 "full_text": full_text,
                 "source": source,
-                "publishedAt": published_at,
-                "date": published_at[:10],
-                "week": datetime.fromisoformat(published_at).isocalendar()[1],
-                "month": datetime.fromisoformat(published_at).month,
-                "year": datetime.fromisoformat(published_at).year,
-                "category": agent_data.get("category", "general"),
-                "credibility": credibility,
-                "fake_prob": fake_prob,
-                "summary": agent_data.get("summary", full_text[:150]),
-                "time": published_at[11:19],
-                "status": status,
-                "associateMedia": associate_media,
                 "location": {
                     "district": district,
                     "state": state,
                     "country": country
                 },
-                "sentiment": sentiment_data["sentiment"],
+                "associate_media": associate_media,
                 "reporter_id": session.get('user_id'),
-                "reporter_name": session.get('user_name', 'Unknown'),
-                "created_at": now_utc(),
-                "evidence_sources": evidence_sources
-            }
-            
-            # Connect to MongoDB and insert
-            client = MongoClient(
-                        MONGO_URI
-                    )
-            db = client.newsai_db
-            news_master = db.news_master
-            
-            # Insert document
-            result = news_master.insert_one(doc)
-            doc["_id"] = str(result.inserted_id)
-            
-            # Close database connection
-            client.close()
+                "reporter_name": session.get('user_name', 'Unknown')
+            })
             
             return jsonify({
                 'success': True,
-                'message': 'News submitted successfully',
-                'document_id': doc["_id"],
-                'title': doc["title"],
-                'status': doc["status"],
-                'category': doc["category"],
-                'credibility': doc["credibility"],
-                'fake_prob': doc["fake_prob"],
-                'doc': doc
-            })
+                'message': 'News accepted for processing',
+                'job_id': job_id,
+                'status': 'queued',
+                'status_url': url_for('reporter.submission_status', job_id=job_id)
+            }), 202
             
         except Exception as e:
             return jsonify({
                 'success': False,
-                'error': f'AI processing failed: {str(e)}'
+                'error': f'Could not queue submission: {str(e)}'
             }), 500
         
     except Exception as e:
@@ -163,6 +110,43 @@ def submit_news():
             'error': f'Submission failed: {str(e)}'
         }), 500
 
+@reporter_bp.route('/submit/status/<job_id>', methods=['GET'])
+def submission_status(job_id):
+    """Poll the processing status of a queued submission"""
+    # Check authentication
+    session_valid, session_message = InputValidator.validate_user_session(session)
+    if not session_valid:
+        return jsonify({'success': False, 'error': session_message}), 401
+    
+    try:
+        job = get_queue().get(job_id)
+        
+        # Reporters only see their own jobs
+        if not job or job["payload"].get("reporter_id") != session.get('user_id'):
+            return jsonify({'success': False, 'error': 'Submission not found'}), 404
+        
+        response = {
+            'success': True,
+            'job_id': job_id,
+            'status': job["status"],
+            'attempts': job["attempts"]
+        }
+        
+        if job["status"] == DONE:
+            response.update(job["result"])
+            response['status'] = 'done'
+            response['article_status'] = job["result"].get("status")
+        elif job["status"] == FAILED:
+            response['error'] = job["error"]
+        
+        return jsonify(response)
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Failed to fetch submission status: {str(e)}'
+        }), 500
+
 @reporter_bp.route('/submissions', methods=['GET'])
 def get_submissions():
     """Get submissions by the current reporter"""
@@ -172,13 +156,6 @@ def get_submissions():
         return jsonify({'success': False, 'error': session_message}), 401
     
     try:
-        # Connect to MongoDB
-        client = MongoClient(
-                MONGO_URI
-        )
-        db = client.newsai_db
-        news_master = db.news_master
-        
         # Get submissions by reporter
         reporter_id = session.get('user_id')
         submissions = list(
@@ -194,8 +171,6 @@ def get_submissions():
             # Remove MongoDB-specific fields
             submission.pop("_id", None)
         
-        client.close()
-        
         return render_template('reporter/submissions_new.html', submissions=submissions)
         
     except Exception as e:
@@ -212,13 +187,6 @@ def get_submissions_api():
         return jsonify({'success': False, 'error': session_message}), 401
     
     try:
-        # Connect to MongoDB
-        client = MongoClient(
-                MONGO_URI
-        )
-        db = client.newsai_db
-        news_master = db.news_master
-        
         # Get submissions by reporter
         reporter_id = session.get('user_id')
         submissions = list(
@@ -234,8 +202,6 @@ def get_submissions_api():
             # Remove MongoDB-specific fields
             submission.pop("_id", None)
         
-        client.close()
-        
         return jsonify({
             'success': True,
             'submissions': submissions,
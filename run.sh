@@ -41,9 +41,9 @@ except Exception as e:
     print('📝 Please check your MongoDB connection string')
 "
 
-# Setup search indexes
-echo "🔧 Setting up search indexes..."
-python3 setup_search_indexes.py --setup
+# Apply index migrations
+echo "🔧 Applying index migrations..."
+python3 -m utils.indexes --migrate
 
 echo "🎉 Setup complete!"
 echo ""
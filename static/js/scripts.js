@@ -651,12 +651,12 @@ function likeNews(newsId) {
         
         console.log(`Liked article ${newsId}. New count: ${currentCount}`);
         
-        // In a real app, you would make an API call here:
-        // fetch('/api/like-news', {
-        //     method: 'POST',
-        //     headers: {'Content-Type': 'application/json'},
-        //     body: JSON.stringify({newsId: newsId})
-        // });
+        // Recorded server-side in batches; the count above is optimistic
+        fetch('/api/like-news', {
+            method: 'POST',
+            headers: {'Content-Type': 'application/json'},
+            body: JSON.stringify({newsId: newsId})
+        }).catch(err => console.error('Failed to record like:', err));
     }
 }
 
@@ -693,12 +693,12 @@ function saveNews(newsId) {
             console.log(`Saved article ${newsId}`);
         }
         
-        // In a real app, you would make an API call here:
-        // fetch('/api/save-news', {
-        //     method: 'POST',
-        //     headers: {'Content-Type': 'application/json'},
-        //     body: JSON.stringify({newsId: newsId, action: isSaved ? 'unsave' : 'save'})
-        // });
+        // Recorded server-side in batches
+        fetch('/api/save-news', {
+            method: 'POST',
+            headers: {'Content-Type': 'application/json'},
+            body: JSON.stringify({newsId: newsId, action: isSaved ? 'unsave' : 'save'})
+        }).catch(err => console.error('Failed to record save:', err));
     }
 }
 
@@ -742,12 +742,12 @@ function shareNews(newsId) {
         
         console.log(`Shared article ${newsId}`);
         
-        // In a real app, you would make an API call here:
-        // fetch('/api/share-news', {
-        //     method: 'POST',
-        //     headers: {'Content-Type': 'application/json'},
-        //     body: JSON.stringify({newsId: newsId})
-        // });
+        // Recorded server-side in batches
+        fetch('/api/share-news', {
+            method: 'POST',
+            headers: {'Content-Type': 'application/json'},
+            body: JSON.stringify({newsId: newsId})
+        }).catch(err => console.error('Failed to record share:', err));
     }
 }
 
@@ -0,0 +1,80 @@
+"""Likes are counted once per reader, across flushes and failed flushes."""
+
+import pytest
+from bson import ObjectId
+
+from utils import engagement
+from utils.db import get_db, get_news_db
+from utils.engagement import LIKE, EngagementBuffer
+
+
+@pytest.fixture
+def buffer(mongo, monkeypatch):
+    """A buffer flushed by the test instead of a background thread."""
+    buffer = EngagementBuffer()
+    monkeypatch.setattr(buffer, "_ensure_thread", lambda: None)
+    return buffer
+
+
+@pytest.fixture
+def article(mongo):
+    news_id = get_news_db()["news_master"].insert_one({"title": "Article", "likes": 0}).inserted_id
+    return str(news_id)
+
+
+@pytest.fixture
+def reader(mongo):
+    user_id = get_db()["users"].insert_one({"email": "reader@example.com"}).inserted_id
+    return str(user_id)
+
+
+def likes(news_id):
+    return get_news_db()["news_master"].find_one({"_id": ObjectId(news_id)})["likes"]
+
+
+class FailingOnce:
+    """Stands in for a collection whose first bulk_write raises."""
+
+    def __init__(self, collection):
+        self.collection = collection
+        self.failed = False
+
+    def bulk_write(self, *args, **kwargs):
+        if not self.failed:
+            self.failed = True
+            raise RuntimeError("connection reset")
+        return self.collection.bulk_write(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.collection, name)
+
+
+def test_duplicate_like_is_counted_once(buffer, article, reader):
+    buffer.record(LIKE, article, reader, reader)
+    buffer.record(LIKE, article, reader, reader)
+    assert buffer.flush() == 1
+
+    # The same reader again, in a later flush
+    buffer.record(LIKE, article, reader, reader)
+    buffer.flush()
+
+    assert likes(article) == 1
+    marker = get_news_db()["engagement_events"].find_one({"_id": f"{LIKE}:{reader}:{article}"})
+    assert marker["applied"]
+
+
+def test_failed_profile_write_does_not_recount_the_like(buffer, article, reader, monkeypatch):
+    users = FailingOnce(get_db()["users"])
+    monkeypatch.setattr(engagement, "users", users)
+
+    buffer.record(LIKE, article, reader, reader)
+    buffer.flush()
+    assert users.failed
+    # The counter landed before the profile write failed; the click is retried
+    assert likes(article) == 1
+    assert buffer.pending() == 1
+
+    buffer.flush()
+    assert buffer.pending() == 0
+    assert likes(article) == 1
+    assert get_db()["users"].find_one({"_id": ObjectId(reader)})["liked_articles"] == [article]
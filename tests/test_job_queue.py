@@ -0,0 +1,51 @@
+"""Leases of the SQLite ingest queue."""
+
+import pytest
+
+from utils import job_queue
+from utils.job_queue import DONE, FAILED, RUNNING, LocalJobQueue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    """A fresh queue file per test."""
+    return LocalJobQueue(str(tmp_path / "ingest_queue.db"))
+
+
+def test_claimed_job_is_not_handed_out_twice(queue):
+    job_id = queue.enqueue("article", {"title": "Article"})
+
+    job = queue.claim()
+    assert job["id"] == job_id
+    assert job["attempts"] == 1
+    assert queue.claim() is None
+    assert queue.get(job_id)["status"] == RUNNING
+
+
+def test_expired_lease_is_claimed_again(queue, monkeypatch):
+    # Leases run out as soon as they are granted
+    monkeypatch.setattr(job_queue, "LEASE_SECONDS", -1)
+    job_id = queue.enqueue("article", {"title": "Article"})
+
+    assert queue.claim()["attempts"] == 1
+    job = queue.claim()
+    assert job["id"] == job_id
+    assert job["attempts"] == 2
+
+    queue.complete(job_id, {"news_id": "abc"})
+    assert queue.claim() is None
+    assert queue.get(job_id)["status"] == DONE
+
+
+def test_expired_lease_on_last_attempt_fails_the_job(queue, monkeypatch):
+    monkeypatch.setattr(job_queue, "LEASE_SECONDS", -1)
+    monkeypatch.setattr(job_queue, "MAX_ATTEMPTS", 2)
+    job_id = queue.enqueue("article", {"title": "Article"})
+
+    assert queue.claim()["attempts"] == 1
+    assert queue.claim()["attempts"] == 2
+    assert queue.claim() is None
+
+    job = queue.get(job_id)
+    assert job["status"] == FAILED
+    assert job["error"] == "Lease expired on the last attempt"
@@ -0,0 +1,64 @@
+"""Keyset paging over (publishedAt, _id) with articles missing publishedAt."""
+
+import pytest
+from bson import ObjectId
+
+from admin.models.queries import keyset_page
+from utils.db import get_news_db
+
+
+@pytest.fixture
+def articles(mongo):
+    """Seven articles: a tie on publishedAt, two nulls and one without the field."""
+    collection = get_news_db()["news_master"]
+    published = [
+        "2025-01-03T00:00:00Z", "2025-01-02T00:00:00Z", "2025-01-02T00:00:00Z",
+        "2025-01-01T00:00:00Z", None, None
+    ]
+    docs = [{"_id": ObjectId(), "title": "Article", "publishedAt": value} for value in published]
+    docs.append({"_id": ObjectId(), "title": "Article"})
+    collection.insert_many(docs)
+
+    # (publishedAt desc, _id desc), undated articles last
+    dated = sorted((d for d in docs if d.get("publishedAt")), key=lambda d: (d["publishedAt"], d["_id"]), reverse=True)
+    undated = sorted((d for d in docs if not d.get("publishedAt")), key=lambda d: d["_id"], reverse=True)
+    return collection, [d["_id"] for d in dated + undated]
+
+
+def test_forward_pages_cover_every_article_once(articles):
+    collection, expected = articles
+    seen = []
+    page = keyset_page(collection, {}, "publishedAt", limit=2)
+    assert not page["has_prev"]
+    while True:
+        seen.extend(doc["_id"] for doc in page["items"])
+        if not page["has_next"]:
+            break
+        page = keyset_page(collection, {}, "publishedAt", limit=2, after=page["next_cursor"])
+        assert page["has_prev"]
+    assert seen == expected
+
+
+def test_backward_pages_retrace_forward_pages(articles):
+    collection, expected = articles
+    forward = [keyset_page(collection, {}, "publishedAt", limit=2)]
+    while forward[-1]["has_next"]:
+        forward.append(keyset_page(collection, {}, "publishedAt", limit=2, after=forward[-1]["next_cursor"]))
+
+    page = forward[-1]
+    for previous in reversed(forward[:-1]):
+        page = keyset_page(collection, {}, "publishedAt", limit=2, before=page["prev_cursor"])
+        assert [doc["_id"] for doc in page["items"]] == [doc["_id"] for doc in previous["items"]]
+        assert page["has_next"]
+    assert not page["has_prev"]
+
+
+def test_cursor_inside_undated_group(articles):
+    collection, expected = articles
+    # The first page ends on the newest undated article
+    page = keyset_page(collection, {}, "publishedAt", limit=10,
+                       after=keyset_page(collection, {}, "publishedAt", limit=5)["next_cursor"])
+    assert [doc["_id"] for doc in page["items"]] == expected[5:]
+
+    page = keyset_page(collection, {}, "publishedAt", limit=10, before=page["prev_cursor"])
+    assert [doc["_id"] for doc in page["items"]] == expected[:5]
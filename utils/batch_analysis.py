@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Bulk news verification.
+
+analyze_batch() takes many texts at once (partner desks forward hundreds an
+hour) and:
+  1. collapses texts that are identical after normalization, so each one is
+     analyzed once however often it was forwarded,
+  2. scores sentiment for all of them in one get_sentiments() call,
+  3. runs analyze_text() (near-duplicate reuse, evidence search, LLM) for the
+     distinct texts on a bounded pool of BATCH_ANALYSIS_WORKERS threads,
+and yields each input's result as soon as its analysis finishes.
+
+Texts are handed to the pool a window at a time, so a client that drops a
+streamed batch leaves at most one window of work behind, and that is
+cancelled when the generator is closed.
+
+The pool is sized so that every worker's evidence providers fit in the
+shared evidence pool at once; a bigger batch queues for longer instead of
+pushing providers past their deadlines.
+
+Analyze a file with one text per line:
+    python -m utils.batch_analysis forwards.txt
+"""
+
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from utils.reporter_ingest import (
+    analyze_text, get_sentiments, normalize_text, remove_emojis,
+    EVIDENCE_POOL_SIZE, PROVIDER_TIMEOUTS
+)
+
+BATCH_MAX_ITEMS = int(os.getenv('BATCH_ANALYSIS_MAX_ITEMS', 500))
+BATCH_MAX_CHARS = int(os.getenv('BATCH_ANALYSIS_MAX_CHARS', 5000))
+BATCH_WORKERS = int(os.getenv(
+    'BATCH_ANALYSIS_WORKERS', max(EVIDENCE_POOL_SIZE // len(PROVIDER_TIMEOUTS), 1)
+))
+# Distinct texts in flight per batch; enough to keep every worker busy
+BATCH_WINDOW = int(os.getenv('BATCH_ANALYSIS_WINDOW', BATCH_WORKERS * 2))
+
+_batch_pool = ThreadPoolExecutor(max_workers=BATCH_WORKERS, thread_name_prefix="batch-analysis")
+
+
+def _analyze(text, sentiment_data):
+    try:
+        return analyze_text(text, sentiment_data=sentiment_data)
+    except Exception as e:
+        print(f"Batch analysis failed: {e}")
+        return {"error": str(e)}
+
+
+def analyze_batch(texts):
+    """
+    Analyze many texts; yields (indices, analysis) as each distinct text
+    finishes, where indices are the positions in `texts` sharing that
+    result and analysis is analyze_text()'s dict, or {"error": ...}
+    """
+    # Normalized text -> positions in the batch, first occurrence first
+    groups = {}
+    for index, text in enumerate(texts):
+        clean_text = remove_emojis(text)[:BATCH_MAX_CHARS]
+        groups.setdefault(normalize_text(clean_text), (clean_text, []))[1].append(index)
+
+    unique = list(groups.values())
+    if not unique:
+        return
+
+    sentiments = get_sentiments([clean_text for clean_text, _ in unique])
+
+    pending = iter(zip(unique, sentiments))
+    futures = {}
+    try:
+        while True:
+            for (clean_text, indices), sentiment in pending:
+                futures[_batch_pool.submit(_analyze, clean_text, sentiment)] = indices
+                if len(futures) >= BATCH_WINDOW:
+                    break
+            if not futures:
+                return
+
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield futures.pop(future), future.result()
+    finally:
+        # Reached when the consumer stops early (e.g. the client disconnected)
+        for future in futures:
+            future.cancel()
+
+
+def unique_count(texts):
+    return len({normalize_text(remove_emojis(text)[:BATCH_MAX_CHARS]) for text in texts})
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description='Analyze a file of news texts, one per line')
+    parser.add_argument('path', help='Text file with one news item per line')
+
+    args = parser.parse_args()
+
+    with open(args.path, encoding="utf-8") as f:
+        texts = [line.strip() for line in f if line.strip()]
+
+    started = time.time()
+    print(f"🚀 Analyzing {len(texts)} texts ({unique_count(texts)} distinct) with {BATCH_WORKERS} workers")
+    for indices, analysis in analyze_batch(texts):
+        agent_data = analysis.get("agent_data", {})
+        print(json.dumps({
+            "indices": indices,
+            "headline": agent_data.get("headline"),
+            "credibility": agent_data.get("credibility"),
+            "fake_prob": agent_data.get("fake_prob"),
+            "error": analysis.get("error")
+        }))
+    print(f"✅ Done in {time.time() - started:.1f}s")
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Builder for the `today_breaking_priority` collection behind the breaking
+news pages.
+
+Scores the last BREAKING_WINDOW_HOURS of news_master on recency,
+credibility, fake_prob, source fame (FAMOUS_SOURCES) and engagement, keeps
+the best BREAKING_SIZE articles and swaps them in atomically: they are
+written, newest publishedAt first, into a capped temporary collection with a
+publishedAt index, which is then renamed over the live one. Readers see
+either the old set or the new one, never a partial build.
+
+Run once, or on a schedule (the Procfile `beat` process):
+    python -m utils.breaking
+    python -m utils.breaking --loop --interval 300
+"""
+
+import math
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+from pymongo import DESCENDING
+
+from utils.db import get_news_db, news_collection
+from utils.feed import CARD_PROJECTION
+from utils.ranking import unit_score
+from utils.reporter_ingest import is_famous
+from utils import watermark
+
+news_master = news_collection("news_master")
+
+BREAKING_COLLECTION = "today_breaking_priority"
+BREAKING_SIZE = int(os.getenv('BREAKING_SIZE', 100))
+BREAKING_WINDOW_HOURS = int(os.getenv('BREAKING_WINDOW_HOURS', 24))
+BREAKING_CANDIDATES = int(os.getenv('BREAKING_CANDIDATES', 5000))
+BREAKING_INTERVAL = int(os.getenv('BREAKING_INTERVAL', 300))
+BREAKING_HALF_LIFE_HOURS = float(os.getenv('BREAKING_HALF_LIFE_HOURS', 6))
+
+# Capped collection size; comfortably above BREAKING_SIZE trimmed cards
+BREAKING_MAX_BYTES = 16 * 1024 * 1024
+
+WEIGHTS = {
+    "recency": 0.35,
+    "credibility": 0.25,
+    "authenticity": 0.20,
+    "fame": 0.10,
+    "engagement": 0.10
+}
+
+CANDIDATE_PROJECTION = {
+    **CARD_PROJECTION,
+    "source": 1,
+    "shares": 1,
+    "status": 1,
+    "summary": 1
+}
+
+
+def _age_hours(doc, now):
+    created = doc.get("created_at")
+    if isinstance(created, datetime):
+        if created.tzinfo is None:
+            created = created.replace(tzinfo=timezone.utc)
+        return max((now - created).total_seconds() / 3600, 0.0)
+    return float(BREAKING_WINDOW_HOURS)
+
+
+def score_articles(docs, now=None):
+    """
+    Attach a priority_score to each candidate; returns the docs
+    """
+    now = now or datetime.now(timezone.utc)
+    engagement = [math.log1p((doc.get("likes") or 0) + 2 * (doc.get("shares") or 0)) for doc in docs]
+    top_engagement = max(engagement, default=0) or 1
+
+    for doc, raw_engagement in zip(docs, engagement):
+        recency = math.exp(-math.log(2) * _age_hours(doc, now) / BREAKING_HALF_LIFE_HOURS)
+        doc["priority_score"] = round(
+            WEIGHTS["recency"] * recency
+            + WEIGHTS["credibility"] * unit_score(doc.get("credibility"), 0.5)
+            + WEIGHTS["authenticity"] * (1 - unit_score(doc.get("fake_prob"), 0.5))
+            + WEIGHTS["fame"] * (1.0 if is_famous(doc.get("source") or "") else 0.0)
+            + WEIGHTS["engagement"] * raw_engagement / top_engagement,
+            4
+        )
+    return docs
+
+
+def select_breaking(now=None):
+    """
+    Today's top BREAKING_SIZE articles, newest publishedAt first
+    """
+    now = now or datetime.now(timezone.utc)
+    since = (now - timedelta(hours=BREAKING_WINDOW_HOURS)).replace(tzinfo=None)
+    candidates = list(
+        news_master
+        .find({"created_at": {"$gte": since}}, CANDIDATE_PROJECTION)
+        .sort("created_at", -1)
+        .limit(BREAKING_CANDIDATES)
+    )
+
+    selected = sorted(score_articles(candidates, now), key=lambda d: d["priority_score"], reverse=True)
+    selected = selected[:BREAKING_SIZE]
+    for rank, doc in enumerate(selected, start=1):
+        doc["priority_rank"] = rank
+
+    # Stored in read order so the capped collection's natural order matches
+    selected.sort(key=lambda d: str(d.get("publishedAt") or ""), reverse=True)
+    return selected
+
+
+def build():
+    """
+    Rebuild today_breaking_priority; returns the number of articles
+    """
+    docs = select_breaking()
+    db = get_news_db()
+    temp_name = f"{BREAKING_COLLECTION}_build_{os.getpid()}"
+
+    db.drop_collection(temp_name)
+    temp = db.create_collection(temp_name, capped=True, size=BREAKING_MAX_BYTES, max=BREAKING_SIZE)
+    try:
+        if docs:
+            temp.insert_many(docs, ordered=True)
+        temp.create_index([("publishedAt", DESCENDING)], name="breaking_published_index")
+        temp.rename(BREAKING_COLLECTION, dropTarget=True)
+    except Exception:
+        db.drop_collection(temp_name)
+        raise
+
+    # Cached breaking feeds reload on the next request
+    watermark.bump(watermark.BREAKING_SCOPE)
+    return len(docs)
+
+
+def run_forever(interval=BREAKING_INTERVAL):
+    while True:
+        started = time.time()
+        try:
+            count = build()
+            print(f"✅ Built {BREAKING_COLLECTION} with {count} articles in {time.time() - started:.1f}s")
+        except Exception as e:
+            print(f"❌ Breaking news build failed: {e}")
+        time.sleep(max(interval - (time.time() - started), 1))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Build the today_breaking_priority collection')
+    parser.add_argument('--loop', action='store_true', help='Rebuild every --interval seconds')
+    parser.add_argument('--interval', type=int, default=BREAKING_INTERVAL, help='Seconds between builds')
+
+    args = parser.parse_args()
+
+    if args.loop:
+        print("🚀 Breaking news builder started")
+        run_forever(args.interval)
+    else:
+        started = time.time()
+        count = build()
+        print(f"✅ Built {BREAKING_COLLECTION} with {count} articles in {time.time() - started:.1f}s")
@@ -0,0 +1,164 @@
+"""
+Shared MongoDB access layer.
+
+Every module talks to Mongo through this file so that each gunicorn worker
+holds exactly one pooled MongoClient instead of opening a new connection per
+request. The client is created lazily on first use and re-created after a
+fork, because pymongo clients must not be shared across processes.
+"""
+
+import os
+import threading
+from pymongo import MongoClient
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Pool settings default to the values in config.ProductionConfig and can be
+# overridden from the environment or from app.config via init_app()
+_settings = {
+    "MONGO_URI": os.getenv('MONGO_URI'),
+    "DB_NAME": os.getenv('DB_NAME', 'pslvnews'),
+    "NEWS_DB_NAME": os.getenv('NEWS_DB_NAME', 'newsai_db'),
+    "MONGO_CONNECT": os.getenv('MONGO_CONNECT', 'false').lower() == 'true',
+    "MONGO_MAX_POOL_SIZE": int(os.getenv('MONGO_MAX_POOL_SIZE', 20)),
+    "MONGO_MIN_POOL_SIZE": int(os.getenv('MONGO_MIN_POOL_SIZE', 5)),
+    "MONGO_SERVER_SELECTION_TIMEOUT_MS": int(os.getenv('MONGO_SERVER_SELECTION_TIMEOUT_MS', 5000)),
+    "MONGO_CONNECT_TIMEOUT_MS": int(os.getenv('MONGO_CONNECT_TIMEOUT_MS', 10000)),
+}
+
+_client = None
+_client_pid = None
+_client_installed = False
+_lock = threading.Lock()
+
+
+def init_app(app):
+    """
+    Pick up Mongo settings from the Flask config and drop any client that was
+    built with the old settings. A client installed with set_client() is kept.
+    """
+    configure(app.config)
+
+
+def configure(settings):
+    """
+    Same as init_app() for scripts without a Flask app: `settings` is a dict
+    with any of the MONGO_* / DB_NAME / NEWS_DB_NAME keys
+    """
+    global _client, _client_pid
+
+    for key in _settings:
+        if settings.get(key) is not None:
+            _settings[key] = settings[key]
+
+    with _lock:
+        if not _client_installed:
+            _client = None
+            _client_pid = None
+
+
+def get_client():
+    """
+    Return the pooled MongoClient for the current process
+    """
+    global _client, _client_pid
+
+    pid = os.getpid()
+    if _client is not None and _client_pid == pid:
+        return _client
+
+    with _lock:
+        if _client is None or _client_pid != pid:
+            # A client inherited from the parent process is left alone; its
+            # sockets belong to the parent and closing them here would break it
+            if not _settings["MONGO_URI"]:
+                raise ValueError("MONGO_URI environment variable is required")
+
+            _client = MongoClient(
+                _settings["MONGO_URI"],
+                connect=_settings["MONGO_CONNECT"],
+                maxPoolSize=_settings["MONGO_MAX_POOL_SIZE"],
+                minPoolSize=_settings["MONGO_MIN_POOL_SIZE"],
+                serverSelectionTimeoutMS=_settings["MONGO_SERVER_SELECTION_TIMEOUT_MS"],
+                connectTimeoutMS=_settings["MONGO_CONNECT_TIMEOUT_MS"]
+            )
+            _client_pid = pid
+
+    return _client
+
+
+def set_client(client):
+    """
+    Install an already-built client (e.g. mongomock) for the current process
+    """
+    global _client, _client_pid, _client_installed
+
+    with _lock:
+        _client = client
+        _client_pid = os.getpid()
+        _client_installed = client is not None
+
+
+def close_client():
+    """
+    Close the current process's client, if it owns one
+    """
+    global _client, _client_pid
+
+    with _lock:
+        if _client is not None and _client_pid == os.getpid():
+            _client.close()
+        _client = None
+        _client_pid = None
+
+
+def get_db():
+    """
+    Application database (users, sessions)
+    """
+    return get_client()[_settings["DB_NAME"]]
+
+
+def get_news_db():
+    """
+    News database (news_master, today_breaking_priority, ...)
+    """
+    return get_client()[_settings["NEWS_DB_NAME"]]
+
+
+class LazyHandle:
+    """
+    Stand-in for a Database or Collection that resolves against the current
+    process's client on every access, so it is safe to keep at module level
+    """
+
+    def __init__(self, resolver):
+        self._resolver = resolver
+
+    def resolve(self):
+        return self._resolver()
+
+    def __getattr__(self, name):
+        return getattr(self._resolver(), name)
+
+    def __getitem__(self, name):
+        return self._resolver()[name]
+
+
+def news_collection(name):
+    """
+    Lazy handle to a collection in the news database
+    """
+    return LazyHandle(lambda: get_news_db()[name])
+
+
+def app_collection(name):
+    """
+    Lazy handle to a collection in the application database
+    """
+    return LazyHandle(lambda: get_db()[name])
+
+
+news_db = LazyHandle(get_news_db)
+app_db = LazyHandle(get_db)
@@ -0,0 +1,229 @@
+"""
+Near-duplicate detection for incoming news text.
+
+Texts are shingled into word 3-grams and summarized by a MinHash signature.
+Signatures are split into LSH bands so that likely duplicates share at least
+one band key; candidates are then confirmed by estimated Jaccard similarity.
+
+Clusters (signature, band keys and the verdict of the first analyzed copy)
+are persisted in the `news_clusters` collection. Each process keeps the most
+recent ones in memory and falls back to an indexed band lookup in Mongo for
+clusters created by other workers. The indexes are created by
+utils.indexes migrations.
+"""
+
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict, defaultdict
+from datetime import datetime
+
+import numpy as np
+from bson import ObjectId
+
+from utils.db import news_collection
+
+news_clusters = news_collection("news_clusters")
+
+SHINGLE_SIZE = 3
+NUM_BANDS = 16
+ROWS_PER_BAND = 4
+NUM_PERM = NUM_BANDS * ROWS_PER_BAND
+SIMILARITY_THRESHOLD = float(os.getenv('DEDUP_THRESHOLD', 0.8))
+MEMORY_CLUSTERS = int(os.getenv('DEDUP_MEMORY_CLUSTERS', 20000))
+
+_MERSENNE_PRIME = (1 << 31) - 1
+_rng = np.random.RandomState(20240101)  # fixed so signatures are stable across processes
+_PERM_A = _rng.randint(1, _MERSENNE_PRIME, size=NUM_PERM, dtype=np.int64)
+_PERM_B = _rng.randint(0, _MERSENNE_PRIME, size=NUM_PERM, dtype=np.int64)
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def shingles(text):
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < SHINGLE_SIZE:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def minhash(text):
+    """
+    MinHash signature of a text as an int64 array of length NUM_PERM
+    """
+    grams = shingles(text)
+    if not grams:
+        return np.full(NUM_PERM, _MERSENNE_PRIME, dtype=np.int64)
+
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(g.encode("utf-8"), digest_size=8).digest(), "little") % _MERSENNE_PRIME
+         for g in grams),
+        dtype=np.int64,
+        count=len(grams)
+    )
+    # (a * h + b) mod p for every permutation/shingle pair, then column minima
+    permuted = (np.outer(hashes, _PERM_A) + _PERM_B) % _MERSENNE_PRIME
+    return permuted.min(axis=0)
+
+
+def band_keys(signature):
+    rows = signature.reshape(NUM_BANDS, ROWS_PER_BAND)
+    return [
+        f"{band}:{hashlib.blake2b(row.tobytes(), digest_size=8).hexdigest()}"
+        for band, row in enumerate(rows)
+    ]
+
+
+def similarity(sig_a, sig_b):
+    """
+    Estimated Jaccard similarity of the underlying shingle sets
+    """
+    return float(np.mean(sig_a == sig_b))
+
+
+class NearDuplicateIndex:
+    """
+    Bounded in-memory LSH index of cluster signatures
+    """
+
+    def __init__(self, max_clusters=MEMORY_CLUSTERS):
+        self.max_clusters = max_clusters
+        self._clusters = OrderedDict()       # cluster_id -> (signature, bands, verdict)
+        self._buckets = defaultdict(set)     # band key -> cluster ids
+        self._lock = threading.Lock()
+
+    def add(self, cluster_id, signature, bands, verdict):
+        with self._lock:
+            if cluster_id in self._clusters:
+                self._clusters.move_to_end(cluster_id)
+                return
+            self._clusters[cluster_id] = (signature, bands, verdict)
+            for key in bands:
+                self._buckets[key].add(cluster_id)
+
+            while len(self._clusters) > self.max_clusters:
+                old_id, (_, old_bands, _) = self._clusters.popitem(last=False)
+                for key in old_bands:
+                    self._buckets[key].discard(old_id)
+                    if not self._buckets[key]:
+                        del self._buckets[key]
+
+    def best_match(self, signature, bands):
+        with self._lock:
+            candidates = set()
+            for key in bands:
+                candidates |= self._buckets.get(key, set())
+
+            best = None
+            for cluster_id in candidates:
+                score = similarity(signature, self._clusters[cluster_id][0])
+                if score >= SIMILARITY_THRESHOLD and (best is None or score > best[1]):
+                    best = (cluster_id, score)
+
+            if best is None:
+                return None
+            return {"cluster_id": best[0], "similarity": best[1], "verdict": self._clusters[best[0]][2]}
+
+    def __len__(self):
+        return len(self._clusters)
+
+
+_index = NearDuplicateIndex()
+_loaded_pid = None
+_load_lock = threading.Lock()
+
+
+def load(limit=MEMORY_CLUSTERS):
+    """
+    Warm this process's index with the most recently seen clusters
+    """
+    cursor = (
+        news_clusters
+        .find({}, {"signature": 1, "bands": 1, "verdict": 1})
+        .sort("last_seen", -1)
+        .limit(limit)
+    )
+    docs = list(cursor)
+    # Oldest first so the newest end up most recent in the LRU
+    for doc in reversed(docs):
+        _index.add(str(doc["_id"]), np.array(doc["signature"], dtype=np.int64), doc["bands"], doc["verdict"])
+    return len(docs)
+
+
+def _ensure_loaded():
+    global _loaded_pid
+    if _loaded_pid == os.getpid():
+        return
+    with _load_lock:
+        if _loaded_pid != os.getpid():
+            try:
+                load()
+            except Exception as e:
+                print(f"Could not warm duplicate index: {e}")
+            _loaded_pid = os.getpid()
+
+
+def find_duplicate(text):
+    """
+    Return {"cluster_id", "similarity", "verdict", "signature", "bands"} for
+    the closest known cluster, or {"cluster_id": None, ...} when the text is new.
+    The signature and bands can be passed on to register().
+    """
+    _ensure_loaded()
+    signature = minhash(text)
+    bands = band_keys(signature)
+
+    match = _index.best_match(signature, bands)
+    if match is None:
+        # Clusters created by other workers since this one warmed up
+        try:
+            for doc in news_clusters.find({"bands": {"$in": bands}}, {"signature": 1, "bands": 1, "verdict": 1}):
+                _index.add(str(doc["_id"]), np.array(doc["signature"], dtype=np.int64), doc["bands"], doc["verdict"])
+            match = _index.best_match(signature, bands)
+        except Exception as e:
+            print(f"Duplicate lookup failed: {e}")
+
+    result = {"cluster_id": None, "similarity": 0.0, "verdict": None}
+    if match:
+        result.update(match)
+    result["signature"] = signature
+    result["bands"] = bands
+    return result
+
+
+def register(text, verdict, signature=None, bands=None):
+    """
+    Start a new cluster from an analyzed text; returns its cluster_id
+    """
+    if signature is None:
+        signature = minhash(text)
+    if bands is None:
+        bands = band_keys(signature)
+
+    now = datetime.utcnow()
+    cluster_id = ObjectId()
+    news_clusters.insert_one({
+        "_id": cluster_id,
+        "signature": signature.tolist(),
+        "bands": bands,
+        "verdict": verdict,
+        "size": 1,
+        "created_at": now,
+        "last_seen": now
+    })
+    _index.add(str(cluster_id), signature, bands, verdict)
+    return str(cluster_id)
+
+
+def record_hit(cluster_id):
+    """
+    Count another copy of a known cluster
+    """
+    try:
+        news_clusters.update_one(
+            {"_id": ObjectId(cluster_id)},
+            {"$inc": {"size": 1}, "$set": {"last_seen": datetime.utcnow()}}
+        )
+    except Exception as e:
+        print(f"Could not update cluster {cluster_id}: {e}")
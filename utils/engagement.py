@@ -0,0 +1,329 @@
+"""
+Likes, saves and shares from the news cards.
+
+Clicks are accepted into a per-worker buffer and written in batches by a
+background thread every ENGAGEMENT_FLUSH_INTERVAL seconds (or as soon as
+ENGAGEMENT_MAX_BUFFER clicks are waiting), so a viral article costs one
+$inc per flush instead of one write per click.
+
+Likes and shares count once per reader and article. Each one is recorded in
+`engagement_events` under the id "<action>:<reader>:<article>". A flush
+walks each marker through three stages:
+  1. the new events are bulk-inserted as `applied: false`,
+  2. the $inc on news_master is written and the markers get `counted: true`,
+  3. the $addToSet on the user's profile is written and the markers get
+     `applied: true`.
+An event whose marker is already applied is a duplicate. When a flush
+fails, it deletes only the markers whose $inc never landed and requeues the
+events; a retry skips the $inc for markers that are already counted. A
+marker left behind by a crashed flush is taken over once it is
+STALE_MARKER_SECONDS old, so no click is lost or counted twice.
+Saves are a set on the user's profile and need no counter.
+
+Pending clicks are flushed when the process exits. Flush latency and click
+counts are exported on /metrics (see utils.instrumentation).
+"""
+
+import atexit
+import os
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from utils.db import news_collection, app_collection
+from utils.instrumentation import record_engagement_flush
+
+news_master = news_collection("news_master")
+engagement_events = news_collection("engagement_events")
+users = app_collection("users")
+
+FLUSH_INTERVAL = float(os.getenv('ENGAGEMENT_FLUSH_INTERVAL', 1.0))
+MAX_BUFFER = int(os.getenv('ENGAGEMENT_MAX_BUFFER', 500))
+# An unapplied marker this old belongs to a flush that died
+STALE_MARKER_SECONDS = int(os.getenv('ENGAGEMENT_STALE_MARKER_SECONDS', 60))
+
+LIKE = "like"
+SHARE = "share"
+SAVE = "save"
+UNSAVE = "unsave"
+
+# Counted actions: article counter field and user profile list
+COUNTED_ACTIONS = {
+    LIKE: ("likes", "liked_articles"),
+    SHARE: ("shares", "shared_articles")
+}
+SAVED_FIELD = "saved_articles"
+
+DUPLICATE_KEY = 11000
+
+
+class EngagementBuffer:
+    """
+    Per-worker click buffer with batched, idempotent flushes
+    """
+
+    def __init__(self):
+        self._events = {}            # event id -> (action, news_id, user_id)
+        self._saves = {}             # (user_id, news_id) -> SAVE / UNSAVE, last one wins
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._counts = Counter()     # result -> clicks, for the current flush
+
+    def record(self, action, news_id, reader_id, user_id=None):
+        """
+        Queue one click. reader_id identifies the reader for idempotency
+        (a user id or an anonymous session id); user_id is set for signed-in
+        readers whose profile should be updated.
+        """
+        with self._lock:
+            if action in (SAVE, UNSAVE):
+                self._saves[(user_id, news_id)] = action
+            else:
+                self._events.setdefault(f"{action}:{reader_id}:{news_id}", (action, news_id, user_id))
+            pending = len(self._events) + len(self._saves)
+
+        self._ensure_thread()
+        if pending >= MAX_BUFFER:
+            self._wakeup.set()
+
+    def pending(self):
+        with self._lock:
+            return len(self._events) + len(self._saves)
+
+    def _take(self):
+        with self._lock:
+            events, self._events = self._events, {}
+            saves, self._saves = self._saves, {}
+        return events, saves
+
+    def _requeue(self, events, saves):
+        with self._lock:
+            for event_id, event in events.items():
+                self._events.setdefault(event_id, event)
+            for key, action in saves.items():
+                self._saves.setdefault(key, action)
+
+    def _claim_events(self, events, flush_id):
+        """
+        Insert unapplied markers for the events; returns (claimed ids,
+        claimed ids whose $inc already landed, duplicate ids, ids another
+        flush is still applying)
+        """
+        now = datetime.utcnow()
+        ids = list(events)
+        docs = [
+            {"_id": event_id, "action": events[event_id][0], "news_id": events[event_id][1],
+             "user_id": events[event_id][2], "created_at": now, "applied": False, "flush_id": flush_id}
+            for event_id in ids
+        ]
+
+        existing = []
+        try:
+            engagement_events.insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            for error in e.details.get("writeErrors", []):
+                if error.get("code") != DUPLICATE_KEY:
+                    raise
+                existing.append(ids[error["index"]])
+
+        already_there = set(existing)
+        claimed = [event_id for event_id in ids if event_id not in already_there]
+        counted, duplicates, busy = set(), [], []
+        if existing:
+            stale_before = now - timedelta(seconds=STALE_MARKER_SECONDS)
+            markers = engagement_events.find({"_id": {"$in": existing}}, {"applied": 1, "counted": 1})
+            for marker in markers:
+                if marker.get("applied", True):
+                    duplicates.append(marker["_id"])
+                    continue
+                # Released by a failed flush, or left behind by a crashed one
+                taken = engagement_events.update_one(
+                    {"_id": marker["_id"], "applied": False,
+                     "$or": [{"flush_id": None}, {"created_at": {"$lt": stale_before}}]},
+                    {"$set": {"created_at": now, "flush_id": flush_id}}
+                )
+                if not taken.modified_count:
+                    busy.append(marker["_id"])
+                    continue
+                claimed.append(marker["_id"])
+                if marker.get("counted"):
+                    counted.add(marker["_id"])
+        return claimed, counted, duplicates, busy
+
+    def _write_counters(self, events, to_count, landed):
+        """
+        $inc the article counters for to_count; the ids whose write landed
+        are added to `landed` before anything else can fail
+        """
+        increments = defaultdict(Counter)      # news_id -> {field: n}
+        for event_id in to_count:
+            action, news_id, _ = events[event_id]
+            increments[news_id][COUNTED_ACTIONS[action][0]] += 1
+        if not increments:
+            return
+
+        news_ids = list(increments)
+        try:
+            news_master.bulk_write([
+                UpdateOne({"_id": ObjectId(news_id)}, {"$inc": dict(increments[news_id])})
+                for news_id in news_ids
+            ], ordered=False)
+        except BulkWriteError as e:
+            # Unordered: every op without a write error was applied
+            failed = {news_ids[error["index"]] for error in e.details.get("writeErrors", [])}
+            landed.extend(event_id for event_id in to_count if events[event_id][1] not in failed)
+            raise
+        landed.extend(to_count)
+
+    def _apply_events(self, events, flush_id, landed):
+        """
+        Apply the counters for events not counted yet; returns the events to
+        retry later. Events whose $inc landed are collected in `landed`.
+        """
+        if not events:
+            return {}
+        claimed, counted, duplicates, busy = self._claim_events(events, flush_id)
+
+        # Stage 2: article counters, skipped for markers a failed flush
+        # already counted
+        self._write_counters(events, [event_id for event_id in claimed if event_id not in counted], landed)
+        if landed:
+            engagement_events.update_many(
+                {"_id": {"$in": landed}, "flush_id": flush_id},
+                {"$set": {"counted": True}}
+            )
+
+        # Stage 3: reader profiles; $addToSet is safe to repeat
+        additions = defaultdict(lambda: defaultdict(list))   # user_id -> {field: [news ids]}
+        for event_id in claimed:
+            action, news_id, user_id = events[event_id]
+            if user_id:
+                additions[user_id][COUNTED_ACTIONS[action][1]].append(news_id)
+        if additions:
+            users.bulk_write([
+                UpdateOne(
+                    {"_id": ObjectId(user_id)},
+                    {"$addToSet": {field: {"$each": news_ids} for field, news_ids in fields.items()}}
+                )
+                for user_id, fields in additions.items()
+            ], ordered=False)
+
+        if claimed:
+            engagement_events.update_many(
+                {"_id": {"$in": claimed}, "flush_id": flush_id},
+                {"$set": {"applied": True}, "$unset": {"flush_id": ""}}
+            )
+
+        self._counts["applied"] += len(claimed)
+        self._counts["duplicate"] += len(duplicates)
+        self._counts["requeued"] += len(busy)
+        # Another worker's flush has them; retry in case it fails
+        return {event_id: events[event_id] for event_id in busy}
+
+    def _release_events(self, events, flush_id, landed):
+        """
+        Hand this flush's unapplied markers back after a failure. Markers
+        whose $inc landed are kept (as counted) so a retry does not count
+        them again; the others are deleted so a retry counts them.
+        """
+        landed_ids = set(landed)
+        try:
+            if landed:
+                engagement_events.update_many(
+                    {"_id": {"$in": list(landed)}, "flush_id": flush_id},
+                    {"$set": {"counted": True}}
+                )
+            engagement_events.delete_many({
+                "_id": {"$in": [event_id for event_id in events if event_id not in landed_ids]},
+                "flush_id": flush_id, "applied": False, "counted": {"$ne": True}
+            })
+            # Counted markers can be taken over by the retry straight away
+            engagement_events.update_many(
+                {"_id": {"$in": list(events)}, "flush_id": flush_id, "applied": False, "counted": True},
+                {"$unset": {"flush_id": ""}}
+            )
+        except Exception as e:
+            # The markers go stale and are taken over by a later flush
+            print(f"Could not release engagement markers: {e}")
+
+    def _apply_saves(self, saves):
+        if not saves:
+            return
+        users.bulk_write([
+            UpdateOne(
+                {"_id": ObjectId(user_id)},
+                {"$addToSet" if action == SAVE else "$pull": {SAVED_FIELD: news_id}}
+            )
+            for (user_id, news_id), action in saves.items()
+        ], ordered=False)
+        self._counts["saved"] += len(saves)
+
+    def flush(self):
+        """
+        Write everything buffered so far; returns the number of clicks
+        """
+        with self._flush_lock:
+            events, saves = self._take()
+            if not events and not saves:
+                return 0
+
+            started = time.perf_counter()
+            flush_id = uuid.uuid4().hex
+            landed = []
+            self._counts = Counter()
+            outcome = "ok"
+            try:
+                retry = self._apply_events(events, flush_id, landed)
+                self._apply_saves(saves)
+                if retry:
+                    self._requeue(retry, {})
+            except Exception as e:
+                print(f"Engagement flush failed: {e}")
+                outcome = "error"
+                # Keep what was counted, drop the rest so the retry counts it
+                self._release_events(events, flush_id, landed)
+                self._requeue(events, saves)
+                self._counts = Counter(requeued=len(events) + len(saves))
+
+            record_engagement_flush(time.perf_counter() - started, outcome, self._counts, self.pending())
+            return len(events) + len(saves)
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(FLUSH_INTERVAL)
+            self._wakeup.clear()
+            self.flush()
+
+    def _ensure_thread(self):
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="engagement-flush", daemon=True)
+            self._pid = os.getpid()
+            self._thread.start()
+
+
+_buffer = EngagementBuffer()
+
+
+def record(action, news_id, reader_id, user_id=None):
+    _buffer.record(action, news_id, reader_id, user_id)
+
+
+def flush():
+    return _buffer.flush()
+
+
+# Don't lose buffered clicks when a worker shuts down cleanly
+atexit.register(flush)
@@ -0,0 +1,118 @@
+"""
+Category feed service for /user/dashboard/<category>.
+
+Keeps the newest FEED_SIZE article cards per category in a bounded LRU.
+Cards carry only the fields the news card templates render, with long text
+fields trimmed to what the template shows. Articles are stored by the ingest
+worker, not the web processes, so a cached feed is reloaded once its ingest
+watermark moves past the version it was loaded at (checked at most every
+WATERMARK_TTL seconds), or when the entry expires after FEED_TTL seconds.
+"""
+
+import os
+
+from utils.cache import LRUCache, track
+from utils.db import news_db
+from utils import watermark
+
+FEED_SIZE = int(os.getenv('FEED_SIZE', 100))
+FEED_TTL = int(os.getenv('FEED_TTL', 60))
+FEED_MAX_CATEGORIES = int(os.getenv('FEED_MAX_CATEGORIES', 64))
+
+BREAKING_CATEGORY = "breakingnews"
+
+# Fields used by the cards in user_dashboard.html / for_you.html
+CARD_PROJECTION = {
+    "title": 1,
+    "full_text": 1,
+    "content": 1,
+    "category": 1,
+    "image_url": 1,
+    "likes": 1,
+    "credibility": 1,
+    "fake_prob": 1,
+    "sentiment_score": 1,
+    "created_at": 1,
+    "publishedAt": 1
+}
+
+# The templates show the first 300 characters and an ellipsis when longer
+TEXT_PREVIEW_CHARS = 301
+
+_feeds = track("feeds", LRUCache(maxsize=FEED_MAX_CATEGORIES, ttl=FEED_TTL))
+
+
+def to_card(doc):
+    """
+    Trim a news document down to a template-ready card
+    """
+    card = {key: doc.get(key) for key in CARD_PROJECTION if key in doc}
+    card["_id"] = str(doc["_id"])
+
+    for field in ("full_text", "content"):
+        if isinstance(card.get(field), str):
+            card[field] = card[field][:TEXT_PREVIEW_CHARS]
+
+    return card
+
+
+def _load_feed(category):
+    if category == BREAKING_CATEGORY:
+        cursor = (
+            news_db.today_breaking_priority
+            .find({}, CARD_PROJECTION)
+            .sort("publishedAt", -1)
+            .limit(FEED_SIZE)
+        )
+    else:
+        cursor = (
+            news_db.news_master
+            .find({"category": category}, CARD_PROJECTION)
+            .sort("created_at", -1)
+            .limit(FEED_SIZE)
+        )
+
+    return [to_card(doc) for doc in cursor]
+
+
+def feed_scope(category):
+    """
+    Watermark scope whose changes can alter a category's feed
+    """
+    if category == BREAKING_CATEGORY:
+        return watermark.BREAKING_SCOPE
+    return watermark.category_scope(category)
+
+
+def _feed_version(category):
+    current = watermark.current(feed_scope(category))
+    return current[0] if current else None
+
+
+def get_category_feed(category):
+    """
+    Return the newest article cards for a category
+    """
+    version = _feed_version(category)
+    entry = _feeds.get(category)
+    if entry is None or (version is not None and entry[0] != version):
+        entry = (version, _load_feed(category))
+        _feeds.set(category, entry)
+    cards = entry[1]
+
+    # Callers get their own list so they cannot reorder the cached one
+    return list(cards)
+
+
+def invalidate(category=None):
+    """
+    Drop one category feed, or all of them
+    """
+    if category is None:
+        _feeds.clear()
+    else:
+        _feeds.pop(category)
+
+
+def feed_cache_stats():
+    return _feeds.stats()
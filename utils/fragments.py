@@ -0,0 +1,97 @@
+"""
+Rendered-fragment cache for news cards.
+
+Each card in user_dashboard.html / for_you.html is rendered once from the
+templates in templates/partials and kept as HTML, keyed by the article's _id
+and a revision hash of the fields the card shows. A changed document (new
+like count, re-scored credibility, ...) gets a new revision and therefore a
+fresh render; stale revisions simply age out of the LRU.
+
+Set FRAGMENT_SHARED_TIER=true to also share rendered cards between workers
+through the Mongo-backed SharedCache (one bulk read per page).
+"""
+
+import hashlib
+import json
+import os
+
+from flask import render_template
+from markupsafe import Markup
+
+from utils.cache import LRUCache, track
+from utils.shared_cache import SharedCache
+
+FRAGMENT_CACHE_SIZE = int(os.getenv('FRAGMENT_CACHE_SIZE', 5000))
+FRAGMENT_CACHE_TTL = int(os.getenv('FRAGMENT_CACHE_TTL', 3600))
+FRAGMENT_SHARED_TIER = os.getenv('FRAGMENT_SHARED_TIER', 'false').lower() == 'true'
+
+CARD_TEMPLATES = {
+    "article": "partials/news_article.html",
+    "breaking": "partials/breaking_item.html"
+}
+
+_fragments = track("fragments", LRUCache(maxsize=FRAGMENT_CACHE_SIZE, ttl=FRAGMENT_CACHE_TTL))
+_shared = SharedCache("fragments", ttl=FRAGMENT_CACHE_TTL, local_maxsize=1) if FRAGMENT_SHARED_TIER else None
+
+
+def revision(news):
+    """
+    Short hash of everything a card renders from
+    """
+    raw = json.dumps(news, sort_keys=True, default=str)
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def _render(news, search_query=None):
+    return {
+        name: render_template(template, news=news, search_query=search_query)
+        for name, template in CARD_TEMPLATES.items()
+    }
+
+
+def render_cards(news_list, search_query=None):
+    """
+    [{"id", "article", "breaking"}] with each card's HTML, rendered or from
+    cache. Search results highlight the query, so they are never cached.
+    """
+    news_list = news_list or []
+    if search_query:
+        rendered = [_render(news, search_query) for news in news_list]
+    else:
+        keys = [f"{news['_id']}:{revision(news)}" for news in news_list]
+        found = {}
+        missing = []
+        for key in keys:
+            fragment = _fragments.get(key)
+            if fragment is None:
+                missing.append(key)
+            else:
+                found[key] = fragment
+
+        if missing and _shared is not None:
+            for key, fragment in _shared.get_many(missing).items():
+                found[key] = fragment
+                _fragments.set(key, fragment)
+
+        fresh = {}
+        for key, news in zip(keys, news_list):
+            if key not in found:
+                found[key] = fresh[key] = _render(news)
+                _fragments.set(key, found[key])
+
+        if fresh and _shared is not None:
+            _shared.set_many(fresh)
+
+        rendered = [found[key] for key in keys]
+
+    return [
+        {"id": news["_id"], **{name: Markup(html) for name, html in fragment.items()}}
+        for news, fragment in zip(news_list, rendered)
+    ]
+
+
+def fragment_cache_stats():
+    stats = _fragments.stats()
+    if _shared is not None:
+        stats["shared"] = _shared.stats()
+    return stats
@@ -0,0 +1,99 @@
+"""
+Conditional responses for pages derived from news_master.
+
+The `conditional` decorator derives an ETag and Last-Modified from the
+ingest watermark of the page's scope before the view runs, and answers
+304 Not Modified when the client (or the nginx proxy cache) already holds
+that version. Only a changed watermark costs a query and a render.
+
+Content can also change without an insert (likes, re-scored articles), so
+validators roll over every HTTP_CACHE_WINDOW seconds. That bounds how long a
+revalidating client can keep such a page.
+"""
+
+import hashlib
+import os
+import time
+from datetime import datetime, timezone
+from functools import wraps
+
+from flask import request, make_response
+
+from utils import watermark
+
+HTTP_CACHE_MAX_AGE = int(os.getenv('HTTP_CACHE_MAX_AGE', 30))
+HTTP_CACHE_WINDOW = int(os.getenv('HTTP_CACHE_WINDOW', 300))
+
+
+def _validators(scope, variant=""):
+    """
+    (etag, last_modified) for the current request, or None when the
+    watermark cannot be read
+    """
+    current = watermark.current(scope)
+    if current is None:
+        return None
+    version, updated_at = current
+
+    window_start = int(time.time()) // HTTP_CACHE_WINDOW * HTTP_CACHE_WINDOW
+    updated_at = updated_at.replace(tzinfo=timezone.utc, microsecond=0)
+    last_modified = max(updated_at, datetime.fromtimestamp(window_start, timezone.utc))
+
+    raw = f"{request.full_path}|{scope}|{version}|{window_start}|{variant}"
+    etag = hashlib.sha1(raw.encode("utf-8")).hexdigest()[:20]
+    return etag, last_modified
+
+
+def _not_modified(etag, last_modified, use_dates=True):
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    if use_dates and request.if_modified_since:
+        return last_modified <= request.if_modified_since
+    return False
+
+
+def _set_headers(response, etag, last_modified, max_age, private):
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    if private:
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+    else:
+        response.cache_control.public = True
+        response.cache_control.max_age = max_age
+    return response
+
+
+def conditional(scope=watermark.ALL_SCOPE, max_age=HTTP_CACHE_MAX_AGE, private=False, bypass=None, vary=None):
+    """
+    Decorate a GET view whose output only changes with the watermark of
+    `scope` (a scope name, or a function of the view's arguments).
+
+    private=True keeps responses out of shared caches and makes browsers
+    revalidate every time. bypass() returning True skips the layer.
+    vary() names what else the page depends on (e.g. the signed-in user)
+    and is folded into the ETag.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapped(*args, **kwargs):
+            if request.method != "GET" or (bypass and bypass()):
+                return view(*args, **kwargs)
+
+            view_scope = scope(*args, **kwargs) if callable(scope) else scope
+            validators = _validators(view_scope, vary() if vary else "")
+            if validators is None:
+                return view(*args, **kwargs)
+            etag, last_modified = validators
+
+            # Dates alone cannot tell one variant's copy from another's
+            if _not_modified(etag, last_modified, use_dates=vary is None):
+                return _set_headers(make_response("", 304), etag, last_modified, max_age, private)
+
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+            return _set_headers(response, etag, last_modified, max_age, private)
+
+        return wrapped
+    return decorator
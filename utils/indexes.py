@@ -0,0 +1,549 @@
+#!/usr/bin/env python3
+"""
+Index manifest, migrations and query advisor for both MongoDB databases.
+
+MANIFEST lists every index the app relies on. Index changes ship as
+numbered MIGRATIONS, and each version is recorded in `schema_migrations` once
+it has been applied. Every step is idempotent:
+  - an index that already exists with the same keys and options is left as
+    it is,
+  - one with the same name or keys but a different definition is rebuilt,
+  - dropping an index that is already gone does nothing.
+A half-finished deploy can therefore simply be run again.
+
+The advisor explains every query shape the app issues (QUERY_SHAPES) and
+reports collection scans and in-memory sorts. Hot shapes serve requests;
+when one of them is not backed by an index, --advise exits non-zero so the
+regression is caught before deploy.
+
+    python -m utils.indexes --migrate           # apply pending migrations
+    python -m utils.indexes --migrate --dry-run
+    python -m utils.indexes --status            # applied versions and drift from MANIFEST
+    python -m utils.indexes --advise            # explain() every query shape
+"""
+
+import os
+import socket
+import time
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, TEXT
+from pymongo.errors import DuplicateKeyError, OperationFailure
+
+from utils.db import get_db, get_news_db, news_collection
+
+NEWS = "news"
+APP = "app"
+
+schema_migrations = news_collection("schema_migrations")
+
+MIGRATION_LOCK_ID = "lock"
+MIGRATION_LOCK_SECONDS = int(os.getenv('MIGRATION_LOCK_SECONDS', 1800))
+
+
+def _collection(database, name):
+    return (get_news_db() if database == NEWS else get_db())[name]
+
+
+def _direction(value):
+    # Servers may report key directions as floats
+    return int(value) if isinstance(value, (int, float)) else value
+
+
+# ================== MANIFEST ==================
+class Index:
+    """
+    One index: where it lives, its keys, its name and create_index options
+    """
+
+    def __init__(self, database, collection, keys, name, **options):
+        self.database = database
+        self.collection = collection
+        self.keys = keys
+        self.name = name
+        self.options = options
+
+    def __str__(self):
+        return f"{self.database}.{self.collection}.{self.name}"
+
+    @property
+    def is_text(self):
+        return any(direction == TEXT for _, direction in self.keys)
+
+    def same_keys(self, info):
+        key = info.get("key", {})
+        if self.is_text:
+            # A collection has at most one text index, whatever its fields
+            return "_fts" in key
+        return [(field, _direction(direction)) for field, direction in key.items()] == list(self.keys)
+
+    def matches(self, info):
+        """
+        Whether a list_indexes() entry is exactly this index
+        """
+        if info.get("name") != self.name or not self.same_keys(info):
+            return False
+        if self.is_text:
+            return dict(info.get("weights", {})) == self.options.get("weights", {})
+        return (
+            bool(info.get("unique")) == bool(self.options.get("unique"))
+            and bool(info.get("sparse")) == bool(self.options.get("sparse"))
+            and info.get("expireAfterSeconds") == self.options.get("expireAfterSeconds")
+            and info.get("partialFilterExpression") == self.options.get("partialFilterExpression")
+        )
+
+    def create(self):
+        _collection(self.database, self.collection).create_index(self.keys, name=self.name, **self.options)
+
+
+MANIFEST = [
+    # --- news_master ---
+    Index(NEWS, "news_master",
+          [("title", TEXT), ("description", TEXT), ("full_text", TEXT), ("content", TEXT), ("category", TEXT)],
+          "search_text_index",
+          weights={"title": 10, "description": 5, "full_text": 3, "content": 3, "category": 2}),
+    # Admin news list and exports: keyset pages on (publishedAt, _id)
+    Index(NEWS, "news_master", [("publishedAt", DESCENDING), ("_id", DESCENDING)], "published_index"),
+    Index(NEWS, "news_master", [("category", ASCENDING), ("publishedAt", DESCENDING), ("_id", DESCENDING)],
+          "category_published_index"),
+    # Category feeds
+    Index(NEWS, "news_master", [("category", ASCENDING), ("created_at", DESCENDING)], "category_date_index"),
+    # For-you candidate pool and breaking-news candidates
+    Index(NEWS, "news_master", [("created_at", DESCENDING)], "date_index"),
+    # Reporter dashboard and submission lists
+    Index(NEWS, "news_master", [("reporter_id", ASCENDING), ("created_at", DESCENDING)], "reporter_index"),
+    # Today's metrics before the rollup exists
+    Index(NEWS, "news_master", [("date", ASCENDING)], "day_index"),
+    # Per-source metrics
+    Index(NEWS, "news_master", [("source", ASCENDING)], "source_index"),
+    # Idempotent ingest: one article per queue job
+    Index(NEWS, "news_master", [("job_id", ASCENDING)], "job_index",
+          unique=True, partialFilterExpression={"job_id": {"$exists": True}}),
+
+    # --- other news collections ---
+    Index(NEWS, "news_clusters", [("bands", ASCENDING)], "cluster_bands_index"),
+    Index(NEWS, "news_clusters", [("last_seen", DESCENDING)], "cluster_last_seen_index"),
+    Index(NEWS, "cache_entries", [("expires_at", ASCENDING)], "expires_at_1", expireAfterSeconds=0),
+
+    # --- users ---
+    Index(APP, "users", [("email", ASCENDING)], "email_unique_index", unique=True),
+    Index(APP, "users", [("created_at", DESCENDING), ("_id", DESCENDING)], "created_index"),
+    Index(APP, "users", [("role", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+          "role_created_index"),
+]
+
+# Indexes from setup_search_indexes.py that no query uses; each one only
+# slowed down ingestion. category_index is a prefix of category_date_index.
+RETIRED = [
+    (NEWS, "news_master", "category_index"),
+    (NEWS, "news_master", "credibility_index"),
+    (NEWS, "news_master", "sentiment_index"),
+    (NEWS, "news_master", "likes_index"),
+]
+
+
+def manifest_index(name):
+    for index in MANIFEST:
+        if index.name == name:
+            return index
+    raise KeyError(f"No index named {name} in the manifest")
+
+
+def ensure(indexes):
+    """
+    Create or rebuild each index unless it already exists as specified;
+    returns [(index, "ok" | "created" | "rebuilt")]
+    """
+    results = []
+    for index in indexes:
+        collection = _collection(index.database, index.collection)
+        existing = list(collection.list_indexes())
+
+        if any(index.matches(info) for info in existing):
+            results.append((index, "ok"))
+            continue
+
+        # Same name or same keys with another definition: replace it
+        conflicting = [
+            info["name"] for info in existing
+            if info["name"] != "_id_" and (info["name"] == index.name or index.same_keys(info))
+        ]
+        for name in conflicting:
+            collection.drop_index(name)
+
+        try:
+            index.create()
+        except DuplicateKeyError as e:
+            raise RuntimeError(f"{index}: existing documents violate the unique constraint ({e})")
+        results.append((index, "rebuilt" if conflicting else "created"))
+        print(f"   {'🔁' if conflicting else '➕'} {index}")
+    return results
+
+
+def drop(retired):
+    """
+    Drop the (database, collection, name) indexes that still exist
+    """
+    for database, collection_name, name in retired:
+        collection = _collection(database, collection_name)
+        if name in {info["name"] for info in collection.list_indexes()}:
+            collection.drop_index(name)
+            print(f"   ➖ {database}.{collection_name}.{name}")
+
+
+def drift():
+    """
+    Differences between MANIFEST and the live indexes of the collections it
+    covers: [(kind, description)] with kind missing / different / extra
+    """
+    problems = []
+    collections = {}
+    for index in MANIFEST:
+        collections.setdefault((index.database, index.collection), []).append(index)
+
+    for (database, collection_name), indexes in collections.items():
+        live = {info["name"]: info for info in _collection(database, collection_name).list_indexes()}
+        for index in indexes:
+            if index.name not in live:
+                problems.append(("missing", str(index)))
+            elif not index.matches(live[index.name]):
+                problems.append(("different", str(index)))
+        expected = {index.name for index in indexes} | {"_id_"}
+        for name in live:
+            if name not in expected:
+                problems.append(("extra", f"{database}.{collection_name}.{name}"))
+    return problems
+
+
+# ================== MIGRATIONS ==================
+# (version, description, step). Versions only ever grow; a manifest change
+# ships with a new migration that ensures or drops the affected indexes.
+MIGRATIONS = [
+    (1, "Create the manifest indexes", lambda: ensure(MANIFEST)),
+    (2, "Drop indexes no query uses", lambda: drop(RETIRED)),
+    (3, "Unique job_id for idempotent ingest", lambda: ensure([manifest_index("job_index")])),
+]
+
+
+def applied_migrations():
+    return {
+        doc["_id"]: doc
+        for doc in schema_migrations.find({"_id": {"$ne": MIGRATION_LOCK_ID}})
+    }
+
+
+def pending_migrations():
+    applied = applied_migrations()
+    return [migration for migration in MIGRATIONS if migration[0] not in applied]
+
+
+def _acquire_lock():
+    """
+    Keep two deploys from migrating at once; a lock older than
+    MIGRATION_LOCK_SECONDS is considered abandoned
+    """
+    now = datetime.utcnow()
+    schema_migrations.delete_one({"_id": MIGRATION_LOCK_ID, "expires_at": {"$lt": now}})
+    try:
+        schema_migrations.insert_one({
+            "_id": MIGRATION_LOCK_ID,
+            "holder": f"{socket.gethostname()}:{os.getpid()}",
+            "expires_at": now + timedelta(seconds=MIGRATION_LOCK_SECONDS)
+        })
+    except DuplicateKeyError:
+        holder = schema_migrations.find_one({"_id": MIGRATION_LOCK_ID}) or {}
+        raise RuntimeError(f"Migrations are already running ({holder.get('holder', 'unknown')})")
+
+
+def _release_lock():
+    schema_migrations.delete_one({"_id": MIGRATION_LOCK_ID})
+
+
+def migrate(dry_run=False):
+    """
+    Apply pending migrations in version order; returns the versions applied
+    """
+    pending = pending_migrations()
+    if dry_run or not pending:
+        return []
+
+    _acquire_lock()
+    applied = []
+    try:
+        # Another deploy may have finished some while we waited for the lock
+        for version, description, step in pending_migrations():
+            print(f"🔧 Migration {version}: {description}")
+            started = time.time()
+            step()
+            schema_migrations.insert_one({
+                "_id": version,
+                "description": description,
+                "applied_at": datetime.utcnow(),
+                "seconds": round(time.time() - started, 3)
+            })
+            applied.append(version)
+    finally:
+        _release_lock()
+    return applied
+
+
+# ================== ADVISOR ==================
+class QueryShape:
+    """
+    A query the app issues, with representative values. `allow` lists plan
+    stages that are expected (e.g. SORT for a textScore sort). Updates and
+    deletes are described by their filter; `distinct` names the field of a
+    distinct command.
+    """
+
+    def __init__(self, name, database, collection, filter=None, sort=None, limit=None,
+                 pipeline=None, distinct=None, hot=True, allow=(), source=""):
+        self.name = name
+        self.database = database
+        self.collection = collection
+        self.filter = filter or {}
+        self.sort = sort
+        self.limit = limit
+        self.pipeline = pipeline
+        self.distinct = distinct
+        self.hot = hot
+        self.allow = set(allow)
+        self.source = source
+
+    def command(self):
+        if self.pipeline is not None:
+            return {"aggregate": self.collection, "pipeline": self.pipeline, "cursor": {}}
+        if self.distinct is not None:
+            return {"distinct": self.collection, "key": self.distinct, "query": self.filter}
+        command = {"find": self.collection, "filter": self.filter}
+        if self.sort:
+            command["sort"] = self.sort
+        if self.limit:
+            command["limit"] = self.limit
+        return command
+
+
+_today = datetime.now().strftime("%Y-%m-%d")
+_sample_id = ObjectId()
+
+QUERY_SHAPES = [
+    # --- users ---
+    QueryShape("login", APP, "users", {"email": "reader@example.com"}, source="app.login / app.register"),
+    QueryShape("user_by_id", APP, "users", {"_id": _sample_id}, source="admin.utils.auth, utils.ranking"),
+    QueryShape("admin_users_page", APP, "users", {}, {"created_at": -1, "_id": -1}, 51,
+               source="admin.models.queries.get_users_with_pagination"),
+    QueryShape("admin_users_by_role", APP, "users", {"role": "news_reporter"}, {"created_at": -1, "_id": -1}, 51,
+               source="admin.models.queries.get_users_with_pagination"),
+    QueryShape("active_users", APP, "users",
+               pipeline=[{"$match": {"created_at": {"$gte": datetime.now() - timedelta(days=30)}}},
+                         {"$count": "n"}],
+               source="admin.models.queries.get_user_metrics"),
+    QueryShape("role_distribution", APP, "users",
+               pipeline=[{"$group": {"_id": "$role", "count": {"$sum": 1}}}], hot=False,
+               source="admin.models.queries.get_user_metrics"),
+
+    # --- news_master: reader ---
+    QueryShape("category_feed", NEWS, "news_master", {"category": "politics"}, {"created_at": -1}, 100,
+               source="utils.feed"),
+    QueryShape("for_you_pool", NEWS, "news_master", {}, {"created_at": -1}, 2000, source="utils.ranking"),
+    QueryShape("breaking_candidates", NEWS, "news_master",
+               {"created_at": {"$gte": datetime.utcnow() - timedelta(hours=24)}}, {"created_at": -1}, 5000,
+               source="utils.breaking.select_breaking"),
+    QueryShape("breaking_feed", NEWS, "today_breaking_priority", {}, {"publishedAt": -1}, 100, source="utils.feed"),
+    QueryShape("text_search", NEWS, "news_master", {"$text": {"$search": "election results"}},
+               {"score": {"$meta": "textScore"}}, 50, allow=("SORT",), source="app.search"),
+    QueryShape("cards_by_id", NEWS, "news_master", {"_id": {"$in": [_sample_id, ObjectId()]}},
+               source="app.search"),
+    QueryShape("article_by_id", NEWS, "news_master", {"_id": _sample_id}, source="admin.models.queries"),
+
+    # --- news_master: admin ---
+    QueryShape("admin_news_page", NEWS, "news_master", {}, {"publishedAt": -1, "_id": -1}, 51,
+               source="admin.models.queries.get_news_paginated"),
+    QueryShape("admin_news_by_category", NEWS, "news_master", {"category": "politics"},
+               {"publishedAt": -1, "_id": -1}, 51, source="admin.models.queries.get_news_paginated"),
+    QueryShape("admin_news_next_page", NEWS, "news_master",
+               {"$or": [{"publishedAt": {"$lt": "2025-01-01T00:00:00Z"}},
+                        {"publishedAt": "2025-01-01T00:00:00Z", "_id": {"$lt": _sample_id}}]},
+               {"publishedAt": -1, "_id": -1}, 51, source="admin.models.queries.keyset_page"),
+    # Keyword matches are few, so sorting them in memory is fine
+    QueryShape("admin_news_search", NEWS, "news_master", {"_id": {"$in": [_sample_id, ObjectId()]}},
+               {"publishedAt": -1, "_id": -1}, 51, allow=("SORT",),
+               source="admin.models.queries.get_news_paginated"),
+    QueryShape("admin_news_count", NEWS, "news_master",
+               pipeline=[{"$match": {"category": "politics"}}, {"$group": {"_id": 1, "n": {"$sum": 1}}}],
+               source="admin.models.queries.count_matching"),
+    QueryShape("visualization_sample", NEWS, "news_master",
+               pipeline=[{"$sort": {"publishedAt": -1}}, {"$limit": 1000}],
+               source="admin.models.queries.get_news_sample_for_visualization"),
+    QueryShape("today_metrics", NEWS, "news_master",
+               pipeline=[{"$match": {"date": _today}},
+                         {"$group": {"_id": None, "total_articles": {"$sum": 1}}}],
+               source="admin.utils.metrics.get_today_metrics"),
+    QueryShape("sources", NEWS, "news_master",
+               pipeline=[{"$group": {"_id": "$source", "article_count": {"$sum": 1}}}], hot=False,
+               source="admin.models.queries.get_sources_data"),
+    QueryShape("chart_facets", NEWS, "news_master",
+               pipeline=[{"$project": {"_id": 0, "category": 1, "source": 1}},
+                         {"$facet": {"category": [{"$group": {"_id": "$category", "count": {"$sum": 1}}}]}}],
+               hot=False, source="admin.utils.metrics.get_chart_data"),
+    QueryShape("categories", NEWS, "news_master", distinct="category",
+               source="admin.models.queries.get_categories_list"),
+
+    # --- news_master: reporter ---
+    QueryShape("reporter_submissions", NEWS, "news_master", {"reporter_id": str(_sample_id)},
+               {"created_at": -1}, 50, source="reporter.routes.submission, reporter.routes.dashboard"),
+
+    # --- background jobs ---
+    QueryShape("article_by_job", NEWS, "news_master", {"job_id": "0" * 32}, source="utils.ingest_worker"),
+    QueryShape("text_index_catch_up", NEWS, "news_master", {"_id": {"$gt": _sample_id}}, {"_id": 1},
+               source="utils.text_index"),
+    QueryShape("sentiment_backfill", NEWS, "news_master", {"sentiment_score": {"$exists": False}}, hot=False,
+               source="utils.sentiment.backfill"),
+    QueryShape("cluster_candidates", NEWS, "news_clusters", {"bands": {"$in": ["0:1a2b", "1:3c4d"]}},
+               source="utils.dedup.find_duplicate"),
+    QueryShape("cluster_warm_up", NEWS, "news_clusters", {}, {"last_seen": -1}, 20000, source="utils.dedup.load"),
+    QueryShape("shared_cache_get", NEWS, "cache_entries",
+               {"_id": "analysis:key", "expires_at": {"$gt": datetime.utcnow()}}, source="utils.shared_cache"),
+    QueryShape("watermark", NEWS, "ingest_watermarks", {"_id": "category:politics"},
+               source="utils.watermark.current"),
+
+    # --- engagement markers ---
+    QueryShape("engagement_markers", NEWS, "engagement_events", {"_id": {"$in": ["like:a:b", "share:a:b"]}},
+               source="utils.engagement._claim_events"),
+    QueryShape("engagement_take_over", NEWS, "engagement_events",
+               {"_id": "like:a:b", "applied": False,
+                "$or": [{"flush_id": None}, {"created_at": {"$lt": datetime.utcnow()}}]},
+               source="utils.engagement._claim_events"),
+    QueryShape("engagement_mark", NEWS, "engagement_events",
+               {"_id": {"$in": ["like:a:b", "share:a:b"]}, "flush_id": "0" * 32},
+               source="utils.engagement._apply_events"),
+    QueryShape("engagement_release", NEWS, "engagement_events",
+               {"_id": {"$in": ["like:a:b", "share:a:b"]}, "flush_id": "0" * 32, "applied": False,
+                "counted": {"$ne": True}},
+               source="utils.engagement._release_events"),
+]
+
+
+def plan_details(node, inside_plan=False, stages=None, index_names=None):
+    """
+    Stage names and index names of every winning plan in an explain document
+    """
+    if stages is None:
+        stages, index_names = [], set()
+    if isinstance(node, dict):
+        if inside_plan:
+            if isinstance(node.get("stage"), str):
+                stages.append(node["stage"])
+            if isinstance(node.get("indexName"), str):
+                index_names.add(node["indexName"])
+        for key, value in node.items():
+            # Only the chosen plan counts, not the rejected ones
+            if key == "rejectedPlans":
+                continue
+            plan_details(value, inside_plan or key == "winningPlan", stages, index_names)
+    elif isinstance(node, list):
+        for item in node:
+            plan_details(item, inside_plan, stages, index_names)
+    return stages, index_names
+
+
+def explain(shape):
+    """
+    {"shape", "stages", "indexes", "problems", "error"} for one query shape
+    """
+    result = {"shape": shape, "stages": [], "indexes": [], "problems": [], "error": None}
+    collection = _collection(shape.database, shape.collection)
+    try:
+        plan = collection.database.command("explain", shape.command(), verbosity="queryPlanner")
+    except OperationFailure as e:
+        result["error"] = str(e)
+        return result
+
+    stages, index_names = plan_details(plan)
+    result["stages"] = stages
+    result["indexes"] = sorted(index_names)
+    if "COLLSCAN" in stages and "COLLSCAN" not in shape.allow:
+        result["problems"].append("COLLSCAN")
+    if "SORT" in stages and "SORT" not in shape.allow:
+        result["problems"].append("in-memory SORT")
+    return result
+
+
+def advise(shapes=None):
+    """
+    Explain every shape; returns (results, failed) where failed is True when
+    a hot shape scans the collection, sorts in memory or cannot be explained
+    """
+    results = [explain(shape) for shape in (shapes or QUERY_SHAPES)]
+    failed = any(r["shape"].hot and (r["problems"] or r["error"]) for r in results)
+    return results, failed
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description='MongoDB index migrations and query advisor')
+    parser.add_argument('--migrate', action='store_true', help='Apply pending index migrations')
+    parser.add_argument('--dry-run', action='store_true', help='With --migrate, only list what would run')
+    parser.add_argument('--status', action='store_true', help='Show applied migrations and drift from the manifest')
+    parser.add_argument('--advise', action='store_true', help='Explain every query shape; non-zero exit on problems')
+    parser.add_argument('--mongo-uri', help='MongoDB to run against')
+
+    args = parser.parse_args()
+
+    if args.mongo_uri:
+        from utils import db
+        db.configure({"MONGO_URI": args.mongo_uri})
+
+    exit_code = 0
+
+    if args.migrate:
+        pending = pending_migrations()
+        if not pending:
+            print("✅ No pending migrations")
+        elif args.dry_run:
+            for version, description, _ in pending:
+                print(f"   would apply {version}: {description}")
+        else:
+            try:
+                applied = migrate()
+                print(f"✅ Applied migrations {', '.join(map(str, applied))}" if applied else "✅ No pending migrations")
+            except Exception as e:
+                print(f"❌ Migration failed: {e}")
+                exit_code = 1
+
+    if args.status:
+        applied = applied_migrations()
+        for version, description, _ in MIGRATIONS:
+            doc = applied.get(version)
+            print(f"   {'✅' if doc else '⏳'} {version:>3}  {description}"
+                  + (f"  ({doc['applied_at']:%Y-%m-%d %H:%M})" if doc else ""))
+        problems = drift()
+        for kind, name in problems:
+            print(f"   {'⚠️ ' if kind == 'extra' else '❌'} {kind:<9} {name}")
+        # Extra indexes are reported but only cost write time
+        if len(applied) < len(MIGRATIONS) or any(kind != "extra" for kind, _ in problems):
+            exit_code = 1
+
+    if args.advise:
+        results, failed = advise()
+        for r in results:
+            shape = r["shape"]
+            if r["error"]:
+                icon, detail = "❌", f"explain failed: {r['error']}"
+            elif r["problems"]:
+                icon = "❌" if shape.hot else "⚠️ "
+                detail = f"{', '.join(r['problems'])}  [{shape.source}]"
+            else:
+                icon, detail = "✅", ", ".join(r["indexes"]) or " > ".join(r["stages"][:3])
+            print(f"   {icon} {shape.name:<24} {shape.collection:<16} {detail}")
+        print("❌ Hot queries without a usable index" if failed else "✅ Every hot query is indexed")
+        if failed:
+            exit_code = 1
+
+    if not (args.migrate or args.status or args.advise):
+        parser.print_help()
+
+    sys.exit(exit_code)
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Background worker for reporter submissions.
+
+submit_news only validates and enqueues; this worker runs the slow part
+(sentiment, run_agent's search + LLM calls), stores the article in
+news_master and records the outcome on the job so the reporter dashboard
+can poll for it.
+
+Run one or more workers with:
+    python -m utils.ingest_worker
+Set INGEST_INLINE_WORKER=true to instead run a worker thread inside each
+web process (handy for local development).
+"""
+
+import os
+import threading
+import time
+import traceback
+from datetime import datetime
+
+from bson import ObjectId
+
+from utils.db import news_collection
+from utils.job_queue import get_queue, MAX_ATTEMPTS
+from utils.reporter_ingest import analyze_text, now_utc, is_famous
+from utils import rollup, vector_search, text_index, watermark
+
+news_master = news_collection("news_master")
+
+SUBMISSION_JOB = "reporter_submission"
+POLL_INTERVAL = float(os.getenv('INGEST_POLL_INTERVAL', 1.0))
+INLINE_WORKER = os.getenv('INGEST_INLINE_WORKER', 'false').lower() == 'true'
+
+
+def enqueue_submission(payload):
+    """
+    Queue a validated reporter submission; returns the job id
+    """
+    job_id = get_queue().enqueue(SUBMISSION_JOB, payload)
+    if INLINE_WORKER:
+        start_inline_worker()
+    return job_id
+
+
+def build_news_document(payload, sentiment_data, agent_data, evidence_sources, cluster_id=None):
+    """
+    Construct the news_master document for an analyzed submission
+    """
+    full_text = payload["full_text"]
+    source = payload["source"]
+    location = payload.get("location", {})
+
+    # Determine status and credibility
+    published_at = now_utc().isoformat()
+
+    if is_famous(source):
+        status = "verified"
+        credibility = 1.0
+        fake_prob = 0.0
+    else:
+        status = "monitoring"
+        credibility = agent_data.get("credibility", 0.5)
+        fake_prob = agent_data.get("fake_prob", 0.5)
+
+    return {
+        "title": agent_data.get("headline", full_text[:50]),
+        "content": agent_data.get("summary", full_text),
+        "full_text": full_text,
+        "source": source,
+        "publishedAt": published_at,
+        "date": published_at[:10],
+        "week": datetime.fromisoformat(published_at).isocalendar()[1],
+        "month": datetime.fromisoformat(published_at).month,
+        "year": datetime.fromisoformat(published_at).year,
+        "category": agent_data.get("category", "general"),
+        "credibility": credibility,
+        "fake_prob": fake_prob,
+        "summary": agent_data.get("summary", full_text[:150]),
+        "time": published_at[11:19],
+        "status": status,
+        "associateMedia": payload.get("associate_media", {"images": [], "videos": []}),
+        "location": {
+            "district": location.get("district", ""),
+            "state": location.get("state", ""),
+            "country": location.get("country", "")
+        },
+        "sentiment": sentiment_data["sentiment"],
+        "sentiment_score": sentiment_data.get("sentiment_score"),
+        "reporter_id": payload.get("reporter_id"),
+        "reporter_name": payload.get("reporter_name", "Unknown"),
+        "created_at": now_utc(),
+        "evidence_sources": evidence_sources,
+        "evidence_status": agent_data.get("evidence_status", {}),
+        "cluster_id": cluster_id
+    }
+
+
+def apply_derived(doc, retry=False):
+    """
+    Update everything derived from a stored article. For a job's article,
+    `derived_applied` is set once the dashboard counters are written, so a
+    retried job knows whether this still has to run.
+    """
+    # Mark the category (and news overall) as changed for caches and ETags
+    watermark.record_article(doc)
+
+    # Bump the dashboard counters for this article (once per job)
+    counted = rollup.record_article(doc)
+
+    # Make it findable by semantic search right away; other processes
+    # also pick it up on their next catch-up
+    vector_search.add_document(doc, skip_indexed=retry)
+    text_index.add_document(doc)
+
+    if counted and doc.get("job_id") is not None:
+        news_master.update_one({"_id": ObjectId(doc["_id"])}, {"$set": {"derived_applied": True}})
+
+
+def _finish_existing(existing):
+    """
+    A retried job's stored article; re-runs the derived updates if the
+    earlier attempt died before they were done
+    """
+    existing["_id"] = str(existing["_id"])
+    if not existing.get("derived_applied"):
+        apply_derived(existing, retry=True)
+    return existing
+
+
+def store_news_document(doc, job_id=None):
+    """
+    Insert an article and update everything derived from news_master.
+
+    With a job_id the insert is an upsert on it, so a job that runs again
+    after a crash or an expired lease finds its article instead of storing a
+    second copy. The derived updates then run again only if the earlier
+    attempt did not finish them.
+    """
+    if job_id is None:
+        result = news_master.insert_one(doc)
+        doc["_id"] = str(result.inserted_id)
+    else:
+        # job_id comes from the filter; the unique job_index makes
+        # concurrent retries of the same job collide instead of duplicating
+        result = news_master.update_one({"job_id": job_id}, {"$setOnInsert": doc}, upsert=True)
+        doc["job_id"] = job_id
+        if result.upserted_id is None:
+            return _finish_existing(news_master.find_one({"job_id": job_id}))
+        doc["_id"] = str(result.upserted_id)
+
+    apply_derived(doc)
+    return doc
+
+
+def _submission_result(doc, duplicate):
+    return {
+        "document_id": str(doc["_id"]),
+        "cluster_id": doc.get("cluster_id"),
+        "duplicate": duplicate,
+        "title": doc["title"],
+        "status": doc["status"],
+        "category": doc["category"],
+        "credibility": doc["credibility"],
+        "fake_prob": doc["fake_prob"]
+    }
+
+
+def process_submission(payload, job_id=None):
+    """
+    Enrich and store one reporter submission; returns the job result
+    """
+    # A retried job whose article was already stored is just completed
+    if job_id is not None:
+        existing = news_master.find_one({"job_id": job_id})
+        if existing is not None:
+            return _submission_result(_finish_existing(existing), duplicate=False)
+
+    # Near-duplicates of an analyzed story reuse its verdict and skip the
+    # search/LLM calls entirely
+    analysis = analyze_text(payload["full_text"])
+
+    doc = store_news_document(build_news_document(
+        payload,
+        analysis["sentiment"],
+        analysis["agent_data"],
+        analysis["evidence_sources"],
+        cluster_id=analysis["cluster_id"]
+    ), job_id=job_id)
+
+    return _submission_result(doc, analysis["duplicate"])
+
+
+JOB_HANDLERS = {
+    SUBMISSION_JOB: process_submission
+}
+
+
+def run_once(queue=None):
+    """
+    Process a single job if one is waiting; returns True if it did
+    """
+    queue = queue or get_queue()
+    job = queue.claim()
+    if job is None:
+        return False
+
+    handler = JOB_HANDLERS.get(job["kind"])
+    if handler is None:
+        queue.fail(job["id"], f"Unknown job kind: {job['kind']}")
+        return True
+
+    try:
+        result = handler(job["payload"], job_id=job["id"])
+        queue.complete(job["id"], result)
+    except Exception as e:
+        print(f"Ingest job {job['id']} failed (attempt {job['attempts']}): {e}")
+        traceback.print_exc()
+        queue.fail(job["id"], str(e), retry=job["attempts"] < MAX_ATTEMPTS)
+
+    return True
+
+
+def run_worker(poll_interval=POLL_INTERVAL, stop_event=None):
+    """
+    Process jobs until stop_event is set (or forever)
+    """
+    queue = get_queue()
+    while stop_event is None or not stop_event.is_set():
+        try:
+            if not run_once(queue):
+                time.sleep(poll_interval)
+        except Exception as e:
+            print(f"Ingest worker error: {e}")
+            time.sleep(poll_interval)
+
+
+_inline_thread = None
+_inline_pid = None
+_inline_lock = threading.Lock()
+
+
+def start_inline_worker():
+    """
+    Start a daemon worker thread in this process, once per process
+    """
+    global _inline_thread, _inline_pid
+    with _inline_lock:
+        if _inline_thread is not None and _inline_pid == os.getpid() and _inline_thread.is_alive():
+            return
+        _inline_thread = threading.Thread(target=run_worker, name="ingest-worker", daemon=True)
+        _inline_pid = os.getpid()
+        _inline_thread.start()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Process queued reporter submissions')
+    parser.add_argument('--once', action='store_true', help='Process waiting jobs, then exit')
+    parser.add_argument('--poll', type=float, default=POLL_INTERVAL, help='Seconds to wait when the queue is empty')
+
+    args = parser.parse_args()
+
+    if args.once:
+        processed = 0
+        while run_once():
+            processed += 1
+        print(f"✅ Processed {processed} jobs")
+    else:
+        print("🚀 Ingest worker started")
+        run_worker(poll_interval=args.poll)
@@ -0,0 +1,280 @@
+"""
+Prometheus metrics for the web app and the services it depends on.
+
+    http_request_duration_seconds{blueprint, endpoint, method, status}
+    mongo_operation_duration_seconds{collection, operation, outcome}
+    external_call_duration_seconds{service, outcome}
+    cache_requests_total{cache, result}
+    ingest_queue_depth
+    engagement_flush_duration_seconds{outcome}
+    engagement_events_total{result}
+    engagement_pending
+
+Mongo operations are timed with a pymongo command listener, so every query
+from every module is covered without touching the call sites. External calls
+(Pinecone assistant, Groq, DuckDuckGo, NewsAPI, sentiment) are wrapped with
+timed() / timed_call(). utils.engagement reports each flush of its click
+buffer through record_engagement_flush(). Hit and miss counters of the
+caches registered with utils.cache.track() are copied into
+cache_requests_total every METRICS_CACHE_INTERVAL seconds.
+
+Under gunicorn, PROMETHEUS_MULTIPROC_DIR (set in gunicorn.conf.py) makes every
+worker write its samples to files there; /metrics then adds up all workers,
+whichever one answers the scrape.
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import Response, g, request
+from pymongo import monitoring
+
+try:
+    from prometheus_client import (
+        CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram,
+        generate_latest, multiprocess
+    )
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    PROMETHEUS_AVAILABLE = False
+
+from utils.cache import tracked_caches
+
+MULTIPROC_DIR = os.getenv('PROMETHEUS_MULTIPROC_DIR')
+CACHE_INTERVAL = float(os.getenv('METRICS_CACHE_INTERVAL', 5))
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+if PROMETHEUS_AVAILABLE:
+    REQUEST_LATENCY = Histogram(
+        "http_request_duration_seconds", "Flask request latency",
+        ["blueprint", "endpoint", "method", "status"], buckets=LATENCY_BUCKETS
+    )
+    MONGO_LATENCY = Histogram(
+        "mongo_operation_duration_seconds", "MongoDB command latency",
+        ["collection", "operation", "outcome"], buckets=LATENCY_BUCKETS
+    )
+    EXTERNAL_LATENCY = Histogram(
+        "external_call_duration_seconds", "Latency of calls to external services",
+        ["service", "outcome"], buckets=LATENCY_BUCKETS
+    )
+    CACHE_REQUESTS = Counter(
+        "cache_requests_total", "In-process cache lookups", ["cache", "result"]
+    )
+    # Every worker reads the same queue, so the freshest reading wins
+    QUEUE_DEPTH = Gauge(
+        "ingest_queue_depth", "Reporter submissions waiting for the ingest worker",
+        multiprocess_mode="mostrecent"
+    )
+    ENGAGEMENT_FLUSH_LATENCY = Histogram(
+        "engagement_flush_duration_seconds", "Time to write one batch of likes, saves and shares",
+        ["outcome"], buckets=LATENCY_BUCKETS
+    )
+    ENGAGEMENT_EVENTS = Counter(
+        "engagement_events_total", "Clicks handled by engagement flushes",
+        ["result"]
+    )
+    # Each worker buffers its own clicks, so live workers add up
+    ENGAGEMENT_PENDING = Gauge(
+        "engagement_pending", "Clicks buffered and not yet written",
+        multiprocess_mode="livesum"
+    )
+
+
+# ================== EXTERNAL CALLS ==================
+@contextmanager
+def timed(service):
+    """
+    Time the enclosed block as a call to `service`
+    """
+    started = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield
+    except Exception:
+        outcome = "error"
+        raise
+    finally:
+        if PROMETHEUS_AVAILABLE:
+            EXTERNAL_LATENCY.labels(service, outcome).observe(time.perf_counter() - started)
+
+
+def timed_call(service):
+    """
+    Decorator form of timed()
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapped(*args, **kwargs):
+            with timed(service):
+                return func(*args, **kwargs)
+        return wrapped
+    return decorator
+
+
+def record_engagement_flush(seconds, outcome, counts, pending):
+    """
+    Observe one engagement flush; counts maps a result (applied, duplicate,
+    saved, requeued) to its number of clicks
+    """
+    if not PROMETHEUS_AVAILABLE:
+        return
+    ENGAGEMENT_FLUSH_LATENCY.labels(outcome).observe(seconds)
+    for result, count in counts.items():
+        if count:
+            ENGAGEMENT_EVENTS.labels(result).inc(count)
+    ENGAGEMENT_PENDING.set(pending)
+
+
+# ================== MONGO ==================
+class MongoCommandTimer(monitoring.CommandListener):
+    """
+    Observes the duration of every command, labelled by collection
+    """
+
+    def __init__(self):
+        self._collections = {}   # (connection_id, request_id) -> collection
+
+    def started(self, event):
+        command = event.command
+        # getMore names the collection separately; the command value is the cursor id
+        collection = command.get("collection") if event.command_name == "getMore" else command.get(event.command_name)
+        self._collections[(event.connection_id, event.request_id)] = collection if isinstance(collection, str) else "-"
+
+    def succeeded(self, event):
+        self._observe(event, "ok")
+
+    def failed(self, event):
+        self._observe(event, "error")
+
+    def _observe(self, event, outcome):
+        collection = self._collections.pop((event.connection_id, event.request_id), "-")
+        MONGO_LATENCY.labels(collection, event.command_name, outcome).observe(event.duration_micros / 1e6)
+
+
+_mongo_listener = None
+
+
+def install_mongo_listener():
+    """
+    Register the command listener; applies to clients created afterwards,
+    and utils.db creates its client on first use
+    """
+    global _mongo_listener
+    if PROMETHEUS_AVAILABLE and _mongo_listener is None:
+        _mongo_listener = MongoCommandTimer()
+        monitoring.register(_mongo_listener)
+
+
+# ================== CACHES & QUEUE ==================
+_published = {}   # cache name -> (hits, misses) already counted by this process
+_publish_lock = threading.Lock()
+_publisher = None
+_publisher_pid = None
+
+
+def _hits_and_misses(stats):
+    if "hits" in stats:
+        return stats["hits"], stats["misses"]
+    # SharedCache: hits from either tier
+    return stats.get("local_hits", 0) + stats.get("shared_hits", 0), stats.get("misses", 0)
+
+
+def publish_cache_stats():
+    """
+    Add this process's cache hits/misses since the last call to the counters
+    """
+    if not PROMETHEUS_AVAILABLE:
+        return
+    with _publish_lock:
+        for name, cache in tracked_caches().items():
+            try:
+                hits, misses = _hits_and_misses(cache.stats())
+            except Exception as e:
+                print(f"Could not read stats for cache {name}: {e}")
+                continue
+            last_hits, last_misses = _published.get(name, (0, 0))
+            if hits > last_hits:
+                CACHE_REQUESTS.labels(name, "hit").inc(hits - last_hits)
+            if misses > last_misses:
+                CACHE_REQUESTS.labels(name, "miss").inc(misses - last_misses)
+            _published[name] = (hits, misses)
+
+
+def _run_publisher():
+    while True:
+        time.sleep(CACHE_INTERVAL)
+        publish_cache_stats()
+
+
+def start_cache_publisher():
+    """
+    Start the cache publisher thread, once per process
+    """
+    global _publisher, _publisher_pid
+    if _publisher_pid == os.getpid() and _publisher is not None and _publisher.is_alive():
+        return
+    with _publish_lock:
+        if _publisher_pid == os.getpid() and _publisher is not None and _publisher.is_alive():
+            return
+        _publisher = threading.Thread(target=_run_publisher, name="cache-metrics", daemon=True)
+        _publisher_pid = os.getpid()
+        _publisher.start()
+
+
+def update_queue_depth():
+    try:
+        from utils.job_queue import get_queue
+        QUEUE_DEPTH.set(get_queue().depth())
+    except Exception as e:
+        print(f"Could not read ingest queue depth: {e}")
+
+
+# ================== FLASK ==================
+def _start_timer():
+    g._metrics_started = time.perf_counter()
+
+
+def _record_request(response):
+    started = g.pop("_metrics_started", None)
+    if started is not None and request.endpoint != "metrics":
+        REQUEST_LATENCY.labels(
+            request.blueprint or "app",
+            request.endpoint or "unmatched",
+            request.method,
+            str(response.status_code)
+        ).observe(time.perf_counter() - started)
+    return response
+
+
+def metrics():
+    """
+    Prometheus scrape endpoint
+    """
+    publish_cache_stats()
+    update_queue_depth()
+
+    if MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), mimetype=CONTENT_TYPE_LATEST)
+
+
+def init_app(app):
+    """
+    Time every request of `app`, time Mongo commands and serve /metrics
+    """
+    if not PROMETHEUS_AVAILABLE:
+        print("Warning: prometheus_client is not installed; /metrics is disabled")
+        return
+
+    install_mongo_listener()
+    app.before_request(_start_timer)
+    app.after_request(_record_request)
+    app.add_url_rule("/metrics", "metrics", metrics)
+    start_cache_publisher()
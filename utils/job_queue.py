@@ -0,0 +1,301 @@
+"""
+Durable job queue for background ingestion.
+
+Two interchangeable backends:
+    local  - SQLite file shared by every process on the host (default, no
+             extra services; also what tests use)
+    redis  - Redis lists/hashes at REDIS_URL, for multi-host deployments
+
+Select with INGEST_QUEUE_BACKEND; it defaults to redis when REDIS_URL is set,
+since web and worker processes on separate hosts or dynos cannot share the
+local file. A claimed job holds a lease; if its worker
+dies the lease expires and another worker picks the job up again, unless it
+has already been tried MAX_ATTEMPTS times, in which case it is failed.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import closing
+
+QUEUE_BACKEND = os.getenv('INGEST_QUEUE_BACKEND', 'redis' if os.getenv('REDIS_URL') else 'local')
+QUEUE_PATH = os.getenv('INGEST_QUEUE_PATH', os.path.join('data', 'ingest_queue.db'))
+LEASE_SECONDS = int(os.getenv('INGEST_LEASE_SECONDS', 300))
+MAX_ATTEMPTS = int(os.getenv('INGEST_MAX_ATTEMPTS', 3))
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+def new_job_id():
+    return uuid.uuid4().hex
+
+
+class LocalJobQueue:
+    """
+    SQLite-backed queue; safe across threads and processes on one host
+    """
+
+    def __init__(self, path=QUEUE_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    result TEXT,
+                    error TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    lease_until REAL,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at)")
+
+    def _connect(self):
+        # A fresh connection per call keeps this safe to share across threads
+        return sqlite3.connect(self.path, timeout=30, isolation_level=None)
+
+    def enqueue(self, kind, payload):
+        job_id = new_job_id()
+        now = time.time()
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, payload, status, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, kind, json.dumps(payload, default=str), QUEUED, now, now)
+            )
+        return job_id
+
+    def claim(self):
+        """
+        Take the oldest queued job (or one whose lease expired), or None
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            # A job that keeps killing its worker is not handed out again
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, lease_until = NULL, updated_at = ? "
+                "WHERE status = ? AND lease_until < ? AND attempts >= ?",
+                (FAILED, "Lease expired on the last attempt", now, RUNNING, now, MAX_ATTEMPTS)
+            )
+            row = conn.execute(
+                "SELECT id, kind, payload, attempts FROM jobs "
+                "WHERE status = ? OR (status = ? AND lease_until < ?) "
+                "ORDER BY created_at LIMIT 1",
+                (QUEUED, RUNNING, now)
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+
+            conn.execute(
+                "UPDATE jobs SET status = ?, attempts = attempts + 1, lease_until = ?, updated_at = ? WHERE id = ?",
+                (RUNNING, now + LEASE_SECONDS, now, row[0])
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+        return {"id": row[0], "kind": row[1], "payload": json.loads(row[2]), "attempts": row[3] + 1}
+
+    def complete(self, job_id, result):
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, lease_until = NULL, updated_at = ? WHERE id = ?",
+                (DONE, json.dumps(result, default=str), time.time(), job_id)
+            )
+
+    def fail(self, job_id, error, retry=False):
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, lease_until = NULL, updated_at = ? WHERE id = ?",
+                (QUEUED if retry else FAILED, error, time.time(), job_id)
+            )
+
+    def get(self, job_id):
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT id, kind, payload, status, result, error, attempts, created_at, updated_at FROM jobs WHERE id = ?",
+                (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "id": row[0],
+            "kind": row[1],
+            "payload": json.loads(row[2]),
+            "status": row[3],
+            "result": json.loads(row[4]) if row[4] else None,
+            "error": row[5],
+            "attempts": row[6],
+            "created_at": row[7],
+            "updated_at": row[8]
+        }
+
+    def depth(self):
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT COUNT(*) FROM jobs WHERE status = ?", (QUEUED,)).fetchone()[0]
+
+
+# Pop a job id and lease it in one step, so a crash cannot lose it in between.
+# KEYS: queue, leases. ARGV: lease deadline, now, job key prefix
+_CLAIM_SCRIPT = """
+local job_id = redis.call('RPOP', KEYS[1])
+if not job_id then return nil end
+redis.call('ZADD', KEYS[2], ARGV[1], job_id)
+local key = ARGV[3] .. job_id
+local attempts = redis.call('HINCRBY', key, 'attempts', 1)
+redis.call('HSET', key, 'status', 'running', 'updated_at', ARGV[2])
+return {job_id, attempts}
+"""
+
+# Requeue one expired lease, or fail the job if it has no attempts left.
+# KEYS: queue, leases. ARGV: job id, now, job key prefix, max attempts
+_EXPIRE_SCRIPT = """
+if redis.call('ZREM', KEYS[2], ARGV[1]) == 0 then return 0 end
+local key = ARGV[3] .. ARGV[1]
+local attempts = tonumber(redis.call('HGET', key, 'attempts') or '0')
+if attempts >= tonumber(ARGV[4]) then
+    redis.call('HSET', key, 'status', 'failed', 'error', 'Lease expired on the last attempt', 'updated_at', ARGV[2])
+else
+    redis.call('HSET', key, 'status', 'queued', 'updated_at', ARGV[2])
+    redis.call('LPUSH', KEYS[1], ARGV[1])
+end
+return 1
+"""
+
+
+class RedisJobQueue:
+    """
+    Redis-backed queue: job ids on a list, job state in one hash per job
+    """
+
+    def __init__(self, url=None, prefix="ingest"):
+        import redis
+        self.redis = redis.Redis.from_url(url or os.getenv('REDIS_URL', 'redis://localhost:6379/0'),
+                                          decode_responses=True)
+        self.queue_key = f"{prefix}:queue"
+        self.leases_key = f"{prefix}:leases"
+        self.prefix = prefix
+        self._claim = self.redis.register_script(_CLAIM_SCRIPT)
+        self._expire = self.redis.register_script(_EXPIRE_SCRIPT)
+
+    def _job_key(self, job_id):
+        return f"{self.prefix}:job:{job_id}"
+
+    def enqueue(self, kind, payload):
+        job_id = new_job_id()
+        now = time.time()
+        pipe = self.redis.pipeline()
+        pipe.hset(self._job_key(job_id), mapping={
+            "id": job_id,
+            "kind": kind,
+            "payload": json.dumps(payload, default=str),
+            "status": QUEUED,
+            "attempts": 0,
+            "created_at": now,
+            "updated_at": now
+        })
+        pipe.lpush(self.queue_key, job_id)
+        pipe.execute()
+        return job_id
+
+    def _requeue_expired(self):
+        now = time.time()
+        for job_id in self.redis.zrangebyscore(self.leases_key, 0, now):
+            self._expire(keys=[self.queue_key, self.leases_key],
+                         args=[job_id, now, self._job_key(""), MAX_ATTEMPTS])
+
+    def claim(self):
+        self._requeue_expired()
+        now = time.time()
+        claimed = self._claim(keys=[self.queue_key, self.leases_key],
+                              args=[now + LEASE_SECONDS, now, self._job_key("")])
+        if claimed is None:
+            return None
+
+        job_id, attempts = claimed[0], int(claimed[1])
+        job = self.redis.hgetall(self._job_key(job_id))
+        return {"id": job_id, "kind": job["kind"], "payload": json.loads(job["payload"]), "attempts": attempts}
+
+    def complete(self, job_id, result):
+        self.redis.zrem(self.leases_key, job_id)
+        self.redis.hset(self._job_key(job_id), mapping={
+            "status": DONE,
+            "result": json.dumps(result, default=str),
+            "updated_at": time.time()
+        })
+
+    def fail(self, job_id, error, retry=False):
+        self.redis.zrem(self.leases_key, job_id)
+        self.redis.hset(self._job_key(job_id), mapping={
+            "status": QUEUED if retry else FAILED,
+            "error": error,
+            "updated_at": time.time()
+        })
+        if retry:
+            self.redis.lpush(self.queue_key, job_id)
+
+    def get(self, job_id):
+        job = self.redis.hgetall(self._job_key(job_id))
+        if not job:
+            return None
+        return {
+            "id": job["id"],
+            "kind": job["kind"],
+            "payload": json.loads(job["payload"]),
+            "status": job["status"],
+            "result": json.loads(job["result"]) if job.get("result") else None,
+            "error": job.get("error"),
+            "attempts": int(job.get("attempts", 0)),
+            "created_at": float(job["created_at"]),
+            "updated_at": float(job["updated_at"])
+        }
+
+    def depth(self):
+        return self.redis.llen(self.queue_key)
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_queue():
+    """
+    Process-wide queue for the configured backend
+    """
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                if QUEUE_BACKEND == 'redis':
+                    _queue = RedisJobQueue()
+                else:
+                    _queue = LocalJobQueue()
+    return _queue
+
+
+def set_queue(queue):
+    """
+    Swap in a specific queue instance (e.g. a LocalJobQueue on a temp file)
+    """
+    global _queue
+    _queue = queue
@@ -0,0 +1,539 @@
+"""
+Slow-query profiler for every MongoDB command the app sends.
+
+A pymongo command listener turns each read or write into a query shape:
+  - the database and collection,
+  - the command,
+  - the filter with every value replaced by "?",
+  - the sort.
+Per shape it counts calls, total and max time, documents returned and which
+endpoint issued it. An endpoint is a Flask endpoint, or a thread name for
+background jobs. getMore batches are credited to the shape that opened the
+cursor.
+
+Command monitoring does not report how many documents the server examined.
+So a command slower than SLOW_QUERY_MS is re-run once through
+explain("executionStats"), at most once per shape every
+QUERY_PROFILER_SAMPLE_SECONDS. That sample goes to the capped `slow_queries`
+collection with:
+  - docs examined vs returned,
+  - the plan stages, e.g. COLLSCAN,
+  - the index used.
+
+Per-process counters are added to `query_shapes` every
+QUERY_PROFILER_FLUSH_SECONDS. /admin/queries therefore shows the top
+offenders across all gunicorn workers. All of that database work runs on
+one background thread per process, never in the request.
+
+QUERY_PROFILER=false turns the listener off.
+"""
+
+import hashlib
+import json
+import os
+import queue
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from flask import has_request_context, request
+from pymongo import UpdateOne, monitoring
+from pymongo.errors import CollectionInvalid
+
+from utils.db import get_news_db, news_collection
+
+PROFILER_ENABLED = os.getenv('QUERY_PROFILER', 'true').lower() == 'true'
+SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', 100))
+FLUSH_SECONDS = float(os.getenv('QUERY_PROFILER_FLUSH_SECONDS', 10))
+SAMPLE_SECONDS = float(os.getenv('QUERY_PROFILER_SAMPLE_SECONDS', 60))
+SLOW_QUERY_CAP_BYTES = int(os.getenv('SLOW_QUERY_CAP_BYTES', 16 * 1024 * 1024))
+SLOW_QUERY_QUEUE_SIZE = 256
+MAX_OPEN_CURSORS = 10000
+
+SLOW_QUERY_COLLECTION = "slow_queries"
+SHAPES_COLLECTION = "query_shapes"
+
+query_shapes = news_collection(SHAPES_COLLECTION)
+slow_queries = news_collection(SLOW_QUERY_COLLECTION)
+
+# Command -> the part of it that carries the filter
+PROFILED_COMMANDS = {
+    "find": "filter",
+    "aggregate": "pipeline",
+    "count": "query",
+    "distinct": "query",
+    "findAndModify": "query",
+    "update": "updates",
+    "delete": "deletes",
+    "getMore": None
+}
+
+# Fields of each command that explain() accepts back
+EXPLAINABLE_FIELDS = {
+    "find": ("filter", "sort", "projection", "hint", "skip", "limit", "collation"),
+    "aggregate": ("pipeline", "hint", "collation"),
+    "count": ("query", "hint", "skip", "limit", "collation"),
+    "distinct": ("key", "query", "collation")
+}
+
+# Stages that write; explaining them with executionStats would write again
+WRITE_STAGES = ("$out", "$merge")
+
+SORTABLE_FIELDS = ("total_ms", "max_ms", "count", "avg_ms", "examined_per_returned")
+
+
+# ================== SHAPES ==================
+def normalize(value):
+    """
+    The structure of a filter with its values replaced by "?"
+    """
+    if isinstance(value, dict):
+        return {key: normalize(item) for key, item in value.items()}
+    if isinstance(value, list):
+        # $and/$or clauses keep their structure, value lists collapse
+        if value and all(isinstance(item, dict) for item in value):
+            return [normalize(item) for item in value]
+        return ["?"]
+    return "?"
+
+
+def _pipeline_shape(pipeline):
+    shape = []
+    for stage in pipeline or []:
+        if not isinstance(stage, dict) or not stage:
+            continue
+        name, spec = next(iter(stage.items()))
+        if name == "$match":
+            shape.append({name: normalize(spec)})
+        elif name == "$sort":
+            shape.append({name: spec})
+        else:
+            shape.append(name)
+    return shape
+
+
+def command_shape(database, command_name, command):
+    """
+    (shape_id, shape dict) for a command, or None if it is not profiled
+    """
+    collection = command.get(command_name)
+    if not isinstance(collection, str):
+        return None
+
+    shape = {"db": database, "collection": collection, "command": command_name}
+    if command_name == "aggregate":
+        shape["pipeline"] = _pipeline_shape(command.get("pipeline"))
+    elif command_name in ("update", "delete"):
+        statements = command.get(PROFILED_COMMANDS[command_name]) or [{}]
+        shape["filter"] = normalize(statements[0].get("q", {}))
+    else:
+        shape["filter"] = normalize(command.get(PROFILED_COMMANDS[command_name]) or {})
+        if command.get("sort"):
+            shape["sort"] = dict(command["sort"])
+
+    text = json.dumps(shape, sort_keys=True, default=str)
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16], shape
+
+
+def describe(shape):
+    """
+    One-line rendering of a shape for the admin page
+    """
+    detail = shape.get("pipeline", shape.get("filter"))
+    text = f"{shape['collection']}.{shape['command']} {json.dumps(detail, default=str)}"
+    if shape.get("sort"):
+        text += f" sort={json.dumps(shape['sort'], default=str)}"
+    return text
+
+
+def current_origin():
+    """
+    The Flask endpoint serving this thread, or the thread's name
+    """
+    if has_request_context():
+        return request.endpoint or "unmatched"
+    name = threading.current_thread().name
+    if name == "MainThread":
+        return f"script:{os.path.basename(sys.argv[0]) or 'python'}"
+    # Pool threads are numbered; one entry per pool is enough
+    return "thread:" + re.sub(r"[-_]\d+(_\d+)?$", "", name)
+
+
+def _returned(command_name, reply):
+    if command_name in ("find", "aggregate"):
+        return len(reply.get("cursor", {}).get("firstBatch", []))
+    if command_name == "getMore":
+        return len(reply.get("cursor", {}).get("nextBatch", []))
+    if command_name == "distinct":
+        return len(reply.get("values", []))
+    if command_name == "findAndModify":
+        return 1 if reply.get("value") else 0
+    if command_name in ("update", "delete"):
+        return reply.get("n", 0)
+    return 1
+
+
+# ================== LISTENER ==================
+class QueryProfiler(monitoring.CommandListener):
+    """
+    Aggregates commands by shape in memory and hands slow ones to the
+    background thread
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}    # (connection_id, request_id) -> (shape_id, shape, origin, command, cursor_id)
+        self._cursors = {}    # cursor id -> (shape_id, shape, origin, command that opened it)
+        self._stats = {}      # shape_id -> counters since the last flush
+        self._sampled_at = {}    # shape_id -> time of its last explain
+        self._samples = queue.Queue(maxsize=SLOW_QUERY_QUEUE_SIZE)
+        self._worker = None
+        self._worker_pid = None
+
+    # --- monitoring.CommandListener ---
+    def started(self, event):
+        command = event.command
+        if event.command_name == "killCursors":
+            for cursor_id in command.get("cursors", []):
+                self._cursors.pop(cursor_id, None)
+            return
+        if event.command_name not in PROFILED_COMMANDS or threading.current_thread() is self._worker:
+            return
+
+        cursor_id = None
+        if event.command_name == "getMore":
+            # Credited to the command that opened the cursor
+            cursor_id = command.get("getMore")
+            entry = self._cursors.get(cursor_id)
+            if entry is None:
+                return
+            shape_id, shape, origin, command = entry
+        else:
+            result = command_shape(event.database_name, event.command_name, command)
+            if result is None or result[1]["collection"] in (SHAPES_COLLECTION, SLOW_QUERY_COLLECTION):
+                return
+            shape_id, shape = result
+            origin = current_origin()
+
+        self._pending[(event.connection_id, event.request_id)] = (shape_id, shape, origin, command, cursor_id)
+
+    def succeeded(self, event):
+        entry = self._pending.pop((event.connection_id, event.request_id), None)
+        if entry is None:
+            return
+        shape_id, shape, origin, command, cursor_id = entry
+        reply = event.reply
+
+        # Later batches of an open cursor belong to the same shape
+        cursor = reply.get("cursor")
+        if isinstance(cursor, dict) and cursor.get("id"):
+            if len(self._cursors) >= MAX_OPEN_CURSORS:
+                self._cursors.clear()
+            self._cursors[cursor["id"]] = (shape_id, shape, origin, command)
+        elif cursor_id is not None:
+            self._cursors.pop(cursor_id, None)
+
+        duration_ms = event.duration_micros / 1000
+        returned = _returned(event.command_name, reply)
+        self._record(shape_id, shape, origin, duration_ms, returned)
+
+        if duration_ms >= SLOW_QUERY_MS:
+            self._sample(shape_id, shape, origin, command, duration_ms, returned)
+
+    def failed(self, event):
+        entry = self._pending.pop((event.connection_id, event.request_id), None)
+        if entry is None:
+            return
+        shape_id, shape, origin, _, cursor_id = entry
+        if cursor_id is not None:
+            self._cursors.pop(cursor_id, None)
+        self._record(shape_id, shape, origin, event.duration_micros / 1000, 0, error=True)
+
+    # --- aggregation ---
+    def _record(self, shape_id, shape, origin, duration_ms, returned, error=False):
+        self._ensure_worker()
+        with self._lock:
+            stats = self._stats.get(shape_id)
+            if stats is None:
+                stats = self._stats[shape_id] = {
+                    "shape": shape, "count": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0,
+                    "docs_returned": 0, "origins": Counter()
+                }
+            stats["count"] += 1
+            stats["errors"] += error
+            stats["total_ms"] += duration_ms
+            stats["max_ms"] = max(stats["max_ms"], duration_ms)
+            stats["docs_returned"] += returned
+            stats["origins"][origin] += 1
+
+    def _sample(self, shape_id, shape, origin, command, duration_ms, returned):
+        now = time.monotonic()
+        with self._lock:
+            if now - self._sampled_at.get(shape_id, -SAMPLE_SECONDS) < SAMPLE_SECONDS:
+                return
+            self._sampled_at[shape_id] = now
+        try:
+            self._samples.put_nowait({
+                "shape_id": shape_id,
+                "shape": shape,
+                "origin": origin,
+                "command_name": shape["command"],
+                "command": command,
+                "duration_ms": round(duration_ms, 2),
+                "docs_returned": returned,
+                "at": datetime.utcnow()
+            })
+        except queue.Full:
+            pass
+
+    def take_stats(self):
+        with self._lock:
+            stats, self._stats = self._stats, {}
+        return stats
+
+    # --- background thread ---
+    def _ensure_worker(self):
+        if self._worker_pid == os.getpid() and self._worker is not None:
+            return
+        with self._lock:
+            if self._worker_pid == os.getpid() and self._worker is not None:
+                return
+            if self._worker_pid is not None:
+                # A forked child inherits the parent's counters, samples and
+                # cursors; they are the parent's to report
+                self._samples = queue.Queue(maxsize=SLOW_QUERY_QUEUE_SIZE)
+                self._stats = {}
+                self._cursors = {}
+            self._worker = threading.Thread(target=self._run, name="query-profiler", daemon=True)
+            self._worker_pid = os.getpid()
+            self._worker.start()
+
+    def _run(self):
+        last_flush = time.monotonic()
+        while True:
+            try:
+                sample = self._samples.get(timeout=max(FLUSH_SECONDS - (time.monotonic() - last_flush), 0.1))
+                store_sample(sample)
+            except queue.Empty:
+                pass
+            except Exception as e:
+                print(f"Could not store slow query sample: {e}")
+
+            if time.monotonic() - last_flush >= FLUSH_SECONDS:
+                last_flush = time.monotonic()
+                try:
+                    flush(self)
+                except Exception as e:
+                    print(f"Could not flush query profile: {e}")
+
+
+# ================== STORAGE ==================
+_capped_ready = False
+
+
+def _ensure_capped():
+    global _capped_ready
+    if _capped_ready:
+        return
+    db = get_news_db()
+    if SLOW_QUERY_COLLECTION not in db.list_collection_names():
+        try:
+            db.create_collection(SLOW_QUERY_COLLECTION, capped=True, size=SLOW_QUERY_CAP_BYTES)
+        except CollectionInvalid:
+            pass   # another worker created it first
+    _capped_ready = True
+
+
+def _field(origin):
+    # Endpoint names contain dots, which Mongo reads as paths
+    return origin.replace(".", ":").replace("$", "_")
+
+
+def flush(profiler=None):
+    """
+    Add the counters collected since the last flush to query_shapes
+    """
+    profiler = profiler or _profiler
+    if profiler is None:
+        return 0
+    stats = profiler.take_stats()
+    if not stats:
+        return 0
+
+    now = datetime.utcnow()
+    query_shapes.bulk_write([
+        UpdateOne(
+            {"_id": shape_id},
+            {
+                "$inc": {
+                    "count": item["count"],
+                    "errors": item["errors"],
+                    "total_ms": round(item["total_ms"], 3),
+                    "docs_returned": item["docs_returned"],
+                    **{f"origins.{_field(origin)}": n for origin, n in item["origins"].items()}
+                },
+                "$max": {"max_ms": round(item["max_ms"], 3)},
+                "$set": {"last_seen": now},
+                "$setOnInsert": {"shape": item["shape"], "description": describe(item["shape"]), "first_seen": now}
+            },
+            upsert=True
+        )
+        for shape_id, item in stats.items()
+    ], ordered=False)
+    return len(stats)
+
+
+def _sum_key(node, key):
+    if isinstance(node, dict):
+        return sum(_sum_key(value, key) if k != key else (value if isinstance(value, (int, float)) else 0)
+                   for k, value in node.items())
+    if isinstance(node, list):
+        return sum(_sum_key(item, key) for item in node)
+    return 0
+
+
+def explain_sample(sample):
+    """
+    docs/keys examined, plan stages and indexes from explain("executionStats")
+    """
+    from utils.indexes import plan_details
+
+    command_name = sample["command_name"]
+    fields = EXPLAINABLE_FIELDS.get(command_name)
+    if fields is None:
+        return {}
+    command = sample["command"]
+    explained = {command_name: sample["shape"]["collection"]}
+    explained.update({field: command[field] for field in fields if field in command})
+    if command_name == "aggregate":
+        if any(stage_name in stage for stage in explained.get("pipeline", []) for stage_name in WRITE_STAGES):
+            return {}
+        explained["cursor"] = {}
+
+    plan = get_news_db().client[sample["shape"]["db"]].command(
+        "explain", explained, verbosity="executionStats"
+    )
+    stages, index_names = plan_details(plan)
+    return {
+        "docs_examined": _sum_key(plan, "totalDocsExamined"),
+        "keys_examined": _sum_key(plan, "totalKeysExamined"),
+        "plan": sorted(set(stages)),
+        "indexes": sorted(index_names)
+    }
+
+
+def store_sample(sample):
+    """
+    Explain a slow command, keep the sample and credit its shape
+    """
+    try:
+        details = explain_sample(sample)
+    except Exception as e:
+        details = {"explain_error": str(e)}
+
+    _ensure_capped()
+    slow_queries.insert_one({
+        "shape_id": sample["shape_id"],
+        "description": describe(sample["shape"]),
+        "collection": sample["shape"]["collection"],
+        "command": sample["command_name"],
+        "origin": sample["origin"],
+        "duration_ms": sample["duration_ms"],
+        "docs_returned": sample["docs_returned"],
+        "at": sample["at"],
+        **details
+    })
+
+    if "docs_examined" in details:
+        query_shapes.update_one(
+            {"_id": sample["shape_id"]},
+            {
+                "$inc": {"sampled": 1, "sampled_examined": details["docs_examined"],
+                         "sampled_returned": sample["docs_returned"]},
+                "$set": {"plan": details["plan"], "indexes": details["indexes"]},
+                "$setOnInsert": {"shape": sample["shape"], "description": describe(sample["shape"])}
+            },
+            upsert=True
+        )
+
+
+# ================== READING ==================
+def top_shapes(limit=20, sort="total_ms"):
+    """
+    The heaviest query shapes across all processes
+    """
+    if sort not in SORTABLE_FIELDS:
+        raise ValueError(f"Cannot sort by {sort}")
+    flush()
+
+    shapes = list(query_shapes.aggregate([
+        {"$addFields": {
+            "avg_ms": {"$divide": ["$total_ms", {"$max": ["$count", 1]}]},
+            "examined_per_returned": {
+                "$cond": [{"$gt": ["$sampled", 0]},
+                          {"$divide": ["$sampled_examined", {"$max": ["$sampled_returned", 1]}]},
+                          None]
+            }
+        }},
+        {"$sort": {sort: -1}},
+        {"$limit": limit}
+    ]))
+    for shape in shapes:
+        origins = shape.get("origins") or {}
+        shape["top_origins"] = [
+            {"origin": origin.replace(":", "."), "count": n}
+            for origin, n in sorted(origins.items(), key=lambda item: item[1], reverse=True)[:3]
+        ]
+        shape["avg_ms"] = round(shape["avg_ms"], 2)
+        if shape.get("examined_per_returned") is not None:
+            shape["examined_per_returned"] = round(shape["examined_per_returned"], 1)
+    return shapes
+
+
+def recent_slow(limit=20):
+    """
+    Newest slow samples first
+    """
+    return list(slow_queries.find({}, {"_id": 0}).sort("$natural", -1).limit(limit))
+
+
+def reset():
+    """
+    Forget every recorded shape and sample
+    """
+    if _profiler is not None:
+        _profiler.take_stats()
+    query_shapes.delete_many({})
+    get_news_db().drop_collection(SLOW_QUERY_COLLECTION)
+    global _capped_ready
+    _capped_ready = False
+
+
+# ================== SETUP ==================
+_profiler = None
+
+
+def install():
+    """
+    Register the listener; like any pymongo listener it applies to clients
+    created afterwards, and utils.db creates its client on first use
+    """
+    global _profiler
+    if PROFILER_ENABLED and _profiler is None:
+        _profiler = QueryProfiler()
+        monitoring.register(_profiler)
+    return _profiler
+
+
+def init_app(app):
+    """
+    Profile the commands of `app`'s Mongo client; SLOW_QUERY_MS may be set
+    in app.config
+    """
+    global SLOW_QUERY_MS
+    if app.config.get('SLOW_QUERY_MS') is not None:
+        SLOW_QUERY_MS = float(app.config['SLOW_QUERY_MS'])
+    install()
@@ -0,0 +1,242 @@
+"""
+Personalized ranking for /user/for_you.
+
+Candidates are the newest FOR_YOU_POOL_SIZE articles, loaded once per
+process together with per-article feature arrays (category index, publish
+time, credibility, popularity). The pool reloads when the ingest watermark
+moves, or after FOR_YOU_POOL_TTL seconds.
+
+A user's score for every candidate is a weighted sum of
+  - category affinity from category_preferences and the categories of the
+    articles they liked, shared and read,
+  - recency, halving every FOR_YOU_HALF_LIFE_HOURS,
+  - credibility,
+  - popularity (log of likes),
+computed as one NumPy expression over the pool. Articles the user already
+read are dropped. Each user's top-K is cached for FOR_YOU_TTL seconds.
+"""
+
+import math
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+from bson import ObjectId
+
+from utils.cache import LRUCache, track
+from utils.db import news_collection, app_collection
+from utils.feed import CARD_PROJECTION, to_card
+from utils import watermark
+
+news_master = news_collection("news_master")
+users = app_collection("users")
+
+FOR_YOU_SIZE = int(os.getenv('FOR_YOU_SIZE', 50))
+FOR_YOU_TTL = int(os.getenv('FOR_YOU_TTL', 60))
+FOR_YOU_POOL_SIZE = int(os.getenv('FOR_YOU_POOL_SIZE', 2000))
+FOR_YOU_POOL_TTL = int(os.getenv('FOR_YOU_POOL_TTL', 300))
+# Under steady ingestion, reload for new articles at most this often
+FOR_YOU_POOL_MIN_AGE = int(os.getenv('FOR_YOU_POOL_MIN_AGE', 10))
+FOR_YOU_HALF_LIFE_HOURS = float(os.getenv('FOR_YOU_HALF_LIFE_HOURS', 24))
+
+WEIGHTS = {
+    "affinity": 0.45,
+    "recency": 0.30,
+    "credibility": 0.15,
+    "popularity": 0.10
+}
+
+# How strongly each profile signal counts towards a category's affinity
+SIGNAL_WEIGHTS = {
+    "liked_articles": 2.0,
+    "shared_articles": 3.0,
+    "reading_history": 1.0
+}
+
+PROFILE_PROJECTION = {
+    "category_preferences": 1,
+    "liked_articles": 1,
+    "shared_articles": 1,
+    "reading_history": 1
+}
+
+_rankings = track("for_you", LRUCache(maxsize=10000, ttl=FOR_YOU_TTL))
+
+
+def _timestamp(doc):
+    value = doc.get("created_at") or doc.get("publishedAt")
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return 0.0
+    if isinstance(value, datetime):
+        # Mongo hands back naive UTC datetimes
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.timestamp()
+    return 0.0
+
+
+def unit_score(value, default):
+    """
+    Credibility-style value as a 0..1 float; accepts 0..100 percentages
+    """
+    if not isinstance(value, (int, float)) or isinstance(value, bool):
+        return default
+    if value > 1:
+        value = value / 100
+    return min(max(float(value), 0.0), 1.0)
+
+
+def _article_ids(entries):
+    """
+    Article ids from a profile list holding ids or {"article_id": ...} dicts
+    """
+    ids = []
+    for entry in entries or []:
+        if isinstance(entry, dict):
+            entry = entry.get("article_id") or entry.get("news_id") or entry.get("_id")
+        if entry:
+            ids.append(str(entry))
+    return ids
+
+
+class CandidatePool:
+    """
+    Recent article cards plus their feature arrays
+    """
+
+    def __init__(self, docs, version=None):
+        self.version = version
+        self.cards = [to_card(doc) for doc in docs]
+        self.rows = {card["_id"]: row for row, card in enumerate(self.cards)}
+
+        self.categories = sorted({doc.get("category") or "general" for doc in docs})
+        category_index = {category: i for i, category in enumerate(self.categories)}
+        self.category = np.array(
+            [category_index[doc.get("category") or "general"] for doc in docs], dtype=np.int32
+        )
+        self.published = np.array([_timestamp(doc) for doc in docs], dtype=np.float64)
+        self.credibility = np.array([unit_score(doc.get("credibility"), 0.5) for doc in docs], dtype=np.float64)
+
+        likes = np.array([max(doc.get("likes") or 0, 0) for doc in docs], dtype=np.float64)
+        popularity = np.log1p(likes)
+        self.popularity = popularity / popularity.max() if len(docs) and popularity.max() > 0 else popularity
+
+    def __len__(self):
+        return len(self.cards)
+
+    def affinity(self, profile):
+        """
+        Per-category affinity in 0..1 for a user profile
+        """
+        weights = np.zeros(len(self.categories), dtype=np.float64)
+        category_index = {category: i for i, category in enumerate(self.categories)}
+
+        for category, value in (profile.get("category_preferences") or {}).items():
+            if category in category_index and isinstance(value, (int, float)):
+                weights[category_index[category]] += max(float(value), 0.0)
+
+        for field, signal_weight in SIGNAL_WEIGHTS.items():
+            rows = [self.rows[i] for i in _article_ids(profile.get(field)) if i in self.rows]
+            if rows:
+                np.add.at(weights, self.category[rows], signal_weight)
+
+        top = weights.max() if len(weights) else 0
+        return weights / top if top > 0 else weights
+
+    def rank(self, profile, k=FOR_YOU_SIZE, now=None):
+        """
+        The k best cards for a profile, best first
+        """
+        if not len(self):
+            return []
+        now = now or time.time()
+
+        age_hours = np.maximum(now - self.published, 0) / 3600
+        recency = np.exp(-math.log(2) * age_hours / FOR_YOU_HALF_LIFE_HOURS)
+
+        scores = (
+            WEIGHTS["affinity"] * self.affinity(profile)[self.category]
+            + WEIGHTS["recency"] * recency
+            + WEIGHTS["credibility"] * self.credibility
+            + WEIGHTS["popularity"] * self.popularity
+        )
+
+        read = [self.rows[i] for i in _article_ids(profile.get("reading_history")) if i in self.rows]
+        if read:
+            scores[read] = -np.inf
+
+        k = min(k, int(np.isfinite(scores).sum()))
+        if k <= 0:
+            return []
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best])]
+        return [self.cards[row] for row in best]
+
+
+_pool = None
+_pool_loaded_at = 0.0
+_pool_lock = threading.Lock()
+
+
+def _load_pool(version):
+    docs = list(
+        news_master
+        .find({}, CARD_PROJECTION)
+        .sort("created_at", -1)
+        .limit(FOR_YOU_POOL_SIZE)
+    )
+    return CandidatePool(docs, version=version)
+
+
+def get_pool():
+    """
+    This process's candidate pool, reloaded when news_master changes
+    """
+    global _pool, _pool_loaded_at
+    current = watermark.current()
+    version = current[0] if current else None
+
+    with _pool_lock:
+        age = time.time() - _pool_loaded_at
+        changed = version is not None and _pool is not None and _pool.version != version
+        if _pool is None or age > FOR_YOU_POOL_TTL or (changed and age > FOR_YOU_POOL_MIN_AGE):
+            _pool = _load_pool(version)
+            _pool_loaded_at = time.time()
+        return _pool
+
+
+def get_profile(user_id):
+    if not user_id:
+        return {}
+    try:
+        return users.find_one({"_id": ObjectId(user_id)}, PROFILE_PROJECTION) or {}
+    except Exception as e:
+        print(f"Could not load profile for {user_id}: {e}")
+        return {}
+
+
+def get_for_you(user_id=None, k=FOR_YOU_SIZE):
+    """
+    Top-k article cards for a user (or for anonymous visitors)
+    """
+    pool = get_pool()
+    key = (user_id or "anonymous", pool.version, k)
+
+    cards = _rankings.get(key)
+    if cards is None:
+        cards = pool.rank(get_profile(user_id), k=k)
+        _rankings.set(key, cards)
+
+    # Callers get their own list so they cannot reorder the cached one
+    return list(cards)
+
+
+def ranking_cache_stats():
+    stats = _rankings.stats()
+    stats["pool_size"] = len(_pool) if _pool is not None else 0
+    return stats
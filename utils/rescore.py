@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+"""
+Backfill and re-scoring engine for news_master.
+
+Splits news_master into _id-range partitions, runs the chosen enrichment
+stages over each partition in a pool of worker processes and writes the
+results back with unordered bulk writes. Stages:
+
+    sentiment  sentiment / sentiment_score from utils.sentiment, per batch
+    dedup      cluster_id from utils.dedup; articles without a known
+               near-duplicate start a new cluster with their own verdict
+    llm        credibility, fake_prob, category and summary from the current
+               analysis prompt (analyze_with_gemini_free), rate limited across
+               all workers by --llm-rate calls per minute
+
+Every partition keeps a checkpoint (the last _id written) in
+`rescore_checkpoints`, so an interrupted run continues where it stopped with
+--resume RUN_ID. Each run is described in `rescore_runs`.
+
+Examples:
+    python -m utils.rescore --stages sentiment --missing sentiment_score
+    python -m utils.rescore --stages dedup,llm --partitions 32 --workers 4 --llm-rate 60
+    python -m utils.rescore --mongo-uri mongodb://localhost:27017/ --stages sentiment
+    python -m utils.rescore --resume 20260101T120000-1a2b3c
+    python -m utils.rescore --list
+"""
+
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from multiprocessing import get_context
+
+from bson import json_util
+from pymongo import UpdateOne
+
+from utils import db
+from utils.db import news_collection
+
+news_master = news_collection("news_master")
+rescore_runs = news_collection("rescore_runs")
+rescore_checkpoints = news_collection("rescore_checkpoints")
+
+RESCORE_BATCH_SIZE = int(os.getenv('RESCORE_BATCH_SIZE', 1000))
+RESCORE_PARTITIONS = int(os.getenv('RESCORE_PARTITIONS', 16))
+RESCORE_WORKERS = int(os.getenv('RESCORE_WORKERS', max((os.cpu_count() or 2) // 2, 1)))
+LLM_RATE_PER_MINUTE = float(os.getenv('RESCORE_LLM_RATE', 30))
+
+
+# ================== RATE LIMITING ==================
+class RateLimiter:
+    """
+    Spaces calls at least 1/rate seconds apart within a process
+    """
+
+    def __init__(self, rate_per_second):
+        self.interval = 1.0 / rate_per_second if rate_per_second > 0 else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+
+_llm_limiter = RateLimiter(0)
+
+
+# ================== STAGES ==================
+def _text(doc):
+    return doc.get("full_text") or doc.get("content") or doc.get("title") or ""
+
+
+def sentiment_stage(docs):
+    from utils import sentiment
+
+    return sentiment.analyze([_text(doc) for doc in docs])
+
+
+def dedup_stage(docs):
+    from utils import dedup
+
+    updates = []
+    for doc in docs:
+        if doc.get("cluster_id"):
+            updates.append({})
+            continue
+
+        text = _text(doc)
+        match = dedup.find_duplicate(text)
+        if match["cluster_id"]:
+            dedup.record_hit(match["cluster_id"])
+            updates.append({"cluster_id": match["cluster_id"]})
+            continue
+
+        # Only articles with a real LLM verdict seed a cluster
+        if doc.get("evidence_status") and doc["evidence_status"].get("groq") != "ok":
+            updates.append({})
+            continue
+
+        verdict = {
+            "sentiment": {"sentiment": doc.get("sentiment"), "sentiment_score": doc.get("sentiment_score")},
+            "agent_data": {
+                "headline": doc.get("title"),
+                "summary": doc.get("summary"),
+                "category": doc.get("category"),
+                "credibility": doc.get("credibility"),
+                "fake_prob": doc.get("fake_prob"),
+                "evidence_status": doc.get("evidence_status", {})
+            },
+            "evidence_sources": doc.get("evidence_sources") or []
+        }
+        cluster_id = dedup.register(text, verdict, signature=match["signature"], bands=match["bands"])
+        updates.append({"cluster_id": cluster_id})
+    return updates
+
+
+def llm_stage(docs):
+    from utils.reporter_ingest import analyze_with_gemini_free, is_famous
+
+    updates = []
+    for doc in docs:
+        _llm_limiter.wait()
+        try:
+            agent_data = analyze_with_gemini_free(_text(doc))
+        except Exception as e:
+            print(f"LLM re-analysis failed for {doc['_id']}: {e}")
+            updates.append({})
+            continue
+
+        update = {
+            "summary": agent_data.get("summary", doc.get("summary")),
+            "category": agent_data.get("category", doc.get("category")),
+            "llm_rescored_at": datetime.utcnow()
+        }
+        # Famous sources are verified by rule, not by the model
+        if not is_famous(doc.get("source") or ""):
+            update["credibility"] = agent_data.get("credibility", doc.get("credibility"))
+            update["fake_prob"] = agent_data.get("fake_prob", doc.get("fake_prob"))
+        updates.append(update)
+    return updates
+
+
+# Stage name -> (function, fields it reads)
+STAGES = {
+    "sentiment": (sentiment_stage, ["full_text", "content", "title"]),
+    "dedup": (dedup_stage, ["full_text", "content", "title", "summary", "category", "credibility", "fake_prob",
+                            "sentiment", "sentiment_score", "evidence_sources", "evidence_status", "cluster_id"]),
+    "llm": (llm_stage, ["full_text", "content", "title", "summary", "category", "credibility", "fake_prob",
+                        "source"])
+}
+
+
+def run_stages(stages, docs):
+    """
+    [(_id, {field: value})] for the docs, merging every stage's updates
+    """
+    merged = [{} for _ in docs]
+    for name in stages:
+        stage, _ = STAGES[name]
+        for update, result in zip(merged, stage(docs)):
+            update.update(result)
+    return [(doc["_id"], update) for doc, update in zip(docs, merged) if update]
+
+
+# ================== PLANNING ==================
+def plan_partitions(query, count):
+    """
+    _id ranges [lo, hi) of roughly equal size; the last range is open-ended
+    """
+    buckets = list(news_master.aggregate([
+        {"$match": query},
+        {"$bucketAuto": {"groupBy": "$_id", "buckets": count}}
+    ], allowDiskUse=True))
+
+    partitions = []
+    for i, bucket in enumerate(buckets):
+        hi = buckets[i + 1]["_id"]["min"] if i + 1 < len(buckets) else None
+        partitions.append({"lo": bucket["_id"]["min"], "hi": hi})
+    return partitions
+
+
+def create_run(stages, query, partition_count):
+    run_id = f"{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:6]}"
+    partitions = plan_partitions(query, partition_count)
+    now = datetime.utcnow()
+
+    rescore_runs.insert_one({
+        "_id": run_id,
+        "stages": stages,
+        "query": json_util.dumps(query),
+        "partitions": len(partitions),
+        "status": "running",
+        "created_at": now
+    })
+    if partitions:
+        rescore_checkpoints.insert_many([
+            {
+                "_id": f"{run_id}:{index}",
+                "run_id": run_id,
+                "index": index,
+                "lo": partition["lo"],
+                "hi": partition["hi"],
+                "last_id": None,
+                "processed": 0,
+                "updated": 0,
+                "done": False,
+                "error": None,
+                "updated_at": now
+            }
+            for index, partition in enumerate(partitions)
+        ])
+    return run_id
+
+
+# ================== WORKERS ==================
+def _init_worker(mongo_settings, llm_rate_per_second):
+    global _llm_limiter
+    db.configure(mongo_settings)
+    _llm_limiter = RateLimiter(llm_rate_per_second)
+
+
+def process_partition(checkpoint_id, batch_size=RESCORE_BATCH_SIZE, dry_run=False):
+    """
+    Run the partition's stages from its checkpoint to its end; returns
+    (checkpoint_id, processed, updated)
+    """
+    checkpoint = rescore_checkpoints.find_one({"_id": checkpoint_id})
+    run = rescore_runs.find_one({"_id": checkpoint["run_id"]})
+    stages = run["stages"]
+    query = json_util.loads(run["query"])
+    projection = sorted({field for name in stages for field in STAGES[name][1]})
+
+    processed, updated = checkpoint["processed"], checkpoint["updated"]
+    last_id = checkpoint["last_id"]
+
+    while True:
+        id_range = {"$gt": last_id} if last_id is not None else {"$gte": checkpoint["lo"]}
+        if checkpoint["hi"] is not None:
+            id_range["$lt"] = checkpoint["hi"]
+
+        docs = list(
+            news_master
+            .find({**query, "_id": id_range}, projection)
+            .sort("_id", 1)
+            .limit(batch_size)
+        )
+        if not docs:
+            break
+
+        try:
+            updates = run_stages(stages, docs)
+            if updates and not dry_run:
+                news_master.bulk_write([
+                    UpdateOne({"_id": _id}, {"$set": fields}) for _id, fields in updates
+                ], ordered=False)
+        except Exception as e:
+            # Stop here; --resume picks up from the last written batch
+            rescore_checkpoints.update_one(
+                {"_id": checkpoint_id},
+                {"$set": {"error": str(e), "updated_at": datetime.utcnow()}}
+            )
+            raise
+
+        last_id = docs[-1]["_id"]
+        processed += len(docs)
+        updated += len(updates)
+        if not dry_run:
+            rescore_checkpoints.update_one(
+                {"_id": checkpoint_id},
+                {"$set": {"last_id": last_id, "processed": processed, "updated": updated,
+                          "error": None, "updated_at": datetime.utcnow()}}
+            )
+
+    if not dry_run:
+        rescore_checkpoints.update_one(
+            {"_id": checkpoint_id},
+            {"$set": {"done": True, "updated_at": datetime.utcnow()}}
+        )
+    return checkpoint_id, processed, updated
+
+
+def _after_run(stages):
+    """
+    Refresh what is derived from the fields the stages changed
+    """
+    from utils import rollup, watermark
+
+    if "sentiment" in stages or "llm" in stages:
+        rollup.rebuild()
+        print("✅ Rebuilt dashboard rollups")
+
+    categories = [c for c in news_master.distinct("category") if c]
+    watermark.bump(watermark.ALL_SCOPE, *[watermark.category_scope(c) for c in categories])
+
+
+def run(run_id, workers=RESCORE_WORKERS, batch_size=RESCORE_BATCH_SIZE, llm_rate=LLM_RATE_PER_MINUTE,
+        dry_run=False):
+    """
+    Process every unfinished partition of a run; returns (processed, updated)
+    """
+    run_doc = rescore_runs.find_one({"_id": run_id})
+    if run_doc is None:
+        raise ValueError(f"Unknown rescore run: {run_id}")
+
+    pending = [c["_id"] for c in rescore_checkpoints.find({"run_id": run_id, "done": False}, {"_id": 1}).sort("index", 1)]
+    print(f"🚀 Run {run_id}: stages {','.join(run_doc['stages'])}, "
+          f"{len(pending)} of {run_doc['partitions']} partitions left, {workers} workers")
+
+    started = time.time()
+    processed = updated = failed = 0
+    # Spawned workers: no inherited Mongo sockets or evidence-pool threads
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(dict(db._settings), llm_rate / 60 / max(workers, 1))
+    ) as pool:
+        futures = [pool.submit(process_partition, checkpoint_id, batch_size, dry_run) for checkpoint_id in pending]
+        for future in as_completed(futures):
+            try:
+                checkpoint_id, done, changed = future.result()
+                processed += done
+                updated += changed
+                print(f"   ✅ {checkpoint_id}: {done} scanned, {changed} updated "
+                      f"({time.time() - started:.0f}s elapsed)")
+            except Exception as e:
+                failed += 1
+                print(f"   ❌ Partition failed: {e}")
+
+    status = "failed" if failed else "done"
+    if not dry_run:
+        rescore_runs.update_one(
+            {"_id": run_id},
+            {"$set": {"status": status, "finished_at": datetime.utcnow()}}
+        )
+        if processed:
+            _after_run(run_doc["stages"])
+
+    print(f"{'❌' if failed else '✅'} Run {run_id} {status}: {processed} scanned, {updated} updated "
+          f"in {time.time() - started:.1f}s" + (f"; resume with --resume {run_id}" if failed else ""))
+    return processed, updated
+
+
+def list_runs(limit=20):
+    for run_doc in rescore_runs.find().sort("created_at", -1).limit(limit):
+        progress = list(rescore_checkpoints.aggregate([
+            {"$match": {"run_id": run_doc["_id"]}},
+            {"$group": {"_id": None, "done": {"$sum": {"$cond": ["$done", 1, 0]}},
+                        "processed": {"$sum": "$processed"}}}
+        ]))
+        progress = progress[0] if progress else {"done": 0, "processed": 0}
+        print(f"   {run_doc['_id']}  {run_doc['status']:<8} {','.join(run_doc['stages']):<20} "
+              f"{progress['done']}/{run_doc['partitions']} partitions, {progress['processed']} scanned")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Backfill and re-score news_master')
+    parser.add_argument('--stages', default='sentiment', help=f"Comma-separated stages: {', '.join(STAGES)}")
+    parser.add_argument('--missing', metavar='FIELD', help='Only articles without this field')
+    parser.add_argument('--query', help='Extra filter as MongoDB extended JSON')
+    parser.add_argument('--partitions', type=int, default=RESCORE_PARTITIONS, help='_id ranges to split into')
+    parser.add_argument('--workers', type=int, default=RESCORE_WORKERS, help='Worker processes')
+    parser.add_argument('--batch-size', type=int, default=RESCORE_BATCH_SIZE, help='Articles per bulk write')
+    parser.add_argument('--llm-rate', type=float, default=LLM_RATE_PER_MINUTE, help='LLM calls per minute, all workers')
+    parser.add_argument('--mongo-uri', help='MongoDB to run against (e.g. a local mongod)')
+    parser.add_argument('--resume', metavar='RUN_ID', help='Continue an interrupted run')
+    parser.add_argument('--dry-run', action='store_true', help='Run the stages without writing anything')
+    parser.add_argument('--list', action='store_true', help='Show recent runs')
+
+    args = parser.parse_args()
+
+    if args.mongo_uri:
+        db.configure({"MONGO_URI": args.mongo_uri})
+
+    if args.list:
+        list_runs()
+    else:
+        if args.resume:
+            run_id = args.resume
+        else:
+            stages = [s.strip() for s in args.stages.split(',') if s.strip()]
+            unknown = [s for s in stages if s not in STAGES]
+            if unknown:
+                parser.error(f"Unknown stages: {', '.join(unknown)}")
+            if "llm" in stages:
+                from utils.reporter_ingest import GROQ_AVAILABLE
+                if not GROQ_AVAILABLE:
+                    parser.error("The llm stage needs GROQ_API_KEY and the groq package")
+
+            query = json_util.loads(args.query) if args.query else {}
+            if args.missing:
+                query[args.missing] = {"$exists": False}
+            run_id = create_run(stages, query, args.partitions)
+
+        run(run_id, workers=args.workers, batch_size=args.batch_size, llm_rate=args.llm_rate, dry_run=args.dry_run)
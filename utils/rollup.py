@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Incrementally maintained news metrics for the admin dashboard.
+
+Every stored article bumps two counter documents in `metrics_rollup`: one
+for its day ("day:YYYY-MM-DD") and one for all time ("all"). The dashboard
+then reads one document per panel instead of re-aggregating news_master.
+
+Articles stored by an ingest job are counted at most once per job: the job
+id is pushed onto a short `recent_jobs` list in the same atomic update as
+the $inc, and an update whose job is already listed matches nothing.
+
+Rebuild from existing data with (ideally while ingestion is quiet, since
+articles stored during the scan can be counted twice or missed):
+    python -m utils.rollup --rebuild
+"""
+
+import os
+
+from pymongo import UpdateOne, ReplaceOne
+from pymongo.errors import BulkWriteError
+
+from utils.db import news_collection
+
+metrics_rollup = news_collection("metrics_rollup")
+news_master = news_collection("news_master")
+
+ALL_TIME_ID = "all"
+
+# Matches the fake_prob threshold used by the admin aggregations
+FAKE_PROB_THRESHOLD = 50
+
+# Job ids remembered per counter document; retries of a job land well
+# within this many newer jobs
+RECENT_JOBS = int(os.getenv('ROLLUP_RECENT_JOBS', 1000))
+
+DUPLICATE_KEY = 11000
+
+
+def day_id(date_str):
+    return f"day:{date_str}"
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _hist_key(score):
+    """
+    Histogram bucket for an exact sentiment score. Field names cannot hold
+    dots, so scores are stored in thousandths.
+    """
+    return str(int(round(score * 1000)))
+
+
+def _increments(doc):
+    inc = {"total_articles": 1}
+
+    if _is_number(doc.get("fake_prob")) and doc["fake_prob"] > FAKE_PROB_THRESHOLD:
+        inc["fake_news_detected"] = 1
+
+    if _is_number(doc.get("credibility")):
+        inc["credibility_sum"] = doc["credibility"]
+        inc["credibility_count"] = 1
+
+    if _is_number(doc.get("sentiment_score")):
+        inc["sentiment_sum"] = doc["sentiment_score"]
+        inc["sentiment_count"] = 1
+        inc[f"sentiment_hist.{_hist_key(doc['sentiment_score'])}"] = 1
+
+    return inc
+
+
+def record_article(doc):
+    """
+    Count a newly inserted article; returns False if the counters could not
+    be written. Each counter document is updated atomically with $inc, so
+    concurrent workers never lose increments, and a doc with a job_id is
+    counted once however often its job runs.
+    """
+    inc = _increments(doc)
+    rollup_ids = [ALL_TIME_ID]
+    if doc.get("date"):
+        rollup_ids.append(day_id(doc["date"]))
+
+    job_id = doc.get("job_id")
+    if job_id is None:
+        ops = [UpdateOne({"_id": rollup_id}, {"$inc": inc}, upsert=True) for rollup_id in rollup_ids]
+    else:
+        ops = [
+            UpdateOne(
+                {"_id": rollup_id, "recent_jobs": {"$ne": job_id}},
+                {"$inc": inc, "$push": {"recent_jobs": {"$each": [job_id], "$slice": -RECENT_JOBS}}},
+                upsert=True
+            )
+            for rollup_id in rollup_ids
+        ]
+
+    try:
+        metrics_rollup.bulk_write(ops, ordered=False)
+    except BulkWriteError as e:
+        # An already counted job misses the filter, and its upsert then
+        # collides with the existing _id
+        errors = [error for error in e.details.get("writeErrors", []) if error.get("code") != DUPLICATE_KEY]
+        if errors or e.details.get("writeConcernErrors"):
+            print(f"Error updating metrics rollup: {e}")
+            return False
+    except Exception as e:
+        print(f"Error updating metrics rollup: {e}")
+        return False
+    return True
+
+
+def get_rollup(rollup_id):
+    return metrics_rollup.find_one({"_id": rollup_id}, {"recent_jobs": 0})
+
+
+def is_initialized():
+    """
+    The all-time document exists once anything was counted or rebuilt
+    """
+    return metrics_rollup.find_one({"_id": ALL_TIME_ID}, {"_id": 1}) is not None
+
+
+def summarize(rollup):
+    """
+    Turn a counter document into the metrics shape the dashboard renders
+    """
+    rollup = rollup or {}
+
+    credibility_count = rollup.get("credibility_count", 0)
+    sentiment_count = rollup.get("sentiment_count", 0)
+    avg_credibility = rollup.get("credibility_sum", 0) / credibility_count if credibility_count else 0
+    avg_sentiment = rollup.get("sentiment_sum", 0) / sentiment_count if sentiment_count else 0
+
+    hist = rollup.get("sentiment_hist") or {}
+    most_common_sentiment = int(max(hist, key=hist.get)) / 1000 if hist else 0
+
+    return {
+        "total_articles": rollup.get("total_articles", 0),
+        "fake_news_detected": rollup.get("fake_news_detected", 0),
+        "avg_credibility": round(avg_credibility * 100, 1) if avg_credibility else 0,
+        "avg_sentiment": round(avg_sentiment, 3) if avg_sentiment else 0,
+        "most_common_sentiment": round(most_common_sentiment, 3)
+    }
+
+
+def rebuild():
+    """
+    Recompute every counter document from news_master in one grouped scan.
+    Groups are keyed on the histogram bucket (thousandths, as _hist_key
+    rounds), not the raw float, so there is one group per day and bucket.
+    """
+    is_scored = {"$isNumber": "$sentiment_score"}
+    pipeline = [
+        {"$group": {
+            "_id": {
+                "date": "$date",
+                "sentiment_bucket": {"$cond": [
+                    is_scored, {"$round": [{"$multiply": ["$sentiment_score", 1000]}, 0]}, None
+                ]}
+            },
+            "total_articles": {"$sum": 1},
+            "fake_news_detected": {
+                "$sum": {"$cond": [{"$gt": ["$fake_prob", FAKE_PROB_THRESHOLD]}, 1, 0]}
+            },
+            "credibility_sum": {"$sum": "$credibility"},
+            "credibility_count": {
+                "$sum": {"$cond": [{"$isNumber": "$credibility"}, 1, 0]}
+            },
+            "sentiment_sum": {"$sum": {"$cond": [is_scored, "$sentiment_score", 0]}},
+            "sentiment_count": {"$sum": {"$cond": [is_scored, 1, 0]}}
+        }}
+    ]
+
+    rollups = {}
+    for group in news_master.aggregate(pipeline, allowDiskUse=True):
+        bucket = group["_id"].get("sentiment_bucket")
+        ids = [ALL_TIME_ID]
+        if group["_id"].get("date"):
+            ids.append(day_id(group["_id"]["date"]))
+
+        for rollup_id in ids:
+            rollup = rollups.setdefault(rollup_id, {
+                "_id": rollup_id,
+                "total_articles": 0,
+                "fake_news_detected": 0,
+                "credibility_sum": 0,
+                "credibility_count": 0,
+                "sentiment_sum": 0,
+                "sentiment_count": 0,
+                "sentiment_hist": {}
+            })
+            for field in ("total_articles", "fake_news_detected", "credibility_sum", "credibility_count",
+                          "sentiment_sum", "sentiment_count"):
+                rollup[field] += group[field]
+            if bucket is not None:
+                key = str(int(bucket))
+                rollup["sentiment_hist"][key] = rollup["sentiment_hist"].get(key, 0) + group["sentiment_count"]
+
+    if ALL_TIME_ID not in rollups:
+        rollups[ALL_TIME_ID] = {"_id": ALL_TIME_ID, "total_articles": 0}
+
+    ops = [ReplaceOne({"_id": rollup_id}, rollup, upsert=True) for rollup_id, rollup in rollups.items()]
+    metrics_rollup.bulk_write(ops, ordered=False)
+
+    # Days that no longer have any articles
+    metrics_rollup.delete_many({"_id": {"$nin": list(rollups)}})
+
+    return len(rollups)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Maintain the news metrics rollup')
+    parser.add_argument('--rebuild', action='store_true', help='Rebuild all counters from news_master')
+    parser.add_argument('--show', metavar='DATE', nargs='?', const=ALL_TIME_ID,
+                        help='Print the rollup for a day (YYYY-MM-DD) or all time')
+
+    args = parser.parse_args()
+
+    if args.rebuild:
+        count = rebuild()
+        print(f"✅ Rebuilt {count} rollup documents")
+    elif args.show:
+        rollup_id = args.show if args.show == ALL_TIME_ID else day_id(args.show)
+        print(summarize(get_rollup(rollup_id)))
+    else:
+        parser.print_help()
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Sentiment scoring with a batch API.
+
+Every backend scores a list of texts at once and returns polarities in
+-1..+1; label() turns a polarity into positive / neutral / negative with the
+thresholds get_sentiment has always used. SENTIMENT_BACKEND picks one:
+
+    lexicon   (default) VADER's lexicon hashed once per process into a dense
+              weight vector. A batch is tokenized by scikit-learn's
+              HashingVectorizer into a sparse count matrix and scored with a
+              single matrix-vector product; "not good"-style negations are
+              bigram entries in the same table.
+    vader     vaderSentiment's compound score, text by text
+    textblob  TextBlob's pattern polarity, text by text (the old behaviour)
+
+Engines are built per process on first use. If the lexicon backend's
+dependencies are missing it falls back to textblob.
+
+Backfill sentiment_score for articles that lack it:
+    python -m utils.sentiment --backfill
+    python -m utils.sentiment --backfill --all --backend lexicon
+"""
+
+import os
+import time
+
+import numpy as np
+
+from utils.services import LazyService, get_textblob, register
+
+SENTIMENT_BACKEND = os.getenv('SENTIMENT_BACKEND', 'lexicon')
+SENTIMENT_THRESHOLD = float(os.getenv('SENTIMENT_THRESHOLD', 0.1))
+LEXICON_FEATURES = int(os.getenv('SENTIMENT_LEXICON_FEATURES', 2 ** 20))
+BACKFILL_BATCH_SIZE = int(os.getenv('SENTIMENT_BACKFILL_BATCH_SIZE', 5000))
+
+# VADER's normalization constant and negation scalar
+VADER_ALPHA = 15.0
+NEGATION_SCALAR = -0.74
+
+NEGATIONS = [
+    "not", "no", "never", "none", "nothing", "nobody", "neither", "nor",
+    "without", "cannot", "can't", "don't", "doesn't", "didn't", "isn't",
+    "aren't", "wasn't", "weren't", "won't", "wouldn't", "shouldn't", "hardly"
+]
+
+TOKEN_PATTERN = r"(?u)\b\w[\w']*\b"
+
+
+def label(score):
+    if score > SENTIMENT_THRESHOLD:
+        return "positive"
+    if score < -SENTIMENT_THRESHOLD:
+        return "negative"
+    return "neutral"
+
+
+class TextBlobEngine:
+    name = "textblob"
+
+    def score_many(self, texts):
+        TextBlob = get_textblob()
+        return np.array([TextBlob(text).sentiment.polarity for text in texts], dtype=np.float64)
+
+
+class VaderEngine:
+    name = "vader"
+
+    def __init__(self):
+        from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+
+        self.analyzer = SentimentIntensityAnalyzer()
+
+    def score_many(self, texts):
+        return np.array(
+            [self.analyzer.polarity_scores(text)["compound"] for text in texts], dtype=np.float64
+        )
+
+
+class LexiconEngine:
+    """
+    Hashed-lexicon scorer: polarity = normalize(counts @ weights)
+    """
+
+    name = "lexicon"
+
+    def __init__(self, n_features=LEXICON_FEATURES):
+        from sklearn.feature_extraction.text import HashingVectorizer
+        from sklearn.utils import murmurhash3_32
+        from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+
+        self.vectorizer = HashingVectorizer(
+            n_features=n_features,
+            token_pattern=TOKEN_PATTERN,
+            ngram_range=(1, 2),
+            alternate_sign=False,
+            norm=None,
+            lowercase=True,
+            dtype=np.float32
+        )
+
+        # Only entries the tokenizer keeps as one token can ever match
+        lexicon = SentimentIntensityAnalyzer().lexicon
+        tokenize = self.vectorizer.build_tokenizer()
+        words = [word for word in lexicon if tokenize(word) == [word] and word == word.lower()]
+        valences = np.array([lexicon[word] for word in words], dtype=np.float32)
+
+        # A negated word's bigram cancels its unigram and adds the negated valence
+        terms = list(words)
+        weights = [valences]
+        for negation in NEGATIONS:
+            terms.extend(f"{negation} {word}" for word in words)
+            weights.append(valences * (NEGATION_SCALAR - 1))
+        weights = np.concatenate(weights)
+
+        # The column HashingVectorizer puts each term in; colliding terms
+        # share their mean weight
+        columns = np.array([abs(murmurhash3_32(term, seed=0)) % n_features for term in terms])
+        totals = np.bincount(columns, weights=weights, minlength=n_features)
+        counts = np.bincount(columns, minlength=n_features)
+        self.weights = np.divide(totals, counts, out=np.zeros(n_features), where=counts > 0).astype(np.float32)
+
+    def score_many(self, texts):
+        if not len(texts):
+            return np.zeros(0, dtype=np.float64)
+        raw = self.vectorizer.transform(texts) @ self.weights
+        raw = np.asarray(raw, dtype=np.float64).ravel()
+        return raw / np.sqrt(raw * raw + VADER_ALPHA)
+
+
+def _lexicon_or_textblob():
+    try:
+        return LexiconEngine()
+    except ImportError as e:
+        print(f"Warning: lexicon sentiment backend unavailable ({e}); using TextBlob")
+        return TextBlobEngine()
+
+
+# Registered with utils.services, so e.g. WARM_SERVICES=sentiment:lexicon
+# builds the weight table before the first submission
+ENGINES = {
+    "lexicon": register(LazyService("sentiment:lexicon", _lexicon_or_textblob)),
+    "vader": register(LazyService("sentiment:vader", VaderEngine)),
+    "textblob": register(LazyService("sentiment:textblob", TextBlobEngine))
+}
+
+
+def get_engine(backend=None):
+    backend = backend or SENTIMENT_BACKEND
+    if backend not in ENGINES:
+        raise ValueError(f"Unknown sentiment backend: {backend}")
+    return ENGINES[backend].get()
+
+
+def score(texts, backend=None):
+    """
+    Polarity in -1..+1 for each text, as a NumPy array
+    """
+    texts = [text or "" for text in texts]
+    return get_engine(backend).score_many(texts)
+
+
+def analyze(texts, backend=None):
+    """
+    [{"sentiment": label, "sentiment_score": polarity}] for each text
+    """
+    return [
+        {"sentiment": label(value), "sentiment_score": round(float(value), 3)}
+        for value in score(texts, backend)
+    ]
+
+
+# ================== BACKFILL ==================
+def backfill(backend=None, rescore_all=False, batch_size=BACKFILL_BATCH_SIZE):
+    """
+    Write sentiment and sentiment_score onto news_master articles (only the
+    ones without a score unless rescore_all); returns the number updated
+    """
+    from pymongo import UpdateOne
+
+    from utils.db import news_collection
+
+    news_master = news_collection("news_master")
+    query = {} if rescore_all else {"sentiment_score": {"$exists": False}}
+    cursor = news_master.find(query, {"full_text": 1, "content": 1, "title": 1}).batch_size(batch_size)
+
+    updated = 0
+    started = time.time()
+    batch = []
+
+    def flush():
+        nonlocal updated
+        results = analyze([doc.get("full_text") or doc.get("content") or doc.get("title") for doc in batch], backend)
+        news_master.bulk_write([
+            UpdateOne({"_id": doc["_id"]}, {"$set": result})
+            for doc, result in zip(batch, results)
+        ], ordered=False)
+        updated += len(batch)
+        batch.clear()
+        print(f"   {updated} articles scored ({updated / max(time.time() - started, 1e-6):.0f}/s)")
+
+    for doc in cursor:
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+    return updated
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Sentiment scoring for news_master')
+    parser.add_argument('--backfill', action='store_true', help='Score articles without a sentiment_score')
+    parser.add_argument('--all', action='store_true', help='With --backfill, re-score every article')
+    parser.add_argument('--backend', choices=sorted(ENGINES), default=SENTIMENT_BACKEND, help='Scoring backend')
+    parser.add_argument('--batch-size', type=int, default=BACKFILL_BATCH_SIZE, help='Articles per batch')
+    parser.add_argument('--text', help='Score a single text and print the result')
+
+    args = parser.parse_args()
+
+    if args.text:
+        print(analyze([args.text], args.backend)[0])
+    elif args.backfill:
+        started = time.time()
+        count = backfill(args.backend, rescore_all=args.all, batch_size=args.batch_size)
+        print(f"✅ Scored {count} articles in {time.time() - started:.1f}s")
+        if count:
+            # The dashboard counters aggregate sentiment_score
+            from utils import rollup
+            rollup.rebuild()
+            print("✅ Rebuilt dashboard rollups")
+    else:
+        parser.print_help()
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Per-process handles for the external services the app uses.
+
+Nothing here connects to anything or loads a model at import time. Each
+handle is built on first use (or by warm_up()) and rebuilt after a fork, the
+same way utils.db treats the Mongo client, so gunicorn workers, recycled
+--max-requests workers and Celery processes start serving without paying for
+services they may never call.
+
+    assistant  Pinecone assistant behind /chat
+    groq       Groq client used by the news analysis
+    textblob   TextBlob class with its sentiment lexicon loaded
+
+Inspect start-up cost with:
+    python -m utils.services --import-time
+    python -m utils.services --warm
+"""
+
+import os
+import threading
+import time
+from importlib.util import find_spec
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Defaults come from the environment and can be overridden from app.config
+# via init_app()
+_settings = {
+    "PINECONE_API_KEY": os.getenv('PINECONE_API_KEY'),
+    "ASSISTANT_NAME": os.getenv('ASSISTANT_NAME', 'news'),
+    "GROQ_API_KEY": os.getenv('GROQ_API_KEY')
+}
+
+
+class LazyService:
+    """
+    A value built by `factory` on first use, once per process
+    """
+
+    def __init__(self, name, factory):
+        self.name = name
+        self.factory = factory
+        self.load_seconds = None
+        self._value = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        pid = os.getpid()
+        if self._pid == pid:
+            return self._value
+
+        with self._lock:
+            if self._pid != pid:
+                started = time.perf_counter()
+                self._value = self.factory()
+                self.load_seconds = round(time.perf_counter() - started, 3)
+                self._pid = pid
+        return self._value
+
+    def loaded(self):
+        return self._pid == os.getpid()
+
+    def reset(self):
+        with self._lock:
+            self._value = None
+            self._pid = None
+            self.load_seconds = None
+
+
+def _make_assistant():
+    if not _settings["PINECONE_API_KEY"]:
+        raise ValueError("PINECONE_API_KEY environment variable is required")
+
+    from pinecone import Pinecone
+
+    pc = Pinecone(api_key=_settings["PINECONE_API_KEY"])
+    return pc.assistant.Assistant(assistant_name=_settings["ASSISTANT_NAME"])
+
+
+def _make_groq():
+    if not groq_available():
+        return None
+
+    from groq import Groq
+
+    return Groq(api_key=_settings["GROQ_API_KEY"])
+
+
+def _load_textblob():
+    from textblob import TextBlob
+
+    # The pattern lexicon is read on the first .sentiment, not on import
+    TextBlob("warm up").sentiment
+    return TextBlob
+
+
+assistant = LazyService("assistant", _make_assistant)
+groq = LazyService("groq", _make_groq)
+textblob = LazyService("textblob", _load_textblob)
+
+SERVICES = {service.name: service for service in (assistant, groq, textblob)}
+
+
+def register(service):
+    """
+    Make another module's LazyService known to warm_up() and service_stats()
+    """
+    SERVICES[service.name] = service
+    return service
+
+
+def init_app(app):
+    """
+    Pick up service settings from the Flask config; handles built with the
+    old settings are rebuilt on next use
+    """
+    changed = False
+    for key in _settings:
+        if app.config.get(key) is not None and app.config[key] != _settings[key]:
+            _settings[key] = app.config[key]
+            changed = True
+
+    if changed:
+        for service in SERVICES.values():
+            service.reset()
+
+
+def groq_available():
+    return bool(_settings["GROQ_API_KEY"]) and find_spec("groq") is not None
+
+
+def get_assistant():
+    return assistant.get()
+
+
+def get_groq():
+    return groq.get()
+
+
+def get_textblob():
+    return textblob.get()
+
+
+def warm_up(names=None):
+    """
+    Build the named services (default: all) now; returns {name: seconds}
+    """
+    timings = {}
+    for name in names or SERVICES:
+        service = SERVICES.get(name)
+        if service is None:
+            print(f"Unknown service: {name}")
+            continue
+        try:
+            service.get()
+            timings[name] = service.load_seconds
+        except Exception as e:
+            print(f"Could not warm up {name}: {e}")
+            timings[name] = None
+    return timings
+
+
+def warm_up_in_background(names):
+    """
+    Warm the named services (a list or comma-separated string) from a daemon
+    thread so start-up is not held up by it
+    """
+    if isinstance(names, str):
+        names = [name.strip() for name in names.split(',') if name.strip()]
+    if not names:
+        return None
+
+    thread = threading.Thread(target=warm_up, args=(names,), name="service-warm-up", daemon=True)
+    thread.start()
+    return thread
+
+
+def service_stats():
+    return {
+        name: {"loaded": service.loaded(), "load_seconds": service.load_seconds}
+        for name, service in SERVICES.items()
+    }
+
+
+def import_times(module="app", top=20):
+    """
+    Run `python -X importtime -c "import <module>"` in a fresh interpreter;
+    returns (total_ms, [(cumulative_ms, self_ms, name)] slowest first)
+    """
+    import subprocess
+    import sys
+
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    )
+
+    # Output is post-order: a module's imports are listed before it, nested
+    # ones indented by two more spaces per level
+    total, children = 0.0, []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip())) // 2
+        row = (int(cumulative_us) / 1000, int(self_us) / 1000, name.strip())
+        if depth == 1:
+            children.append(row)
+        elif depth == 0:
+            if row[2] == module:
+                total = row[0]
+                break
+            children = []
+
+    children.sort(reverse=True)
+    return total, children[:top]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Inspect start-up cost of the app and its services')
+    parser.add_argument('--import-time', action='store_true', help='Profile `import app` in a fresh interpreter')
+    parser.add_argument('--module', default='app', help='Module to profile with --import-time')
+    parser.add_argument('--top', type=int, default=20, help='How many imports to list')
+    parser.add_argument('--warm', action='store_true', help='Build every service and report how long each took')
+
+    args = parser.parse_args()
+
+    if args.import_time:
+        total, rows = import_times(args.module, args.top)
+        print(f"⏱️  import {args.module}: {total:.1f} ms")
+        for cumulative, own, name in rows:
+            print(f"   {cumulative:>9.1f} ms  (self {own:>7.1f} ms)  {name}")
+    elif args.warm:
+        for name, seconds in warm_up().items():
+            print(f"   {name:<10} {'failed' if seconds is None else f'{seconds * 1000:.1f} ms'}")
+    else:
+        parser.print_help()
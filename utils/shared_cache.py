@@ -0,0 +1,158 @@
+"""
+Cache shared by every gunicorn worker.
+
+Entries live in the `cache_entries` collection of the news database with an
+absolute expiry, fronted by a small per-process LRU so repeated reads inside
+one worker skip the round-trip. Values must be BSON-serializable. Mongo
+reaps expired entries through the expires_at TTL index from utils.indexes.
+"""
+
+from datetime import datetime, timedelta
+from pymongo import ReplaceOne
+
+from utils.cache import LRUCache, track
+from utils.db import news_collection
+
+cache_entries = news_collection("cache_entries")
+
+
+class SharedCache:
+    """
+    Namespaced TTL cache stored in Mongo with a local LRU in front
+    """
+
+    def __init__(self, namespace, ttl, local_maxsize=64, local_ttl=None):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.shared_hits = 0
+        self.misses = 0
+        # The local copy never outlives the shared entry
+        self._local = LRUCache(maxsize=local_maxsize, ttl=min(local_ttl or ttl, ttl))
+        track(f"shared:{namespace}", self)
+
+    def _key(self, key):
+        return f"{self.namespace}:{key}"
+
+    def get(self, key, default=None):
+        value = self._local.get(key)
+        if value is not None:
+            return value
+
+        try:
+            entry = cache_entries.find_one({
+                "_id": self._key(key),
+                "expires_at": {"$gt": datetime.utcnow()}
+            })
+        except Exception as e:
+            print(f"Shared cache read failed: {e}")
+            self.misses += 1
+            return default
+
+        if not entry:
+            self.misses += 1
+            return default
+
+        self.shared_hits += 1
+
+        remaining = (entry["expires_at"] - datetime.utcnow()).total_seconds()
+        if remaining > 0:
+            self._local.set(key, entry["value"], ttl=min(remaining, self._local.ttl))
+        return entry["value"]
+
+    def set(self, key, value, ttl=None):
+        ttl = ttl or self.ttl
+        self._local.set(key, value, ttl=min(ttl, self._local.ttl))
+
+        try:
+            cache_entries.replace_one(
+                {"_id": self._key(key)},
+                {
+                    "_id": self._key(key),
+                    "value": value,
+                    "expires_at": datetime.utcnow() + timedelta(seconds=ttl)
+                },
+                upsert=True
+            )
+        except Exception as e:
+            print(f"Shared cache write failed: {e}")
+
+    def get_many(self, keys):
+        """
+        Look up several keys with at most one round-trip; returns
+        {key: value} for the ones found
+        """
+        found = {}
+        missing = []
+        for key in keys:
+            value = self._local.get(key)
+            if value is None:
+                missing.append(key)
+            else:
+                found[key] = value
+
+        if not missing:
+            return found
+
+        now = datetime.utcnow()
+        try:
+            entries = list(cache_entries.find({
+                "_id": {"$in": [self._key(key) for key in missing]},
+                "expires_at": {"$gt": now}
+            }))
+        except Exception as e:
+            print(f"Shared cache read failed: {e}")
+            self.misses += len(missing)
+            return found
+
+        prefix = len(self.namespace) + 1
+        for entry in entries:
+            key = entry["_id"][prefix:]
+            found[key] = entry["value"]
+            remaining = (entry["expires_at"] - now).total_seconds()
+            if remaining > 0:
+                self._local.set(key, entry["value"], ttl=min(remaining, self._local.ttl))
+
+        self.shared_hits += len(entries)
+        self.misses += len(missing) - len(entries)
+        return found
+
+    def set_many(self, items, ttl=None):
+        """
+        Store a {key: value} mapping in one bulk write
+        """
+        if not items:
+            return
+        ttl = ttl or self.ttl
+        for key, value in items.items():
+            self._local.set(key, value, ttl=min(ttl, self._local.ttl))
+
+        expires_at = datetime.utcnow() + timedelta(seconds=ttl)
+        try:
+            cache_entries.bulk_write([
+                ReplaceOne(
+                    {"_id": self._key(key)},
+                    {"_id": self._key(key), "value": value, "expires_at": expires_at},
+                    upsert=True
+                )
+                for key, value in items.items()
+            ], ordered=False)
+        except Exception as e:
+            print(f"Shared cache write failed: {e}")
+
+    def delete(self, key):
+        self._local.pop(key)
+        try:
+            cache_entries.delete_one({"_id": self._key(key)})
+        except Exception as e:
+            print(f"Shared cache delete failed: {e}")
+
+    def stats(self):
+        local = self._local.stats()
+        lookups = local["hits"] + self.shared_hits + self.misses
+        return {
+            "local_hits": local["hits"],
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "local_size": local["size"],
+            "hit_ratio": round((local["hits"] + self.shared_hits) / lookups, 3) if lookups else 0
+        }
@@ -0,0 +1,410 @@
+"""
+In-process inverted index for keyword search over news_master.
+
+Replaces the case-insensitive $regex scans in search_news and the admin news
+listing. Articles are tokenized over INDEXED_FIELDS into lowercase words and
+every word maps to the ascending row numbers of the articles containing it.
+A query matches articles that contain all of its words; with prefix=True the
+last word also matches longer words, for admin type-ahead.
+
+Each process builds the index once from a projection-only scan, or
+warm-starts from the snapshot at TEXT_INDEX_PATH and scans only the articles
+newer than it. Articles stored by this process are added on insert; ones
+inserted elsewhere are picked up by a catch-up scan at most every
+TEXT_INDEX_REFRESH seconds. Loads and catch-ups run outside the lock that
+guards the shared index, so searches keep being served meanwhile.
+
+search() returns at most TEXT_INDEX_MAX_MATCHES ids; match() also returns
+the true number of matches so callers can tell a list was truncated.
+match_batches() yields every match in bounded lists, for exports.
+"""
+
+import bisect
+import os
+import re
+import threading
+import time
+from array import array
+from datetime import timedelta
+
+import numpy as np
+from bson import ObjectId
+
+from utils.db import news_collection
+
+news_master = news_collection("news_master")
+
+INDEXED_FIELDS = ("title", "description", "content", "full_text", "source")
+SNAPSHOT_PATH = os.getenv('TEXT_INDEX_PATH', os.path.join('data', 'text_index.npz'))
+REFRESH_SECONDS = int(os.getenv('TEXT_INDEX_REFRESH', 30))
+SNAPSHOT_EVERY = int(os.getenv('TEXT_INDEX_SNAPSHOT_EVERY', 500))
+MAX_MATCHES = int(os.getenv('TEXT_INDEX_MAX_MATCHES', 2000))
+MAX_PREFIX_TERMS = 200
+PENDING_VOCAB_LIMIT = 1000
+SCAN_BATCH = 1000
+
+# ObjectIds from different writers are only roughly ordered, so catch-up
+# scans start this far behind the newest _id already seen
+CATCH_UP_OVERLAP = timedelta(minutes=2)
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text):
+    if not isinstance(text, str):
+        return []
+    return _TOKEN_RE.findall(text.lower())
+
+
+def document_tokens(doc):
+    tokens = set()
+    for field in INDEXED_FIELDS:
+        tokens.update(tokenize(doc.get(field)))
+    return tokens
+
+
+class InvertedIndex:
+    """
+    Word -> article postings with AND queries and last-word prefix matching
+    """
+
+    def __init__(self):
+        self._ids = []              # row -> article id
+        self._rows = {}             # article id -> row
+        self._postings = {}         # word -> array('I') of rows, ascending
+        self._vocab = []            # sorted words, for prefix lookups
+        self._pending = set()       # words added since _vocab was last merged
+        self.watermark = None       # newest _id covered by a scan
+        self._lock = threading.Lock()
+
+    def add(self, article_id, tokens):
+        with self._lock:
+            if article_id in self._rows:
+                return False
+            row = len(self._ids)
+            self._ids.append(article_id)
+            self._rows[article_id] = row
+
+            for token in tokens:
+                posting = self._postings.get(token)
+                if posting is None:
+                    posting = self._postings[token] = array('I')
+                    self._pending.add(token)
+                posting.append(row)
+
+            if len(self._pending) > PENDING_VOCAB_LIMIT:
+                self._merge_vocab()
+            return True
+
+    def _merge_vocab(self):
+        self._vocab = sorted(self._vocab + list(self._pending)) if self._vocab else sorted(self._pending)
+        self._pending = set()
+
+    def _prefix_words(self, prefix):
+        words = []
+        position = bisect.bisect_left(self._vocab, prefix)
+        while position < len(self._vocab) and len(words) < MAX_PREFIX_TERMS:
+            word = self._vocab[position]
+            if not word.startswith(prefix):
+                break
+            words.append(word)
+            position += 1
+        words.extend(word for word in self._pending if word.startswith(prefix))
+        return words
+
+    def search(self, query, prefix=False, limit=MAX_MATCHES):
+        """
+        Ids of articles containing every word of query, newest first
+        """
+        return self.match(query, prefix=prefix, limit=limit)[0]
+
+    def match(self, query, prefix=False, limit=MAX_MATCHES):
+        """
+        (ids, total): the newest `limit` matching ids (all with limit=None)
+        and how many articles matched in all
+        """
+        rows = self._match_rows(query, prefix)
+        # Rows are assigned in insertion order, so the highest are newest
+        return [self._ids[row] for row in rows[::-1][:limit]], len(rows)
+
+    def match_batches(self, query, prefix=False, batch_size=SCAN_BATCH):
+        """
+        Every matching id, newest first, in lists of at most batch_size
+        """
+        rows = self._match_rows(query, prefix)[::-1]
+        for start in range(0, len(rows), batch_size):
+            # _ids only grows, so rows stay valid outside the lock
+            yield [self._ids[row] for row in rows[start:start + batch_size]]
+
+    def _match_rows(self, query, prefix):
+        """
+        Ascending rows of the articles containing every word of query
+        """
+        terms = tokenize(query)
+        if not terms:
+            return np.zeros(0, dtype=np.uint32)
+
+        with self._lock:
+            groups = []
+            for term in set(terms[:-1] if prefix else terms):
+                posting = self._postings.get(term)
+                if not posting:
+                    return np.zeros(0, dtype=np.uint32)
+                groups.append([posting])
+            if prefix:
+                expansions = [self._postings[word] for word in self._prefix_words(terms[-1])]
+                if not expansions:
+                    return np.zeros(0, dtype=np.uint32)
+                groups.append(expansions)
+
+            # Intersect starting from the rarest word
+            groups.sort(key=lambda group: sum(len(posting) for posting in group))
+            rows = None
+            for group in groups:
+                if len(group) == 1:
+                    candidate = np.frombuffer(group[0], dtype=np.uint32).copy()
+                else:
+                    candidate = np.unique(np.concatenate([np.frombuffer(p, dtype=np.uint32) for p in group]))
+                rows = candidate if rows is None else np.intersect1d(rows, candidate, assume_unique=True)
+                if not len(rows):
+                    break
+            return rows
+
+    def to_arrays(self):
+        with self._lock:
+            words = sorted(self._postings)
+            lengths = np.fromiter((len(self._postings[w]) for w in words), dtype=np.uint64, count=len(words))
+            postings = (
+                np.concatenate([np.frombuffer(self._postings[w], dtype=np.uint32) for w in words])
+                if words else np.zeros(0, dtype=np.uint32)
+            )
+            return {
+                "ids": np.array(self._ids, dtype="S24"),
+                "vocab": np.frombuffer("\n".join(words).encode("utf-8"), dtype=np.uint8),
+                "offsets": np.concatenate([np.zeros(1, dtype=np.uint64), np.cumsum(lengths, dtype=np.uint64)]),
+                "postings": postings,
+                "watermark": np.array([str(self.watermark or "")], dtype="S24")
+            }
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        index = cls()
+        index._ids = [article_id.decode("ascii") for article_id in arrays["ids"]]
+        index._rows = {article_id: row for row, article_id in enumerate(index._ids)}
+
+        vocab = arrays["vocab"].tobytes().decode("utf-8")
+        words = vocab.split("\n") if vocab else []
+        offsets, postings = arrays["offsets"], arrays["postings"]
+        for i, word in enumerate(words):
+            index._postings[word] = array('I', postings[offsets[i]:offsets[i + 1]].tobytes())
+        index._vocab = words
+
+        watermark = arrays["watermark"][0].decode("ascii")
+        index.watermark = ObjectId(watermark) if watermark else None
+        return index
+
+    def stats(self):
+        with self._lock:
+            return {
+                "articles": len(self._ids),
+                "words": len(self._postings),
+                "postings": sum(len(p) for p in self._postings.values()),
+                "watermark": str(self.watermark) if self.watermark else None
+            }
+
+
+# ================== SNAPSHOTS ==================
+def save_snapshot(index, path=SNAPSHOT_PATH):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        np.savez(f, **index.to_arrays())
+    os.replace(tmp, path)
+
+
+def load_snapshot(path=SNAPSHOT_PATH):
+    try:
+        with np.load(path) as arrays:
+            return InvertedIndex.from_arrays(arrays)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"Ignoring unreadable text index snapshot: {e}")
+        return None
+
+
+# ================== BUILD / CATCH-UP ==================
+def _scan_into(index, query):
+    added = 0
+    cursor = (
+        news_master
+        .find(query, {field: 1 for field in INDEXED_FIELDS})
+        .sort("_id", 1)
+        .batch_size(SCAN_BATCH)
+    )
+    for doc in cursor:
+        if index.add(str(doc["_id"]), document_tokens(doc)):
+            added += 1
+        if index.watermark is None or doc["_id"] > index.watermark:
+            index.watermark = doc["_id"]
+    return added
+
+
+def catch_up(index):
+    """
+    Add articles inserted since the index's watermark; returns how many
+    """
+    if index.watermark is None:
+        return _scan_into(index, {})
+    since = ObjectId.from_datetime(index.watermark.generation_time - CATCH_UP_OVERLAP)
+    return _scan_into(index, {"_id": {"$gte": since}})
+
+
+def build(path=SNAPSHOT_PATH):
+    """
+    Index every article from scratch and write a fresh snapshot
+    """
+    index = InvertedIndex()
+    _scan_into(index, {})
+    save_snapshot(index, path)
+    return index
+
+
+# ================== PER-PROCESS INDEX ==================
+_index = None
+_index_pid = None
+_last_refresh = 0.0
+_unsaved = 0
+_refreshing = False
+_index_lock = threading.Lock()      # guards the globals above; never held while scanning
+_load_lock = threading.Lock()       # one initial load per process
+
+
+def _catch_up_and_save(index, unsaved):
+    """
+    Catch index up and snapshot it once enough articles were added since the
+    last snapshot; returns the new unsaved count
+    """
+    try:
+        unsaved += catch_up(index)
+        if unsaved >= SNAPSHOT_EVERY:
+            save_snapshot(index)
+            unsaved = 0
+    except Exception as e:
+        print(f"Could not refresh text index: {e}")
+    return unsaved
+
+
+def _load():
+    """
+    Build this process's index off to the side, then publish it
+    """
+    global _index, _index_pid, _last_refresh, _unsaved, _refreshing
+    index = load_snapshot()
+    # Without a snapshot the first catch-up is a full build
+    unsaved = 0 if index is not None else SNAPSHOT_EVERY
+    index = index or InvertedIndex()
+    unsaved = _catch_up_and_save(index, unsaved)
+
+    with _index_lock:
+        _index = index
+        _unsaved = unsaved
+        _refreshing = False
+        _last_refresh = time.time()
+        _index_pid = os.getpid()
+
+
+def get_index():
+    """
+    This process's index, loaded on first use and caught up periodically.
+    Only the first caller in a process waits for the load; while one caller
+    runs a catch-up the others keep searching the current index.
+    """
+    global _unsaved, _last_refresh, _refreshing
+    if _index_pid == os.getpid() and time.time() - _last_refresh < REFRESH_SECONDS:
+        return _index
+
+    if _index_pid != os.getpid():
+        with _load_lock:
+            if _index_pid != os.getpid():
+                _load()
+        return _index
+
+    with _index_lock:
+        if _refreshing or time.time() - _last_refresh < REFRESH_SECONDS:
+            return _index
+        _refreshing = True
+        index, unsaved = _index, _unsaved
+        _unsaved = 0
+
+    # The index locks itself per add, so searches interleave with the scan
+    unsaved = _catch_up_and_save(index, unsaved)
+
+    with _index_lock:
+        if _index is index:
+            _unsaved += unsaved
+            _last_refresh = time.time()
+            _refreshing = False
+    return index
+
+
+def warm_up():
+    """
+    Load the index in a background thread so the first search doesn't wait
+    """
+    if _index_pid == os.getpid():
+        return
+    threading.Thread(target=get_index, name="text-index-warm-up", daemon=True).start()
+
+
+def add_document(doc):
+    """
+    Index an article stored by this process, if the index is loaded here
+    """
+    try:
+        if _index_pid == os.getpid():
+            _index.add(str(doc["_id"]), document_tokens(doc))
+    except Exception as e:
+        print(f"Could not add article to text index: {e}")
+
+
+def search(query, prefix=False, limit=MAX_MATCHES):
+    return get_index().search(query, prefix=prefix, limit=limit)
+
+
+def match(query, prefix=False, limit=MAX_MATCHES):
+    return get_index().match(query, prefix=prefix, limit=limit)
+
+
+def match_batches(query, prefix=False, batch_size=SCAN_BATCH):
+    return get_index().match_batches(query, prefix=prefix, batch_size=batch_size)
+
+
+def index_stats():
+    return get_index().stats()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Manage the keyword search index snapshot')
+    parser.add_argument('--build', action='store_true', help='Index all articles and write a new snapshot')
+    parser.add_argument('--stats', action='store_true', help='Show index statistics')
+    parser.add_argument('--query', help='Run a test query against the index')
+    parser.add_argument('--prefix', action='store_true', help='Treat the last query word as a prefix')
+
+    args = parser.parse_args()
+
+    if args.build:
+        started = time.time()
+        index = build()
+        print(f"✅ Indexed {index.stats()['articles']} articles in {time.time() - started:.1f}s")
+    elif args.stats:
+        print(index_stats())
+    elif args.query:
+        for article_id in search(args.query, prefix=args.prefix, limit=20):
+            print(article_id)
+    else:
+        parser.print_help()
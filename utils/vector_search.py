@@ -0,0 +1,635 @@
+#!/usr/bin/env python3
+"""
+Local vector index for semantic search over news_master.
+
+Titles and summaries are embedded with a local CPU sentence-transformers
+model when one is installed (EMBEDDING_MODEL), otherwise with a stateless
+hashing vectorizer. Vectors live in a memory-mapped float32 matrix on disk so
+every worker shares the same pages, and are grouped into IVF lists around
+k-means centroids: a query only scores the NPROBE closest lists plus the
+small tail of articles added since the lists were last laid out. The tail
+is folded into its nearest lists once it reaches VECTOR_TAIL_MAX_ROWS, so
+the rows a query scans do not grow with the collection.
+
+Build or rebuild the index with:
+    python -m utils.vector_search --build
+New articles are appended by whichever process stored them, and every
+process that searches also catches up from news_master every
+VECTOR_REFRESH seconds, starting a little behind the newest _id in the
+index. Web processes therefore see articles the ingest worker stored on
+another host or filesystem.
+"""
+
+import fcntl
+import json
+import math
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+from bson import ObjectId
+
+from utils.db import news_collection
+
+news_master = news_collection("news_master")
+
+INDEX_DIR = os.getenv('VECTOR_INDEX_DIR', os.path.join('data', 'vector_index'))
+EMBEDDING_MODEL = os.getenv('EMBEDDING_MODEL', '')
+HASHING_DIM = int(os.getenv('VECTOR_HASHING_DIM', 1024))
+NPROBE = int(os.getenv('VECTOR_NPROBE', 8))
+MIN_SIMILARITY = float(os.getenv('VECTOR_MIN_SIMILARITY', 0.2))
+HYBRID_ALPHA = float(os.getenv('HYBRID_ALPHA', 0.5))
+KMEANS_ITERATIONS = 10
+KMEANS_SAMPLE = 20000
+BUILD_BATCH = 1000
+TAIL_MAX_ROWS = int(os.getenv('VECTOR_TAIL_MAX_ROWS', 1000))
+REFRESH_SECONDS = int(os.getenv('VECTOR_REFRESH', 30))
+
+# ObjectIds from different writers are only roughly ordered, so catch-up
+# scans start this far behind the newest _id already indexed
+CATCH_UP_OVERLAP = timedelta(minutes=2)
+
+EMBED_PROJECTION = {"title": 1, "summary": 1}
+
+
+# ================== EMBEDDERS ==================
+class HashingEmbedder:
+    """
+    Stateless bag-of-words embedding; no model download, no synonyms
+    """
+
+    def __init__(self, dim=HASHING_DIM):
+        from sklearn.feature_extraction.text import HashingVectorizer
+        self.name = f"hashing-{dim}"
+        self.dim = dim
+        self._vectorizer = HashingVectorizer(
+            n_features=dim,
+            alternate_sign=False,
+            norm="l2",
+            ngram_range=(1, 2),
+            stop_words="english"
+        )
+
+    def embed(self, texts):
+        return self._vectorizer.transform(texts).astype(np.float32).toarray()
+
+
+class SentenceEmbedder:
+    """
+    Dense semantic embedding from a local sentence-transformers model
+    """
+
+    def __init__(self, model_name):
+        from sentence_transformers import SentenceTransformer
+        self.name = model_name
+        self._model = SentenceTransformer(model_name, device="cpu")
+        self.dim = self._model.get_sentence_embedding_dimension()
+
+    def embed(self, texts):
+        return self._model.encode(list(texts), normalize_embeddings=True,
+                                  convert_to_numpy=True).astype(np.float32)
+
+
+_embedder = None
+_embedder_lock = threading.Lock()
+
+
+def get_embedder():
+    global _embedder
+    if _embedder is None:
+        with _embedder_lock:
+            if _embedder is None:
+                if EMBEDDING_MODEL:
+                    try:
+                        _embedder = SentenceEmbedder(EMBEDDING_MODEL)
+                    except Exception as e:
+                        print(f"Could not load embedding model {EMBEDDING_MODEL}, using hashing: {e}")
+                if _embedder is None:
+                    _embedder = HashingEmbedder()
+    return _embedder
+
+
+def document_text(doc):
+    return f"{doc.get('title') or ''}. {doc.get('summary') or ''}".strip()
+
+
+# ================== STORAGE ==================
+def _path(name):
+    return os.path.join(INDEX_DIR, name)
+
+
+def _read_meta():
+    try:
+        with open(_path("meta.json")) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_meta(meta):
+    tmp = _path("meta.json.tmp")
+    with open(tmp, "w") as f:
+        json.dump(meta, f)
+    os.replace(tmp, _path("meta.json"))
+
+
+class _WriteLock:
+    """
+    Cross-process lock held while the index files are modified
+    """
+
+    def __enter__(self):
+        os.makedirs(INDEX_DIR, exist_ok=True)
+        self._file = open(_path("lock"), "w")
+        fcntl.flock(self._file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        fcntl.flock(self._file, fcntl.LOCK_UN)
+        self._file.close()
+
+
+def _open_arrays(meta, mode="r"):
+    version = meta["version"]
+    vectors = np.memmap(_path(f"vectors.{version}.f32"), dtype=np.float32, mode=mode,
+                        shape=(meta["capacity"], meta["dim"]))
+    ids = np.memmap(_path(f"ids.{version}.bin"), dtype="S24", mode=mode,
+                    shape=(meta["capacity"],))
+    return vectors, ids
+
+
+def _create_arrays(version, capacity, dim):
+    vectors = np.memmap(_path(f"vectors.{version}.f32"), dtype=np.float32, mode="w+",
+                        shape=(capacity, dim))
+    ids = np.memmap(_path(f"ids.{version}.bin"), dtype="S24", mode="w+", shape=(capacity,))
+    return vectors, ids
+
+
+def _remove_version(version):
+    for name in (f"vectors.{version}.f32", f"ids.{version}.bin",
+                 f"centroids.{version}.npy", f"offsets.{version}.npy"):
+        try:
+            os.remove(_path(name))
+        except OSError:
+            pass
+
+
+# ================== BUILD ==================
+def _kmeans(vectors, nlist, seed=0):
+    """
+    Spherical k-means on unit vectors; returns unit centroids
+    """
+    rng = np.random.RandomState(seed)
+    sample = vectors[rng.choice(len(vectors), size=min(len(vectors), KMEANS_SAMPLE), replace=False)]
+    centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+
+    for _ in range(KMEANS_ITERATIONS):
+        assign = np.argmax(sample @ centroids.T, axis=1)
+        for c in range(nlist):
+            members = sample[assign == c]
+            if len(members):
+                centroids[c] = members.sum(axis=0)
+        norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+        centroids /= np.where(norms == 0, 1, norms)
+
+    return centroids.astype(np.float32)
+
+
+def _added_during_build(old_meta, built_ids, embedder):
+    """
+    Rows of the live index that the build's scan did not see, i.e. articles
+    appended while it ran; returns (vectors, ids). Rows for articles that no
+    longer exist are left behind. Caller holds the write lock.
+    """
+    empty = (np.zeros((0, embedder.dim), dtype=np.float32), np.zeros(0, dtype="S24"))
+    if not old_meta or old_meta["model"] != embedder.name or not old_meta["count"]:
+        return empty
+
+    old_vectors, old_ids = _open_arrays(old_meta)
+    live_ids = old_ids[:old_meta["count"]]
+    missing = np.flatnonzero(~np.isin(live_ids, built_ids))
+
+    keep = []
+    for start in range(0, len(missing), BUILD_BATCH):
+        rows = missing[start:start + BUILD_BATCH]
+        by_id = {live_ids[row].decode("ascii"): row for row in rows}
+        object_ids = [ObjectId(article_id) for article_id in by_id if ObjectId.is_valid(article_id)]
+        for doc in news_master.find({"_id": {"$in": object_ids}}, {"_id": 1}):
+            keep.append(by_id[str(doc["_id"])])
+    if not keep:
+        return empty
+
+    keep = np.sort(np.array(keep, dtype=np.int64))
+    return np.array(old_vectors[keep]), np.array(live_ids[keep])
+
+
+def build():
+    """
+    Embed every article and write a fresh IVF index; returns the row count.
+    Embeddings are staged on disk so memory use does not grow with the corpus.
+    """
+    embedder = get_embedder()
+    os.makedirs(INDEX_DIR, exist_ok=True)
+    staging_path = _path("staging.f32")
+
+    ids = []
+    with open(staging_path, "wb") as staging:
+        batch_ids, batch_texts = [], []
+        for doc in news_master.find({}, EMBED_PROJECTION).batch_size(BUILD_BATCH):
+            batch_ids.append(str(doc["_id"]))
+            batch_texts.append(document_text(doc))
+            if len(batch_texts) >= BUILD_BATCH:
+                staging.write(embedder.embed(batch_texts).tobytes())
+                ids.extend(batch_ids)
+                batch_ids, batch_texts = [], []
+        if batch_texts:
+            staging.write(embedder.embed(batch_texts).tobytes())
+            ids.extend(batch_ids)
+
+    count = len(ids)
+    vectors = (np.memmap(staging_path, dtype=np.float32, mode="r", shape=(count, embedder.dim))
+               if count else np.zeros((0, embedder.dim), dtype=np.float32))
+
+    nlist = max(1, min(1024, int(math.sqrt(count)))) if count else 1
+    if count:
+        centroids = _kmeans(vectors, nlist)
+        assign = np.concatenate([
+            np.argmax(vectors[start:start + BUILD_BATCH * 10] @ centroids.T, axis=1)
+            for start in range(0, count, BUILD_BATCH * 10)
+        ])
+    else:
+        centroids = np.zeros((1, embedder.dim), dtype=np.float32)
+        assign = np.zeros(0, dtype=np.int64)
+
+    # Rows are stored grouped by IVF list so each list is one contiguous slice
+    order = np.argsort(assign, kind="stable")
+    offsets = np.searchsorted(assign[order], np.arange(nlist + 1)).astype(np.int64)
+    sorted_ids = np.array(ids, dtype="S24")[order] if count else None
+
+    with _WriteLock():
+        old_meta = _read_meta()
+        # Articles the ingest worker appended to the old index meanwhile go
+        # into the new tail rather than being dropped with the old version
+        extra_vectors, extra_ids = _added_during_build(
+            old_meta, sorted_ids if count else np.zeros(0, dtype="S24"), embedder
+        )
+        total = count + len(extra_ids)
+        watermark = max(ids + [article_id.decode("ascii") for article_id in extra_ids], default=None)
+        version = max(int(time.time() * 1000), old_meta["version"] + 1 if old_meta else 0)
+        capacity = max(1024, total * 2)
+
+        out_vectors, out_ids = _create_arrays(version, capacity, embedder.dim)
+        for start in range(0, count, BUILD_BATCH * 10):
+            rows = order[start:start + BUILD_BATCH * 10]
+            out_vectors[start:start + len(rows)] = vectors[rows]
+        if count:
+            out_ids[:count] = sorted_ids
+        out_vectors[count:total] = extra_vectors
+        out_ids[count:total] = extra_ids
+        out_vectors.flush()
+        out_ids.flush()
+        np.save(_path(f"centroids.{version}.npy"), centroids)
+        np.save(_path(f"offsets.{version}.npy"), offsets)
+
+        _write_meta({
+            "version": version,
+            "model": embedder.name,
+            "dim": embedder.dim,
+            "capacity": capacity,
+            "count": total,
+            "indexed": count,
+            "nlist": nlist,
+            "watermark": watermark
+        })
+
+        if old_meta:
+            _remove_version(old_meta["version"])
+
+    del vectors
+    os.remove(staging_path)
+
+    return total
+
+
+def _fold_tail(meta):
+    """
+    Assign the unclustered tail to its nearest lists and rewrite the index
+    grouped by list again. Centroids are kept, so nothing is re-embedded;
+    run --build now and then to re-cluster. Caller holds the write lock.
+    """
+    old_version = meta["version"]
+    vectors, ids = _open_arrays(meta)
+    centroids = np.load(_path(f"centroids.{old_version}.npy"))
+    offsets = np.load(_path(f"offsets.{old_version}.npy"))
+    indexed, count, nlist = meta["indexed"], meta["count"], meta["nlist"]
+
+    tail_assign = np.concatenate([
+        np.argmax(vectors[start:min(start + BUILD_BATCH * 10, count)] @ centroids.T, axis=1)
+        for start in range(indexed, count, BUILD_BATCH * 10)
+    ])
+    tail_order = indexed + np.argsort(tail_assign, kind="stable")
+    tail_offsets = np.searchsorted(np.sort(tail_assign), np.arange(nlist + 1))
+
+    version = max(int(time.time() * 1000), old_version + 1)
+    out_vectors, out_ids = _create_arrays(version, meta["capacity"], meta["dim"])
+    new_offsets = np.zeros(nlist + 1, dtype=np.int64)
+    position = 0
+    for c in range(nlist):
+        start, end = offsets[c], offsets[c + 1]
+        out_vectors[position:position + end - start] = vectors[start:end]
+        out_ids[position:position + end - start] = ids[start:end]
+        position += end - start
+
+        rows = tail_order[tail_offsets[c]:tail_offsets[c + 1]]
+        out_vectors[position:position + len(rows)] = vectors[rows]
+        out_ids[position:position + len(rows)] = ids[rows]
+        position += len(rows)
+        new_offsets[c + 1] = position
+    out_vectors.flush()
+    out_ids.flush()
+    np.save(_path(f"centroids.{version}.npy"), centroids)
+    np.save(_path(f"offsets.{version}.npy"), new_offsets)
+
+    meta["version"] = version
+    meta["indexed"] = count
+    _write_meta(meta)
+
+    del vectors, ids
+    _remove_version(old_version)
+
+
+# ================== INCREMENTAL ADD ==================
+def _not_indexed(meta, new_ids):
+    """
+    Mask of new_ids that are not in the index described by meta
+    """
+    _, ids = _open_arrays(meta)
+    return ~np.isin(new_ids, ids[:meta["count"]])
+
+
+def add_documents(docs, skip_indexed=False):
+    """
+    Append freshly inserted articles to the index tail. With skip_indexed,
+    articles already in the index (e.g. seen by an earlier catch-up) are
+    left out.
+    """
+    meta = _read_meta()
+    if not meta or not docs:
+        return 0
+
+    embedder = get_embedder()
+    if embedder.name != meta["model"]:
+        print("Vector index was built with a different embedder; rebuild it")
+        return 0
+
+    new_ids = np.array([str(d["_id"]) for d in docs], dtype="S24")
+    if skip_indexed:
+        # Checked before embedding to save the work, and again under the lock
+        keep = _not_indexed(meta, new_ids)
+        docs = [doc for doc, new in zip(docs, keep) if new]
+        new_ids = new_ids[keep]
+        if not docs:
+            return 0
+    vectors = embedder.embed([document_text(d) for d in docs])
+
+    with _WriteLock():
+        meta = _read_meta()
+        if skip_indexed:
+            keep = _not_indexed(meta, new_ids)
+            vectors, new_ids = vectors[keep], new_ids[keep]
+            if not len(new_ids):
+                return 0
+        added = len(new_ids)
+        count = meta["count"]
+
+        if count + added > meta["capacity"]:
+            # Grow into a new version; readers keep their old mapping until
+            # they see the new meta
+            old_version = meta["version"]
+            old_vectors, old_ids = _open_arrays(meta)
+            meta["version"] = int(time.time() * 1000)
+            meta["capacity"] = max(meta["capacity"] * 2, count + added)
+            grown_vectors, grown_ids = _create_arrays(meta["version"], meta["capacity"], meta["dim"])
+            grown_vectors[:count] = old_vectors[:count]
+            grown_ids[:count] = old_ids[:count]
+            grown_vectors.flush()
+            grown_ids.flush()
+            for name in ("centroids", "offsets"):
+                os.replace(_path(f"{name}.{old_version}.npy"), _path(f"{name}.{meta['version']}.npy"))
+            del old_vectors, old_ids
+            _remove_version(old_version)
+
+        out_vectors, out_ids = _open_arrays(meta, mode="r+")
+        out_vectors[count:count + added] = vectors
+        out_ids[count:count + added] = new_ids
+        out_vectors.flush()
+        out_ids.flush()
+
+        meta["count"] = count + added
+        meta["watermark"] = max(meta.get("watermark") or "", max(new_ids).decode("ascii"))
+        _write_meta(meta)
+
+        # A fixed cap, not a share of the index, keeps per-query work flat
+        if meta["indexed"] and meta["count"] - meta["indexed"] >= TAIL_MAX_ROWS:
+            _fold_tail(meta)
+
+    return added
+
+
+def add_document(doc, skip_indexed=False):
+    try:
+        return add_documents([doc], skip_indexed=skip_indexed)
+    except Exception as e:
+        print(f"Could not add article to vector index: {e}")
+        return 0
+
+
+# ================== CATCH-UP ==================
+def catch_up():
+    """
+    Append articles stored since the index's watermark, by any process on
+    any host; returns how many were added
+    """
+    meta = _read_meta()
+    if not meta:
+        return 0
+
+    if meta.get("watermark"):
+        newest = ObjectId(meta["watermark"]).generation_time
+    else:
+        # Indexes built before watermarks were recorded: the version is the
+        # millisecond time of the last build or growth
+        newest = datetime.fromtimestamp(meta["version"] / 1000, tz=timezone.utc)
+    since = ObjectId.from_datetime(newest - CATCH_UP_OVERLAP)
+
+    added = 0
+    batch = []
+    cursor = (
+        news_master
+        .find({"_id": {"$gte": since}}, EMBED_PROJECTION)
+        .sort("_id", 1)
+        .batch_size(BUILD_BATCH)
+    )
+    for doc in cursor:
+        batch.append(doc)
+        if len(batch) >= BUILD_BATCH:
+            added += add_documents(batch, skip_indexed=True)
+            batch = []
+    if batch:
+        added += add_documents(batch, skip_indexed=True)
+    return added
+
+
+_refresher = None
+_refresher_pid = None
+_refresher_lock = threading.Lock()
+
+
+def _run_refresher():
+    while True:
+        try:
+            catch_up()
+        except Exception as e:
+            print(f"Could not catch up vector index: {e}")
+        time.sleep(REFRESH_SECONDS)
+
+
+def start_refresher():
+    """
+    Start the catch-up thread, once per process
+    """
+    global _refresher, _refresher_pid
+    if _refresher_pid == os.getpid() and _refresher is not None and _refresher.is_alive():
+        return
+    with _refresher_lock:
+        if _refresher_pid == os.getpid() and _refresher is not None and _refresher.is_alive():
+            return
+        _refresher = threading.Thread(target=_run_refresher, name="vector-catch-up", daemon=True)
+        _refresher_pid = os.getpid()
+        _refresher.start()
+
+
+# ================== SEARCH ==================
+_reader = {"mtime": None, "meta": None, "arrays": None}
+_reader_lock = threading.Lock()
+
+
+def _current_index():
+    """
+    This process's view of the index, re-read when meta.json changes
+    """
+    try:
+        mtime = os.stat(_path("meta.json")).st_mtime_ns
+    except OSError:
+        return None
+
+    with _reader_lock:
+        if _reader["mtime"] != mtime:
+            meta = _read_meta()
+            if meta is None:
+                return None
+            if not _reader["meta"] or _reader["meta"]["version"] != meta["version"]:
+                vectors, ids = _open_arrays(meta)
+                centroids = np.load(_path(f"centroids.{meta['version']}.npy"))
+                offsets = np.load(_path(f"offsets.{meta['version']}.npy"))
+                _reader["arrays"] = (vectors, ids, centroids, offsets)
+            _reader["meta"] = meta
+            _reader["mtime"] = mtime
+        return _reader["meta"], _reader["arrays"]
+
+
+def search(query, k=50, nprobe=NPROBE):
+    """
+    Return [(article_id, cosine_similarity)] for the k nearest articles,
+    or None when no usable index exists
+    """
+    current = _current_index()
+    if current is None:
+        return None
+    # Articles stored by other processes arrive through the catch-up thread
+    start_refresher()
+
+    meta, (vectors, ids, centroids, offsets) = current
+    embedder = get_embedder()
+    if embedder.name != meta["model"]:
+        return None
+
+    q = embedder.embed([query])[0]
+    if not np.any(q):
+        return []
+
+    rows = []
+    if meta["indexed"]:
+        probe = np.argsort(centroids @ q)[::-1][:nprobe]
+        rows.extend(np.arange(offsets[c], offsets[c + 1]) for c in probe)
+    # Articles not yet folded into a list are always scanned
+    rows.append(np.arange(meta["indexed"], meta["count"]))
+    rows = np.concatenate(rows) if rows else np.zeros(0, dtype=np.int64)
+    if not len(rows):
+        return []
+
+    scores = vectors[rows] @ q
+    top = min(k, len(rows))
+    best = np.argpartition(-scores, top - 1)[:top]
+    best = best[np.argsort(-scores[best])]
+
+    return [(ids[rows[i]].decode("ascii"), float(scores[i])) for i in best]
+
+
+def hybrid_rank(text_scores, vector_scores, alpha=HYBRID_ALPHA, limit=50):
+    """
+    Blend {article_id: score} maps from $text and the vector index. Each
+    side is scaled by its best score so neither dominates by units alone;
+    alpha weights the vector side.
+    """
+    vector_scores = {k: v for k, v in vector_scores.items() if v >= MIN_SIMILARITY}
+    text_max = max(text_scores.values(), default=0) or 1
+    vector_max = max(vector_scores.values(), default=0) or 1
+
+    combined = {}
+    for article_id in set(text_scores) | set(vector_scores):
+        combined[article_id] = (
+            (1 - alpha) * text_scores.get(article_id, 0) / text_max
+            + alpha * vector_scores.get(article_id, 0) / vector_max
+        )
+
+    return sorted(combined, key=combined.get, reverse=True)[:limit]
+
+
+def index_stats():
+    meta = _read_meta()
+    if not meta:
+        return {"available": False}
+    return {
+        "available": True,
+        "model": meta["model"],
+        "count": meta["count"],
+        "unclustered_tail": meta["count"] - meta["indexed"],
+        "nlist": meta["nlist"],
+        "watermark": meta.get("watermark")
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Manage the local news vector index')
+    parser.add_argument('--build', action='store_true', help='Embed all articles and rebuild the index')
+    parser.add_argument('--stats', action='store_true', help='Show index statistics')
+    parser.add_argument('--query', help='Run a test query against the index')
+
+    args = parser.parse_args()
+
+    if args.build:
+        started = time.time()
+        total = build()
+        print(f"✅ Indexed {total} articles in {time.time() - started:.1f}s")
+    elif args.stats:
+        print(index_stats())
+    elif args.query:
+        for article_id, score in search(args.query, k=10) or []:
+            print(f"{score:.3f}  {article_id}")
+    else:
+        parser.print_help()
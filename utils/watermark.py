@@ -0,0 +1,82 @@
+"""
+Ingest watermarks for news_master.
+
+Every stored article bumps a version counter for all news ("all") and for
+its category ("category:<name>") in the `ingest_watermarks` collection. The
+counters are a cheap way to ask "has anything changed since?" without
+touching news_master: the HTTP caching layer derives ETags from them and the
+category feed cache reloads when its version falls behind.
+
+Reads go through a small per-process cache, so a burst of requests costs at
+most one lookup every WATERMARK_TTL seconds.
+"""
+
+import os
+from datetime import datetime
+
+from pymongo import UpdateOne
+
+from utils.cache import LRUCache, track
+from utils.db import news_collection
+
+ingest_watermarks = news_collection("ingest_watermarks")
+
+ALL_SCOPE = "all"
+# Bumped by utils.breaking after each today_breaking_priority build
+BREAKING_SCOPE = "breaking"
+WATERMARK_TTL = float(os.getenv('WATERMARK_TTL', 2))
+
+# Version reported for scopes nothing has been stored under yet
+EPOCH = datetime(1970, 1, 1)
+
+_versions = track("watermarks", LRUCache(maxsize=256, ttl=WATERMARK_TTL))
+
+
+def category_scope(category):
+    return f"category:{category}"
+
+
+def bump(*scopes):
+    """
+    Record that something under each scope changed just now
+    """
+    now = datetime.utcnow()
+    ingest_watermarks.bulk_write([
+        UpdateOne(
+            {"_id": scope},
+            {"$inc": {"version": 1}, "$max": {"updated_at": now}},
+            upsert=True
+        )
+        for scope in scopes
+    ], ordered=False)
+    for scope in scopes:
+        _versions.pop(scope)
+
+
+def record_article(doc):
+    try:
+        scopes = [ALL_SCOPE]
+        if doc.get("category"):
+            scopes.append(category_scope(doc["category"]))
+        bump(*scopes)
+    except Exception as e:
+        print(f"Could not bump ingest watermark: {e}")
+
+
+def current(scope=ALL_SCOPE):
+    """
+    (version, updated_at) for a scope, or None if it cannot be read
+    """
+    cached = _versions.get(scope)
+    if cached is not None:
+        return cached
+
+    try:
+        doc = ingest_watermarks.find_one({"_id": scope})
+    except Exception as e:
+        print(f"Could not read ingest watermark: {e}")
+        return None
+
+    value = (doc["version"], doc["updated_at"]) if doc else (0, EPOCH)
+    _versions.set(scope, value)
+    return value